@@ -0,0 +1,100 @@
+"""
+Memory and speed of the graph stores: building the graph of a large synthetic package into a
+networkx.DiGraph and into a CompactGraph, then reading every node and edge back.
+
+Run with `python -m benchmarks.graphstore`. The modules are parsed once up front, so only the graph
+construction (bulk insertion and link_upwards) and the read pass are measured.
+"""
+import gc
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+import networkx as nx
+
+from benchmarks.synthetic import generate_package
+from py2graph.graphcreator.compactgraph import CompactGraph
+from py2graph.graphcreator.graphcreator import GraphCreator, link_upwards, parse_module_source
+from py2graph.parser.attribute import AttributeParser
+from py2graph.parser.classparser import ClassParser
+from py2graph.parser.constructor import ConstructorParser
+from py2graph.parser.method import MethodParser
+from py2graph.parser.methodbody import MethodBodyParser
+from py2graph.parser.moduleparser import ModuleParser
+from py2graph.parser.package import PackageParser
+
+BACKENDS = {"networkx": nx.DiGraph, "compact": CompactGraph}
+
+PARSERS = {"module": ModuleParser,
+           "class": ClassParser,
+           "method": MethodParser,
+           "attribute": AttributeParser,
+           "body": MethodBodyParser,
+           "constructor": ConstructorParser}
+
+
+def build_graph(backend: str, package_entities, module_levels, package_name: str):
+    orchestrator = GraphCreator(BACKENDS[backend](), dict(PARSERS))
+    orchestrator.add_module_levels(list(package_entities), module_levels)
+    return link_upwards(orchestrator.graph, package_name)
+
+
+def read_graph(graph) -> int:
+    relations = 0
+    for _, node_data in graph.nodes(data=True):
+        node_data['data'].node_type
+    for _, _, edge_data in graph.edges(data=True):
+        relations += len(edge_data['relation'])
+    return relations
+
+
+def measure(backend: str, package_entities, module_levels, package_name: str) -> dict:
+    gc.collect()
+    start = time.perf_counter()
+    graph = build_graph(backend, package_entities, module_levels, package_name)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    relations = read_graph(graph)
+    read_seconds = time.perf_counter() - start
+
+    # the graph size is what is freed when it is dropped, the symbol index and the parsed entities stay
+    tracemalloc.start()
+    graph = build_graph(backend, package_entities, module_levels, package_name)
+    gc.collect()
+    with_graph = tracemalloc.get_traced_memory()[0]
+    nodes, edges = graph.number_of_nodes(), graph.number_of_edges()
+    del graph
+    gc.collect()
+    graph_bytes = with_graph - tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return {"backend": backend, "nodes": nodes, "edges": edges, "relations": relations,
+            "graph_mib": graph_bytes / (1024 * 1024), "build_seconds": build_seconds, "read_seconds": read_seconds}
+
+
+def main():
+    argparser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argparser.add_argument('--packages', type=int, default=20)
+    argparser.add_argument('--modules', type=int, default=50)
+    argparser.add_argument('--classes', type=int, default=8)
+    argparser.add_argument('--methods', type=int, default=8)
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        package_path = generate_package(root, "synthetic", packages=args.packages, modules=args.modules,
+                                        classes=args.classes, methods=args.methods)
+        package_entities, module_sources = PackageParser(str(package_path)).discover("synthetic")
+        module_levels = [parse_module_source(module_source, PARSERS) for module_source in module_sources]
+
+    for backend in BACKENDS:
+        result = measure(backend, package_entities, module_levels, "synthetic")
+        print(f"{result['backend']:>10}: {result['graph_mib']:8.1f} MiB, "
+              f"{result['graph_mib'] * 1024 * 1024 / result['edges']:6.1f} bytes per edge, "
+              f"build {result['build_seconds']:6.2f} s, read {result['read_seconds']:6.2f} s "
+              f"({result['nodes']} nodes, {result['edges']} edges)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Peak RSS of building the graph of a large synthetic package, with every module AST held at once
+(eager) and with the streaming pipeline of GraphCreator.parse_package.
+
+Run with `python -m benchmarks.memory`. Every mode runs in a fresh interpreter, since the peak RSS of a
+process never goes down.
+"""
+import json
+import subprocess
+import sys
+import tempfile
+from argparse import ArgumentParser
+
+import networkx as nx
+
+from benchmarks.synthetic import generate_package
+from py2graph.graphcreator.graphcreator import GraphCreator, link_upwards, parse_module_ast
+from py2graph.graphcreator.stats import peak_rss_mib
+from py2graph.parser.attribute import AttributeParser
+from py2graph.parser.classparser import ClassParser
+from py2graph.parser.constructor import ConstructorParser
+from py2graph.parser.method import MethodParser
+from py2graph.parser.methodbody import MethodBodyParser
+from py2graph.parser.moduleparser import ModuleParser
+from py2graph.parser.package import PackageParser
+
+MODES = ("eager", "streaming")
+
+
+def build_graph(mode: str, package_path: str, package_name: str) -> nx.DiGraph:
+    parser = {"module": ModuleParser,
+              "class": ClassParser,
+              "method": MethodParser,
+              "attribute": AttributeParser,
+              "body": MethodBodyParser,
+              "constructor": ConstructorParser}
+    orchestrator = GraphCreator(nx.DiGraph(), parser)
+    if mode == "streaming":
+        orchestrator.parse_package(package_path, package_name)
+    else:
+        # every module AST is read up front and stays alive until the graph is built
+        entities, deferred = PackageParser(package_path).parse("", package_name)
+        module_levels = [parse_module_ast(deferred_expression.node, deferred_expression.fqn, orchestrator.parser)
+                         for deferred_expression in deferred]
+        orchestrator.add_module_levels(entities, module_levels)
+        orchestrator.graph = link_upwards(orchestrator.graph, package_name)
+    return orchestrator.graph
+
+
+def measure(mode: str, package_path: str, package_name: str) -> dict:
+    baseline = peak_rss_mib()
+    graph = build_graph(mode, package_path, package_name)
+    peak = peak_rss_mib()
+    return {"mode": mode, "nodes": graph.number_of_nodes(), "edges": graph.number_of_edges(),
+            "peak_rss_mib": peak, "graph_rss_mib": round(peak - baseline, 1)}
+
+
+def main():
+    argparser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argparser.add_argument('--packages', type=int, default=20)
+    argparser.add_argument('--modules', type=int, default=50)
+    argparser.add_argument('--classes', type=int, default=8)
+    argparser.add_argument('--methods', type=int, default=8)
+    argparser.add_argument('--run', choices=MODES, help='measure one mode in this process')
+    argparser.add_argument('--path', help='package to measure with --run')
+    args = argparser.parse_args()
+    if peak_rss_mib() is None:
+        sys.exit("The peak RSS cannot be measured on this platform")
+
+    if args.run:
+        print(json.dumps(measure(args.run, args.path, "synthetic")))
+        return
+
+    with tempfile.TemporaryDirectory() as root:
+        package_path = generate_package(root, "synthetic", packages=args.packages, modules=args.modules,
+                                        classes=args.classes, methods=args.methods)
+        for mode in MODES:
+            output = subprocess.run([sys.executable, "-m", "benchmarks.memory", "--run", mode,
+                                     "--path", str(package_path)],
+                                    check=True, capture_output=True, text=True).stdout
+            result = json.loads(output)
+            print(f"{result['mode']:>10}: peak RSS {result['peak_rss_mib']:8.1f} MiB "
+                  f"({result['graph_rss_mib']:.1f} MiB for {result['nodes']} nodes, {result['edges']} edges)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Time and peak memory of every stage of py2graph on a synthetic package, with a check against a baseline.
+
+Run with `python -m benchmarks.pipeline`. The stages are the ones of GraphCreator.parse_package followed by
+the diagram: discovering the modules, ast.parse of every module, the parser chain (or the extractor), declaring
+the symbols and adding the entities to the graph, link_upwards, the consistency check and
+PumlGenerator.generate. Every module AST is parsed before the parser chain runs, so the stages can be timed on
+their own. The stages are measured by the PipelineStats of the GraphCreator.
+
+The result is printed as JSON, or written to --output. With --baseline the result is compared to a stored one
+and the run fails if a stage got slower than the threshold allows, --save-baseline stores a result.
+"""
+import json
+import sys
+import tempfile
+from argparse import ArgumentParser
+from typing import List
+
+from benchmarks.graphstore import BACKENDS, PARSERS
+from benchmarks.synthetic import generate_package
+from py2graph.graphcreator.graphcreator import GraphCreator, link_upwards, parse_module_ast
+from py2graph.graphviewer.puml import PumlGenerator
+from py2graph.parser.extractor import ModuleExtractor
+from py2graph.parser.package import PackageParser, read_module_ast
+
+STAGES = ("discovery", "ast_parse", "parser_chain", "declare", "add_to_graph", "link_upwards", "consistency_check",
+          "puml_generate")
+
+# bump when the layout of a result changes, a baseline of another format is not compared
+RESULT_FORMAT = 2
+
+# a stage is only a regression if it is also slower by this many seconds, short stages are noisy
+DEFAULT_MIN_SECONDS = 0.05
+
+
+def run_pipeline(package_path: str, package_name: str, parser: str, backend: str) -> dict:
+    parsers = dict(PARSERS, extractor=ModuleExtractor) if parser == "extractor" else dict(PARSERS)
+    orchestrator = GraphCreator(BACKENDS[backend](), parsers)
+    stats = orchestrator.stats
+
+    with stats.stage("discovery"):
+        package_entities, module_sources = PackageParser(package_path).discover(package_name)
+    with stats.stage("ast_parse"):
+        module_asts = [read_module_ast(module_source) for module_source in module_sources]
+    with stats.stage("parser_chain"):
+        module_levels = [parse_module_ast(module_ast, module_source.fqn, orchestrator.parser)
+                         for module_ast, module_source in zip(module_asts, module_sources)]
+    del module_asts
+
+    orchestrator.add_module_levels(package_entities, module_levels)
+    with stats.stage("link_upwards"):
+        orchestrator.graph = link_upwards(orchestrator.graph, package_name)
+    with stats.stage("consistency_check"):
+        placeholders = orchestrator._check_graph_consistency(package_name)
+    with stats.stage("puml_generate"):
+        puml = PumlGenerator(orchestrator.graph).generate()
+
+    graph = orchestrator.graph
+    stages = stats.to_dict()["stages"]
+    return {"modules": len(module_sources), "nodes": graph.number_of_nodes(), "edges": graph.number_of_edges(),
+            "placeholders": len(placeholders), "puml_lines": puml.count('\n') + 1,
+            "total_seconds": stats.wall_seconds,
+            "peak_rss_mib": max(stage.peak_rss_mib or 0.0 for stage in stats.stages.values()),
+            "stages": {name: stages[name] for name in STAGES}}
+
+
+def best_of(results: List[dict]) -> dict:
+    """
+    The first result with the fastest time of every stage over all results.
+    """
+    best = dict(results[0], stages={stage: dict(timing) for stage, timing in results[0]["stages"].items()})
+    for stage, timing in best["stages"].items():
+        timing["wall_seconds"] = min(result["stages"][stage]["wall_seconds"] for result in results)
+        timing["cpu_seconds"] = min(result["stages"][stage]["cpu_seconds"] for result in results)
+    best["total_seconds"] = sum(timing["wall_seconds"] for timing in best["stages"].values())
+    return best
+
+
+def regressions(result: dict, baseline: dict, threshold: float, min_seconds: float) -> List[str]:
+    """
+    The stages, and the total, that are slower than the baseline by more than the threshold and min_seconds,
+    and a peak RSS above the baseline by more than the threshold.
+    """
+    timings = dict({stage: timing["wall_seconds"] for stage, timing in result["stages"].items()},
+                   total=result["total_seconds"])
+    baseline_timings = dict({stage: timing["wall_seconds"] for stage, timing in baseline["stages"].items()},
+                            total=baseline["total_seconds"])
+    found = []
+    for stage, seconds in timings.items():
+        expected = baseline_timings.get(stage)
+        if expected is not None and seconds > expected * (1 + threshold) and seconds - expected > min_seconds:
+            found.append(f"{stage}: {seconds:.3f} s, baseline {expected:.3f} s (+{seconds / expected - 1:.0%})")
+    if result["peak_rss_mib"] > baseline["peak_rss_mib"] * (1 + threshold):
+        found.append(f"peak RSS: {result['peak_rss_mib']:.1f} MiB, baseline {baseline['peak_rss_mib']:.1f} MiB")
+    return found
+
+
+def main():
+    argparser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argparser.add_argument('--packages', type=int, default=10)
+    argparser.add_argument('--modules', type=int, default=20, help='modules per package')
+    argparser.add_argument('--classes', type=int, default=5, help='classes per module')
+    argparser.add_argument('--methods', type=int, default=5, help='methods per class')
+    argparser.add_argument('--calls', type=int, default=3, help='calls in every method and function body')
+    argparser.add_argument('--imports', type=int, default=3, help='modules every module imports from')
+    argparser.add_argument('--seed', type=int, default=0)
+    argparser.add_argument('--parser', choices=['extractor', 'chain'], default='extractor',
+                           help='the single-pass extractor py2graph uses, or the parser chain')
+    argparser.add_argument('--backend', choices=sorted(BACKENDS), default='networkx')
+    argparser.add_argument('--repeat', type=int, default=3, help='run the pipeline this often, keep the best times')
+    argparser.add_argument('--output', help='write the result to this JSON file instead of printing it')
+    argparser.add_argument('--baseline', help='fail if the result is slower than this stored result')
+    argparser.add_argument('--save-baseline', help='store the result as a baseline in this file')
+    argparser.add_argument('--threshold', type=float, default=0.2,
+                           help='the slowdown a stage may have against the baseline, 0.2 is 20%%')
+    argparser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS,
+                           help='the slowdown in seconds a stage may always have against the baseline')
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        package_path = generate_package(root, "synthetic", packages=args.packages, modules=args.modules,
+                                        classes=args.classes, methods=args.methods, calls=args.calls,
+                                        imports=args.imports, seed=args.seed)
+        results = [run_pipeline(str(package_path), "synthetic", args.parser, args.backend)
+                   for _ in range(max(args.repeat, 1))]
+    result = dict(best_of(results), parameters=dict({key: getattr(args, key) for key in (
+        'packages', 'modules', 'classes', 'methods', 'calls', 'imports', 'seed', 'parser', 'backend')},
+        format=RESULT_FORMAT))
+
+    report = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf8') as f:
+            f.write(report + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf8') as f:
+            baseline = json.load(f)
+        if baseline.get("parameters") != result["parameters"]:
+            print(f"Baseline {args.baseline} was measured with other parameters: {baseline.get('parameters')}",
+                  file=sys.stderr)
+            sys.exit(2)
+        found = regressions(result, baseline, args.threshold, args.min_seconds)
+        if found:
+            print("Regressions against the baseline:", *found, sep="\n  ", file=sys.stderr)
+            sys.exit(1)
+        print(f"No stage regressed by more than {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""
+Render time of PumlGenerator on synthetic packages of growing size, up to more than 100k edges.
+
+Run with `python -m benchmarks.puml`. Every package is parsed into a graph once and then rendered, only
+the render is timed. The time per edge stays flat while the graph grows when rendering is linear in the
+size of the graph.
+"""
+import tempfile
+import time
+from argparse import ArgumentParser
+
+from benchmarks.graphstore import BACKENDS, PARSERS
+from benchmarks.synthetic import generate_package
+from py2graph.graphcreator.graphcreator import GraphCreator
+from py2graph.graphviewer.puml import PumlGenerator
+from py2graph.parser.extractor import ModuleExtractor
+from py2graph.parser.package import PackageParser
+
+
+def build_graph(package_path: str, package_name: str, backend: str):
+    orchestrator = GraphCreator(BACKENDS[backend](), dict(PARSERS, package=PackageParser, extractor=ModuleExtractor))
+    orchestrator.parse_package(package_path, package_name)
+    return orchestrator.graph
+
+
+def measure(graph, repeat: int) -> dict:
+    timings = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        puml = PumlGenerator(graph).generate()
+        timings.append(time.perf_counter() - start)
+    return {"nodes": graph.number_of_nodes(), "edges": graph.number_of_edges(), "lines": puml.count('\n') + 1,
+            "render_seconds": min(timings)}
+
+
+def main():
+    argparser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argparser.add_argument('--packages', type=int, nargs='+', default=[3, 6, 12],
+                           help='number of subpackages of every measured package')
+    argparser.add_argument('--modules', type=int, default=30)
+    argparser.add_argument('--backend', choices=sorted(BACKENDS), default='networkx')
+    argparser.add_argument('--repeat', type=int, default=3, help='render every graph this often, keep the best')
+    args = argparser.parse_args()
+
+    for packages in args.packages:
+        with tempfile.TemporaryDirectory() as root:
+            package_path = generate_package(root, "synthetic", packages=packages, modules=args.modules)
+            graph = build_graph(str(package_path), "synthetic", args.backend)
+        result = measure(graph, args.repeat)
+        print(f"{result['edges']:8} edges: render {result['render_seconds']:6.2f} s, "
+              f"{result['render_seconds'] * 1e6 / result['edges']:5.2f} us per edge "
+              f"({result['nodes']} nodes, {result['lines']} lines, {args.backend})")
+
+
+if __name__ == '__main__':
+    main()
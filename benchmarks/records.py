@@ -0,0 +1,79 @@
+"""
+Memory of the parsed records and of the graph built from them, in bytes per node and per edge.
+
+Run with `python -m benchmarks.records`. Allocations are traced with tracemalloc, so the numbers only
+depend on the record types and the graph store, not on the allocator or the rest of the process.
+The per node and per edge figures both divide the size of the whole graph.
+Pass --max-bytes-per-node or --max-bytes-per-edge to exit with an error when a limit is exceeded.
+"""
+import gc
+import sys
+import tempfile
+import tracemalloc
+from argparse import ArgumentParser
+
+from benchmarks.graphstore import BACKENDS, PARSERS
+from benchmarks.synthetic import generate_package
+from py2graph.graphcreator.graphcreator import GraphCreator, parse_module_source
+from py2graph.parser.package import PackageParser
+
+
+def traced_bytes() -> int:
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure(package_path: str, package_name: str, backend: str) -> dict:
+    _, module_sources = PackageParser(package_path).discover(package_name)
+
+    tracemalloc.start()
+    start = traced_bytes()
+    module_levels = [parse_module_source(module_source, PARSERS) for module_source in module_sources]
+    records_bytes = traced_bytes() - start
+    entities = [entity for levels in module_levels for level in levels for entity in level]
+    entity_count = len(entities)
+    relationships = sum(len(entity.relationships) for entity in entities)
+    del entities, module_levels
+
+    start = traced_bytes()
+    orchestrator = GraphCreator(BACKENDS[backend](), dict(PARSERS))
+    orchestrator.parse_package(package_path, package_name)
+    graph = orchestrator.graph
+    del orchestrator
+    graph_bytes = traced_bytes() - start
+    tracemalloc.stop()
+
+    nodes, edges = graph.number_of_nodes(), graph.number_of_edges()
+    return {"records_bytes": records_bytes, "entities": entity_count, "relationships": relationships,
+            "graph_bytes": graph_bytes, "nodes": nodes, "edges": edges,
+            "bytes_per_node": graph_bytes / nodes, "bytes_per_edge": graph_bytes / edges}
+
+
+def main():
+    argparser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argparser.add_argument('--packages', type=int, default=4)
+    argparser.add_argument('--modules', type=int, default=25)
+    argparser.add_argument('--backend', choices=sorted(BACKENDS), default='networkx')
+    argparser.add_argument('--max-bytes-per-node', type=float)
+    argparser.add_argument('--max-bytes-per-edge', type=float)
+    args = argparser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        package_path = generate_package(root, "synthetic", packages=args.packages, modules=args.modules)
+        result = measure(str(package_path), "synthetic", args.backend)
+
+    print(f"records: {result['records_bytes'] / result['entities']:7.1f} bytes per entity, "
+          f"{result['records_bytes'] / result['relationships']:7.1f} bytes per relationship "
+          f"({result['entities']} entities, {result['relationships']} relationships)")
+    print(f"  graph: {result['bytes_per_node']:7.1f} bytes per node, {result['bytes_per_edge']:7.1f} bytes per edge "
+          f"({result['nodes']} nodes, {result['edges']} edges, {args.backend})")
+
+    exceeded = [f"{unit} {result[key]:.1f} > {limit}" for unit, key, limit in [
+        ("bytes per node", "bytes_per_node", args.max_bytes_per_node),
+        ("bytes per edge", "bytes_per_edge", args.max_bytes_per_edge)] if limit is not None and result[key] > limit]
+    if exceeded:
+        sys.exit("memory regression: " + ", ".join(exceeded))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Throughput of py2graph on packages of the local Python standard library, real code instead of synthetic.
+
+Run with `python -m benchmarks.stdlib [PACKAGE ...]`, by default on json, email, asyncio and concurrent. No
+network is needed, the packages are read from the standard library of the running interpreter. Every
+package is measured in a fresh interpreter, so its peak RSS is its own.
+
+A module py2graph fails on is recorded with its error and left out of the graph, the other modules of the
+package are still measured. The result lists files/s, edges/s and the peak RSS of every package as JSON.
+"""
+import json
+import os
+import subprocess
+import sys
+import sysconfig
+import time
+from argparse import ArgumentParser
+from typing import List
+
+from benchmarks.graphstore import BACKENDS, PARSERS
+from py2graph.graphcreator.graphcreator import GraphCreator, link_upwards, parse_module_ast
+from py2graph.graphcreator.stats import peak_rss_mib
+from py2graph.graphviewer.puml import PumlGenerator
+from py2graph.parser.extractor import ModuleExtractor
+from py2graph.parser.package import PackageParser, read_module_ast
+
+DEFAULT_PACKAGES = ("json", "email", "asyncio", "concurrent")
+
+STDLIB_PATH = sysconfig.get_paths()["stdlib"]
+
+
+def measure(package_name: str, parser: str, backend: str) -> dict:
+    """
+    Build the graph and the diagram of a standard library package, skipping the modules that fail.
+    """
+    package_path = os.path.join(STDLIB_PATH, package_name)
+    if not os.path.isdir(package_path):
+        raise ValueError(f"{package_name} is no package of the standard library in {STDLIB_PATH}")
+    parsers = dict(PARSERS, extractor=ModuleExtractor) if parser == "extractor" else dict(PARSERS)
+    orchestrator = GraphCreator(BACKENDS[backend](), parsers)
+
+    start = time.perf_counter()
+    package_entities, module_sources = PackageParser(package_path).discover(package_name)
+    module_levels = []
+    failures = []
+    source_bytes = 0
+    for module_source in module_sources:
+        try:
+            with open(module_source.path, 'rb') as f:
+                source_code = f.read()
+            source_bytes += len(source_code)
+            module_ast = read_module_ast(module_source, source_code)
+            module_levels.append(parse_module_ast(module_ast, module_source.fqn, orchestrator.parser))
+        except Exception as e:
+            failures.append({"file": os.path.relpath(module_source.path, STDLIB_PATH), "module": module_source.fqn,
+                             "error": f"{type(e).__name__}: {e}"})
+    parse_seconds = time.perf_counter() - start
+
+    orchestrator.add_module_levels(package_entities, module_levels)
+    orchestrator.graph = link_upwards(orchestrator.graph, package_name)
+    puml = PumlGenerator(orchestrator.graph).generate()
+    seconds = time.perf_counter() - start
+
+    graph = orchestrator.graph
+    files = len(module_sources) - len(failures)
+    return {"package": package_name, "files": files, "failed_files": len(failures), "bytes": source_bytes,
+            "nodes": graph.number_of_nodes(), "edges": graph.number_of_edges(), "puml_lines": puml.count('\n') + 1,
+            "parse_seconds": parse_seconds, "seconds": seconds,
+            "files_per_second": files / seconds, "edges_per_second": graph.number_of_edges() / seconds,
+            "peak_rss_mib": peak_rss_mib(), "failures": failures}
+
+
+def measure_in_subprocess(package_name: str, parser: str, backend: str, repeat: int) -> dict:
+    results = []
+    for _ in range(max(repeat, 1)):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.stdlib", "--run", package_name,
+                                 "--parser", parser, "--backend", backend],
+                                check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output))
+    return min(results, key=lambda result: result["seconds"])
+
+
+def summary(results: List[dict]) -> dict:
+    seconds = sum(result["seconds"] for result in results)
+    files = sum(result["files"] for result in results)
+    edges = sum(result["edges"] for result in results)
+    return {"files": files, "failed_files": sum(result["failed_files"] for result in results), "edges": edges,
+            "seconds": seconds, "files_per_second": files / seconds, "edges_per_second": edges / seconds,
+            # None where the peak RSS cannot be measured
+            "peak_rss_mib": max((result["peak_rss_mib"] for result in results if result["peak_rss_mib"] is not None),
+                                default=None)}
+
+
+def main():
+    argparser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argparser.add_argument('packages', nargs='*', default=list(DEFAULT_PACKAGES),
+                           help=f"standard library packages to measure (default: {' '.join(DEFAULT_PACKAGES)})")
+    argparser.add_argument('--parser', choices=['extractor', 'chain'], default='extractor',
+                           help='the single-pass extractor py2graph uses, or the parser chain')
+    argparser.add_argument('--backend', choices=sorted(BACKENDS), default='networkx')
+    argparser.add_argument('--repeat', type=int, default=1, help='measure every package this often, keep the best')
+    argparser.add_argument('--output', help='write the result to this JSON file instead of printing it')
+    argparser.add_argument('--run', metavar='PACKAGE', help='measure one package in this process')
+    args = argparser.parse_args()
+
+    if args.run:
+        print(json.dumps(measure(args.run, args.parser, args.backend)))
+        return
+
+    results = [measure_in_subprocess(package_name, args.parser, args.backend, args.repeat)
+               for package_name in args.packages]
+    for result in results:
+        peak = f"{result['peak_rss_mib']:6.1f} MiB" if result['peak_rss_mib'] is not None else "unknown"
+        print(f"{result['package']:>12}: {result['files']:4} files ({result['failed_files']} failed), "
+              f"{result['files_per_second']:7.1f} files/s, {result['edges_per_second']:9.0f} edges/s, "
+              f"peak RSS {peak}", file=sys.stderr)
+    report = json.dumps({"python": sys.version.split()[0], "stdlib": STDLIB_PATH, "parser": args.parser,
+                         "backend": args.backend, "packages": results, "total": summary(results)}, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+import random
+from pathlib import Path
+
+
+def generate_package(root, name: str = "synthetic", packages: int = 4, modules: int = 10, classes: int = 5,
+                     methods: int = 5, calls: int = 3, imports: int = 3, seed: int = 0) -> Path:
+    """
+    Write a synthetic Python package that py2graph can parse.
+
+    Args:
+        root: Directory the package is created in.
+        name (str): Name of the root package.
+        packages (int): Number of subpackages below the root package.
+        modules (int): Number of modules per subpackage.
+        classes (int): Number of classes per module, each module also gets one free function per class.
+        methods (int): Number of methods per class, besides the constructor.
+        calls (int): Number of calls in every method and function body.
+        imports (int): Number of other modules every module imports from.
+        seed (int): Seed for choosing imports and calls, the same arguments always produce the same package.
+
+    Returns:
+        The path of the root package.
+    """
+    rng = random.Random(seed)
+    package_path = Path(root) / name
+    package_path.mkdir(parents=True, exist_ok=True)
+    (package_path / "__init__.py").write_text("")
+
+    module_fqns = [f"{name}.pkg{p}.mod{m}" for p in range(packages) for m in range(modules)]
+    for index, module_fqn in enumerate(module_fqns):
+        others = module_fqns[:index] + module_fqns[index + 1:]
+        imported = rng.sample(others, min(imports, len(others)))
+        source = _module_source(rng, index, imported, classes, methods, calls)
+
+        subpackage_path = package_path / module_fqn.split('.')[1]
+        if not subpackage_path.exists():
+            subpackage_path.mkdir()
+            (subpackage_path / "__init__.py").write_text("")
+        (subpackage_path / f"{module_fqn.split('.')[-1]}.py").write_text(source)
+    return package_path
+
+
+def _module_source(rng, index, imported, classes, methods, calls):
+    lines = ["import os", "from typing import List, Optional", ""]
+    imported_classes = []
+    imported_functions = []
+    for other_index, module_fqn in enumerate(imported):
+        alias = f"m{other_index}"
+        lines.append(f"from {module_fqn} import Class0 as {alias.upper()}Class, function0 as {alias}_function")
+        imported_classes.append(f"{alias.upper()}Class")
+        imported_functions.append(f"{alias}_function")
+    lines.append("")
+
+    local_classes = [f"Class{c}" for c in range(classes)]
+    local_functions = [f"function{c}" for c in range(classes)]
+    types = imported_classes + ["int", "str"]
+    constructors = imported_classes + imported_functions + local_functions + ["len"]
+    callables = constructors + ["os.path.join"]
+
+    for c, class_name in enumerate(local_classes):
+        base = f"({rng.choice(imported_classes)})" if imported_classes and rng.random() < 0.3 else ""
+        attribute_type = rng.choice(types)
+        lines.append(f"class {class_name}{base}:")
+        lines.append(f"    counter: int = {index}")
+        lines.append("")
+        lines.append(f"    def __init__(self, first: {attribute_type}, second: Optional[str] = None):")
+        lines.append(f"        self.first: {attribute_type} = first")
+        lines.append("        self.second = second")
+        lines.append("        self.items: List[str] = []")
+        lines.append(f"        self.helper = {rng.choice(constructors)}()")
+        for m in range(methods):
+            argument_type = rng.choice(types)
+            return_type = rng.choice(types)
+            lines.append("")
+            lines.append(f"    def method{m}(self, value: {argument_type}) -> {return_type}:")
+            lines.extend(_body(rng, callables, calls, "        "))
+        lines.append("")
+        lines.append("")
+
+    for c, function_name in enumerate(local_functions):
+        lines.append(f"def {function_name}(value: {rng.choice(types)}) -> {rng.choice(types)}:")
+        lines.extend(_body(rng, callables, calls, "    "))
+        lines.append("")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _body(rng, callables, calls, indent):
+    lines = []
+    for call in range(calls):
+        lines.append(f"{indent}result{call} = {rng.choice(callables)}(value)")
+    lines.append(f"{indent}return value")
+    return lines
@@ -0,0 +1,88 @@
+"""
+Traversal cost per module file: the chain of deferred parsers against the single-pass ModuleExtractor.
+
+Run with `python -m benchmarks.traversal`, optionally with the path of a directory to measure instead of
+a synthetic package, e.g. the standard library. Every file is read and parsed into an AST once, only
+extracting the entities from the AST is timed. Files that neither approach can handle are skipped.
+"""
+import ast
+import os
+import tempfile
+import time
+import warnings
+from argparse import ArgumentParser
+from typing import List
+
+from benchmarks.graphstore import PARSERS
+from benchmarks.synthetic import generate_package
+from py2graph.graphcreator.graphcreator import parse_module_ast
+from py2graph.parser.extractor import ModuleExtractor
+
+
+def parse_with_chain(module_fqn: str, module_ast: ast.Module):
+    # PARSERS has no extractor, so this is the parser chain of the library
+    return parse_module_ast(module_ast, module_fqn, PARSERS)
+
+
+def parse_with_extractor(module_fqn: str, module_ast: ast.Module):
+    return ModuleExtractor(module_fqn).extract(module_ast)
+
+
+def best_time(parse, module_fqn: str, module_ast: ast.Module, repeat: int) -> float:
+    timings = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        parse(module_fqn, module_ast)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def module_files(root: str) -> List[str]:
+    return sorted(os.path.join(directory, file_name) for directory, _, file_names in os.walk(root)
+                  for file_name in file_names if file_name.endswith('.py'))
+
+
+def measure(paths: List[str], repeat: int) -> dict:
+    chain_seconds = extractor_seconds = 0.0
+    files = skipped = mismatches = 0
+    for path in paths:
+        module_fqn = "benchmark." + os.path.splitext(os.path.basename(path))[0]
+        try:
+            with open(path, 'rb') as f, warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                module_ast = ast.parse(f.read(), filename=os.path.basename(path))
+            expected = parse_with_chain(module_fqn, module_ast)
+        except Exception:
+            skipped += 1
+            continue
+        if parse_with_extractor(module_fqn, module_ast) != expected:
+            mismatches += 1
+        chain_seconds += best_time(parse_with_chain, module_fqn, module_ast, repeat)
+        extractor_seconds += best_time(parse_with_extractor, module_fqn, module_ast, repeat)
+        files += 1
+    return {"files": files, "skipped": skipped, "mismatches": mismatches,
+            "chain_seconds": chain_seconds, "extractor_seconds": extractor_seconds}
+
+
+def main():
+    argparser = ArgumentParser(description=__doc__.strip().splitlines()[0])
+    argparser.add_argument('path', nargs='?', help='directory of Python files, a synthetic package if omitted')
+    argparser.add_argument('--repeat', type=int, default=3, help='time every file this often, keep the best')
+    args = argparser.parse_args()
+
+    if args.path:
+        result = measure(module_files(args.path), args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as root:
+            result = measure(module_files(str(generate_package(root, "synthetic"))), args.repeat)
+
+    for name in ("chain", "extractor"):
+        seconds = result[f"{name}_seconds"]
+        print(f"{name:>10}: {seconds * 1e6 / result['files']:9.1f} us per file ({seconds:.2f} s in total)")
+    speedup = result['chain_seconds'] / result['extractor_seconds']
+    print(f"{result['files']} files, {result['skipped']} skipped, {result['mismatches']} mismatches, "
+          f"speedup {speedup:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
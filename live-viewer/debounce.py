@@ -0,0 +1,42 @@
+import asyncio
+import os
+from typing import AsyncIterator, Iterable, Optional
+
+# directories whose changes never affect the diagram
+IGNORED_DIRECTORIES = frozenset({'.git', '.hg', '.svn', '__pycache__', '.mypy_cache', '.pytest_cache', '.tox', '.nox',
+                                 '.venv', 'venv', 'env', 'site-packages', 'node_modules', '.py2graph_cache'})
+
+
+def is_relevant(path: str, is_directory: bool = False, ignored_directories: Iterable[str] = IGNORED_DIRECTORIES,
+                root: Optional[str] = None) -> bool:
+    """
+    Whether a file event at path can change the diagram: Python files and directories that may hold
+    packages, outside of version control, virtualenv and cache directories. Only the part of the path
+    below root is checked for ignored directories.
+    """
+    if root:
+        path = os.path.relpath(path, root)
+    parts = os.path.normpath(path).split(os.sep)
+    if any(part in ignored_directories for part in parts):
+        return False
+    return is_directory or path.endswith('.py')
+
+
+async def bursts(events: "asyncio.Queue", debounce_seconds: float = 0.5) -> AsyncIterator[int]:
+    """
+    Coalesce the events put on a queue into bursts, yields the number of events of every burst.
+
+    Every event restarts the debounce window, a burst ends once no event arrived for the whole window.
+    Events put on the queue while the consumer handles a burst make up the next one, so a burst of events,
+    like an editor save or a git checkout, costs the consumer one pass once it is over.
+    """
+    while True:
+        await events.get()
+        count = 1
+        while True:
+            try:
+                await asyncio.wait_for(events.get(), debounce_seconds)
+            except asyncio.TimeoutError:
+                break
+            count += 1
+        yield count
@@ -1,154 +1,278 @@
-import base64
+import asyncio
 import json
 import os
-from threading import Thread
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Optional, Set
 
-import requests
-from flask import Flask, send_from_directory
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
-from websocket_server import WebsocketServer
 
+from debounce import bursts, is_relevant
+from plantumlclient import PlantUMLClient
+from protocol import Diagram, DiagramStore, encode_diagram, encode_manifest
 from py2graph import py2graph
+from py2graph.graphviewer.puml import PumlGenerator
+from py2graph.parser.parser_interface import NodeType
+from rendercache import DEFAULT_MEMORY_BYTES, RenderCache
+from renderer import PLANTUML_COMMAND, PipeRenderer, RenderError, Renderer
+from webserver import ConnectionClosed, WebSocket, accept_websocket, read_request, send_response
 
 # Configuration
-PLANTUML_SERVER_URL = "http://localhost:8080/svg"  # Local PlantUML server URL
-WEBSOCKET_PORT = 8765
-HTTP_SERVER_PORT = 8000
+RENDERER = os.environ.get("PY2GRAPH_RENDERER", "http")  # "http" for the PlantUML server, "pipe" for local PlantUML
+PLANTUML_SERVER_URL = os.environ.get("PY2GRAPH_PLANTUML_URL", "http://localhost:8080/svg")  # PlantUML server URL
+PLANTUML_COMMAND = os.environ.get("PY2GRAPH_PLANTUML_COMMAND", PLANTUML_COMMAND)  # runs PlantUML for "pipe"
+PLANTUML_TIMEOUT = float(os.environ.get("PY2GRAPH_PLANTUML_TIMEOUT", 30))  # seconds to wait for a render
+MAX_RENDERS = int(os.environ.get("PY2GRAPH_MAX_RENDERS", 2))  # renders in flight at the same time
+HTTP_SERVER_PORT = int(os.environ.get("PY2GRAPH_VIEWER_PORT", 8000))  # serves the page and the websocket
+DEBOUNCE_SECONDS = float(os.environ.get("PY2GRAPH_DEBOUNCE_SECONDS", 0.5))  # quiet time before a rebuild
+RENDER_CACHE_BYTES = int(os.environ.get("PY2GRAPH_RENDER_CACHE_BYTES", DEFAULT_MEMORY_BYTES))  # SVG kept in memory
+RENDER_CACHE_DIR = os.environ.get("PY2GRAPH_RENDER_CACHE_DIR")  # optional disk tier of the SVG cache
+SPLIT_PACKAGES = os.environ.get("PY2GRAPH_SPLIT_PACKAGES", "") not in ("", "0")  # one diagram per package
 
-# Flask app to serve index.html and diagrams
-app = Flask(__name__)
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'index.html')
+WEBSOCKET_PATH = '/ws'
 
 
-@app.route("/")
-def index():
-    """Serve the index.html file."""
-    return send_from_directory('.', 'index.html')
+def diagram_fragments(graph, package_name, split_packages=False):
+    """The PUML text of the whole package, or of every package with modules, by fragment name."""
+    # deterministic output keeps the versions and the render cache keys stable across rebuilds
+    if not split_packages:
+        return {package_name: PumlGenerator(graph, package_name, deterministic=True).generate()}
+    packages = sorted({fqn.rpartition('.')[0] for fqn, node_data in graph.nodes(data=True)
+                       if node_data and node_data['data'].node_type is NodeType.MODULE})
+    return {package: PumlGenerator(graph, package, deterministic=True, package=package).generate()
+            for package in packages}
 
 
-from zlib import compress
-maketrans = bytes.maketrans
-import string
+def build_fragments(package_path, package_name, split_packages=False):
+    """Parse the package with py2graph and generate its diagrams, this runs in a worker process."""
+    graph = py2graph.create_graph(package_path, package_name)
+    return diagram_fragments(graph, package_name, split_packages)
 
-plantuml_alphabet = string.digits + string.ascii_uppercase + string.ascii_lowercase + '-_'
-base64_alphabet = string.ascii_uppercase + string.ascii_lowercase + string.digits + '+/'
-b64_to_plantuml = maketrans(base64_alphabet.encode('utf-8'), plantuml_alphabet.encode('utf-8'))
 
-def deflate_and_encode(plantuml_text):
-    """zlib compress the plantuml text and encode it for the plantuml server.
-    """
-    zlibbed_str = compress(plantuml_text.encode('utf-8'))
-    compressed_string = zlibbed_str[2:-4]
-    return base64.b64encode(compressed_string).translate(b64_to_plantuml).decode('utf-8')
+def create_renderer(backend=RENDERER):
+    """The configured renderer, a client of the PlantUML server or local PlantUML processes."""
+    if backend == "http":
+        return PlantUMLClient(PLANTUML_SERVER_URL, timeout=(3.05, PLANTUML_TIMEOUT), max_in_flight=MAX_RENDERS)
+    if backend == "pipe":
+        return PipeRenderer(PLANTUML_COMMAND, max_in_flight=MAX_RENDERS, timeout=PLANTUML_TIMEOUT)
+    raise ValueError(f"Unknown renderer {backend!r}, expected 'http' or 'pipe'")
+
+
+class FileEventForwarder(FileSystemEventHandler):
+    """Forwards the relevant file events from the watchdog thread to a queue of the event loop."""
+
+    def __init__(self, loop, events, root):
+        self.loop = loop
+        self.events = events
+        self.root = root
+
+    def forward(self, path, is_directory=False):
+        if not is_relevant(path, is_directory, root=self.root):
+            return False
+        self.loop.call_soon_threadsafe(self.events.put_nowait, path)
+        return True
+
+    def on_modified(self, event):
+        """Handle modified Python files."""
+        if not event.is_directory:
+            self.forward(event.src_path)
+
+    def on_created(self, event):
+        """Handle newly created Python files."""
+        if not event.is_directory:
+            self.forward(event.src_path)
+
+    def on_deleted(self, event):
+        """Handle deleted Python files and directories."""
+        self.forward(event.src_path, event.is_directory)
 
+    def on_moved(self, event):
+        """Handle renamed Python files and directories, on either side of the move."""
+        if not self.forward(event.src_path, event.is_directory):
+            self.forward(event.dest_path, event.is_directory)
 
-class PythonFileHandler(FileSystemEventHandler):
-    def __init__(self, websocket_server, observer):
-        self.websocket_server = websocket_server
-        self.websocket_server.set_fn_message_received(self.message_received)
-        self.websocket_server.set_fn_new_client(self.on_client_connect)
 
-        self.observer = observer
-        self.lastPackageUML = ''
+class LiveViewer:
+    """
+    Serves the page and the websocket, watches the package and pushes its diagrams, all on one event loop.
+
+    File events arrive through a queue and are debounced into rebuilds. Parsing the package runs in an
+    executor, a worker process by default, and rendering runs on the threads of the renderer, so
+    the loop only waits for them. Every client has its own send queue, a slow client is disconnected
+    instead of stalling the others. Create the viewer within the running loop.
+    """
+
+    def __init__(self, renderer: Renderer, render_cache: RenderCache, executor: Optional[Executor] = None,
+                 debounce_seconds: float = DEBOUNCE_SECONDS, split_packages: bool = SPLIT_PACKAGES):
+        self.renderer = renderer
+        self.render_cache = render_cache
+        self.executor = executor if executor is not None else ProcessPoolExecutor(max_workers=1)
+        self.debounce_seconds = debounce_seconds
+        self.split_packages = split_packages
         self.package_path = ''
         self.package_name = ''
+        self.diagrams = DiagramStore()
+        self.clients: Dict[int, WebSocket] = {}
+        self.events: "asyncio.Queue[str]" = asyncio.Queue()
+        self.observer = None
+        self._rebuild_lock = asyncio.Lock()
+        self._tasks: Set["asyncio.Future"] = set()
+
+    async def start(self, host: str, port: int):
+        """Start serving and watching, returns the server."""
+        self._spawn(self.watch_events())
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        for task in self._tasks:
+            task.cancel()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        self.renderer.close()
+        self.executor.shutdown(wait=False)
 
-    def update_observer_path(self, new_path):
-        """Update the observer to watch a new directory."""
-        # Stop the current observer
-        self.observer.unschedule_all()
-        # Update the package path and name
-        self.package_path = new_path
-        self.package_name = os.path.basename(new_path)
-        # Reschedule the observer to watch the new directory
-        self.observer.schedule(self, path=new_path, recursive=True)
-        print(f"Observer now watching: {new_path}")
-
-    def message_received(self, client, server, message):
+    async def handle_connection(self, reader, writer):
+        request = await read_request(reader)
+        if request is None:
+            writer.close()
+            return
+        method, path, headers = request
+        if method != 'GET':
+            await send_response(writer, 405)
+        elif path == WEBSOCKET_PATH:
+            websocket = await accept_websocket(reader, writer, headers)
+            if websocket is not None:
+                await self.client_session(websocket)
+                return
+        elif path in ('/', '/index.html'):
+            with open(INDEX_PATH, 'rb') as f:
+                await send_response(writer, 200, f.read(), 'text/html; charset=utf-8')
+        else:
+            await send_response(writer, 404)
+        writer.close()
+
+    async def client_session(self, websocket: WebSocket):
+        """Clients announce the diagrams they hold with a sync message before they get any."""
+        self.clients[websocket.id] = websocket
+        try:
+            while True:
+                await self.message_received(websocket, await websocket.receive())
+        except ConnectionClosed:
+            pass
+        finally:
+            del self.clients[websocket.id]
+            self.diagrams.disconnect(websocket.id)
+            await websocket.close()
+
+    async def message_received(self, websocket: WebSocket, message):
         """Handle messages received from WebSocket clients."""
         try:
             data = json.loads(message)
-            if data.get("action") == "updatePath":
-                new_path = data.get("path")
-                if os.path.exists(new_path) and os.path.isdir(new_path):
-                    self.package_path = new_path
-                    self.package_name = self.package_path.split("/")[-1]
-                    print(f"Updated WATCH_DIRECTORY to: {self.package_path}")
-                    self.process_package_directory()
-                    self.update_observer_path(self.package_path)
-                    server.send_message(client, "Path updated successfully")
-                else:
-                    server.send_message(client, "Invalid path")
-            else:
-                print("Unknown action received:", data)
-        except Exception as e:
+        except ValueError as e:
             print("Error handling WebSocket message:", e)
-
-    def on_client_connect(self, client, server):
-        self.send_puml_data()
-
-    def send_puml_data(self):
-        puml_content = self.lastPackageUML
-        try:
-            encoded_puml = deflate_and_encode(puml_content)
-            url = f"{PLANTUML_SERVER_URL}/{encoded_puml}"
-            response = requests.get(url)
-
-            if response.status_code == 200:
-                image_data = base64.b64encode(response.content).decode('utf-8')
-                self.websocket_server.send_message_to_all(
-                    f"data:image/svg+xml;base64,{image_data}"
-                )
-                print("Diagram sent to clients via WebSocket")
+            return
+        if data.get("action") == "sync":
+            self.sync_client(websocket, data.get("versions") or {})
+        elif data.get("action") == "updatePath":
+            new_path = data.get("path")
+            if new_path and os.path.isdir(new_path):
+                print(f"Updated WATCH_DIRECTORY to: {new_path}")
+                self.watch(new_path)
+                await self.rebuild()
+                websocket.send("Path updated successfully")
             else:
-                print(f"Failed to generate diagram for {self.package_name}: {response.status_code}")
-        except Exception as e:
-            print(f"Error sending to PlantUML server: {e}")
+                websocket.send("Invalid path")
+        else:
+            print("Unknown action received:", data)
 
-    def process_package_directory(self):
-        """Process the Python file with py2graph and send the PUML string to the PlantUML server."""
-        print(f"Processing updated package")
+    def sync_client(self, websocket: WebSocket, versions):
+        """Send a client the manifest and the fragments that differ from the versions it holds."""
+        self.diagrams.connect(websocket.id, versions)
+        websocket.send(encode_manifest(self.diagrams.manifest()))
+        self.send_pending(websocket)
 
-        # Generate the PUML string using py2graph
-        puml_content = py2graph.py2graph(self.package_path, self.package_name)
-        print(puml_content)
-        self.lastPackageUML = puml_content
-        print(f"Generated PUML content for {self.package_path}")
+    def send_pending(self, websocket: WebSocket):
+        for diagram in self.diagrams.take_pending(websocket.id):
+            websocket.send(encode_diagram(diagram.fragment, diagram.version, diagram.svg))
+            print(f"Diagram {diagram.fragment} {diagram.version[:12]} sent to client {websocket.id}")
 
-        self.send_puml_data()
+    def watch(self, path):
+        """Watch a new package directory, the observer thread forwards its events to the loop."""
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        self.package_path = path
+        self.package_name = os.path.basename(os.path.normpath(path))
+        self.observer = Observer()
+        self.observer.schedule(FileEventForwarder(asyncio.get_running_loop(), self.events, path), path,
+                               recursive=True)
+        self.observer.start()
+        print(f"Observer now watching: {path}")
 
-    def on_modified(self, event):
-        """Handle modified Python files."""
-        if not event.is_directory and event.src_path.endswith('.py'):
-            self.process_package_directory()
+    async def watch_events(self):
+        async for count in bursts(self.events, self.debounce_seconds):
+            print(f"{count} file events")
+            await self.rebuild()
 
-    def on_created(self, event):
-        """Handle newly created Python files."""
-        if not event.is_directory and event.src_path.endswith('.py'):
-            self.process_package_directory()
+    async def rebuild(self):
+        """Process the package with py2graph and push the changed diagrams to the clients."""
+        if not self.package_path:
+            return
+        async with self._rebuild_lock:
+            print(f"Processing updated package")
+            try:
+                fragments = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, build_fragments, self.package_path, self.package_name, self.split_packages)
+            except Exception as e:
+                print(f"Error processing {self.package_path}: {e}")
+                return
+            changed = self.diagrams.update(fragments)
+            print(f"Generated PUML content for {self.package_path}, {len(changed)} of {len(fragments)} "
+                  f"diagrams changed")
 
+            manifest = encode_manifest(self.diagrams.manifest())
+            for websocket in list(self.clients.values()):
+                websocket.send(manifest)
+            for diagram in changed:
+                self._spawn(self.render(diagram))
 
-def start_file_watcher(websocket_server):
-    observer = Observer()
-    handler = PythonFileHandler(websocket_server, observer)
-    observer.start()
-    try:
-        observer.join()
-    except KeyboardInterrupt:
-        print("Stopping observer...")
-        observer.stop()
-    observer.join()
+    async def render(self, diagram: Diagram):
+        """Render a diagram, or take it from the cache, and send it to the clients that do not hold it."""
+        svg = self.render_cache.get(diagram.version)
+        if svg is None:
+            try:
+                svg = await asyncio.wrap_future(self.renderer.submit(diagram.puml))
+            except RenderError as e:
+                print(f"Error rendering {diagram.fragment}: {e}")
+                return
+            self.render_cache.put(diagram.version, svg)
+        self.render_cache.log_stats()
+        # a render that finished after a newer rebuild is only cached
+        if self.diagrams.set_svg(diagram.fragment, diagram.version, svg):
+            for websocket in list(self.clients.values()):
+                self.send_pending(websocket)
 
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
 
-if __name__ == "__main__":
-    # Start Flask server in a separate thread
-    Thread(target=lambda: app.run(host="0.0.0.0", port=HTTP_SERVER_PORT), daemon=True).start()
 
-    # Start WebSocket server
-    websocket_server = WebsocketServer(port=WEBSOCKET_PORT)
-    print(f"WebSocket server started on port {WEBSOCKET_PORT}")
+async def main():
+    viewer = LiveViewer(create_renderer(), RenderCache(RENDER_CACHE_BYTES, RENDER_CACHE_DIR))
+    server = await viewer.start("0.0.0.0", HTTP_SERVER_PORT)
+    print(f"Live viewer serving on http://localhost:{HTTP_SERVER_PORT}, websocket on {WEBSOCKET_PATH}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        viewer.close()
 
-    Thread(target=websocket_server.run_forever, daemon=True).start()
 
-    # Start file watcher
-    start_file_watcher(websocket_server)
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("Stopping live viewer...")
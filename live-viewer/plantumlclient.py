@@ -0,0 +1,87 @@
+import base64
+import string
+import threading
+from typing import Tuple, Union
+from zlib import compress
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from renderer import RenderError, Renderer
+
+PLANTUML_SERVER_URL = "http://localhost:8080/svg"  # Local PlantUML server URL
+
+# longer GET URLs are rejected by the PlantUML server or a proxy in front of it, such diagrams are posted
+MAX_URL_LENGTH = 4000
+
+# responses worth another attempt, the server is restarting or overloaded
+RETRY_STATUS = (429, 502, 503, 504)
+
+plantuml_alphabet = string.digits + string.ascii_uppercase + string.ascii_lowercase + '-_'
+base64_alphabet = string.ascii_uppercase + string.ascii_lowercase + string.digits + '+/'
+b64_to_plantuml = bytes.maketrans(base64_alphabet.encode('utf-8'), plantuml_alphabet.encode('utf-8'))
+
+
+def deflate_and_encode(plantuml_text):
+    """zlib compress the plantuml text and encode it for the plantuml server.
+    """
+    zlibbed_str = compress(plantuml_text.encode('utf-8'))
+    compressed_string = zlibbed_str[2:-4]
+    return base64.b64encode(compressed_string).translate(b64_to_plantuml).decode('utf-8')
+
+
+class PlantUMLClient(Renderer):
+    """
+    Renders diagrams to SVG with a PlantUML server.
+
+    The client keeps a pool of connections to the server, every request is bounded by a connect and a read
+    timeout, and failed connections and overload responses are retried with an exponential backoff.
+    At most max_in_flight renders run at the same time, render() blocks until a slot is free and submit()
+    queues the render on the client's own worker threads. Diagrams whose encoded URL exceeds max_url_length
+    are posted to the server instead of being sent in the URL.
+    """
+
+    def __init__(self, server_url: str = PLANTUML_SERVER_URL, timeout: Union[float, Tuple[float, float]] = (3.05, 30),
+                 retries: int = 2, backoff_factor: float = 0.2, max_in_flight: int = 2,
+                 max_url_length: int = MAX_URL_LENGTH):
+        super().__init__(max_in_flight, thread_name_prefix="plantuml")
+        self.server_url = server_url.rstrip('/')
+        self.timeout = timeout
+        self.max_url_length = max_url_length
+        self.requests = 0
+        self.posts = 0
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries, backoff_factor=backoff_factor,
+                      status_forcelist=RETRY_STATUS, allowed_methods=frozenset({'GET', 'POST'}),
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def close(self):
+        super().close()
+        self._session.close()
+
+    def render(self, puml_text: str) -> bytes:
+        """
+        Render a diagram to SVG bytes, raises RenderError if the server does not deliver them.
+        """
+        url = f"{self.server_url}/{deflate_and_encode(puml_text)}"
+        with self._slots:
+            self.requests += 1
+            try:
+                if len(url) <= self.max_url_length:
+                    response = self._session.get(url, timeout=self.timeout)
+                else:
+                    self.posts += 1
+                    response = self._session.post(self.server_url, data=puml_text.encode('utf-8'),
+                                                  headers={'Content-Type': 'text/plain; charset=utf-8'},
+                                                  timeout=self.timeout)
+            except requests.RequestException as e:
+                raise RenderError(f"PlantUML server {self.server_url} is not reachable: {e}") from e
+        if response.status_code != 200:
+            raise RenderError(f"PlantUML server {self.server_url} answered {response.status_code}")
+        return response.content
@@ -0,0 +1,126 @@
+"""
+The protocol between the live viewer and its browser clients.
+
+The server tells clients which diagrams exist with a text manifest, {"type": "manifest", "fragments": {...}},
+that maps every diagram fragment, the whole package or one diagram per package, to its version, the hash of
+its PUML text. Rendered diagrams are sent as binary frames: a 4 byte big-endian header length, a JSON header
+{"type": "diagram", "fragment": ..., "version": ..., "contentType": "image/svg+xml"} and the SVG bytes.
+
+A client starts with {"action": "sync", "versions": {...}}, listing the versions it already holds. From then
+on the server only sends it the fragments whose version differs from the one the client holds.
+"""
+import json
+import struct
+import threading
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from rendercache import puml_key
+
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+FIN = 0x80
+
+SVG_CONTENT_TYPE = "image/svg+xml"
+
+
+def encode_manifest(versions: Dict[str, str]) -> str:
+    return json.dumps({"type": "manifest", "fragments": versions})
+
+
+def encode_diagram(fragment: str, version: str, svg: bytes) -> bytes:
+    header = json.dumps({"type": "diagram", "fragment": fragment, "version": version,
+                         "contentType": SVG_CONTENT_TYPE}).encode('utf-8')
+    return struct.pack(">I", len(header)) + header + svg
+
+
+def decode_diagram(message: bytes) -> Tuple[dict, bytes]:
+    header_length, = struct.unpack_from(">I", message)
+    header = json.loads(message[4:4 + header_length].decode('utf-8'))
+    return header, message[4 + header_length:]
+
+
+def websocket_frame(payload: bytes, opcode: int = OPCODE_BINARY) -> bytes:
+    """
+    A single, unmasked websocket frame as a server sends it.
+    """
+    length = len(payload)
+    if length <= 125:
+        header = struct.pack(">BB", FIN | opcode, length)
+    elif length <= 0xFFFF:
+        header = struct.pack(">BBH", FIN | opcode, 126, length)
+    else:
+        header = struct.pack(">BBQ", FIN | opcode, 127, length)
+    return header + payload
+
+
+@dataclass
+class Diagram:
+    fragment: str
+    puml: str
+    version: str
+    svg: Optional[bytes] = None
+
+
+class DiagramStore:
+    """
+    The current diagram fragments, and the versions every client holds.
+
+    update() replaces the fragments after a rebuild and returns the ones that have to be rendered,
+    unchanged fragments keep their SVG. take_pending() returns the rendered fragments a client does not
+    hold yet, and records them as held, so every version is sent to a client at most once.
+    The store can be shared by threads.
+    """
+
+    def __init__(self):
+        self.diagrams: Dict[str, Diagram] = {}
+        self.clients: Dict[Hashable, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def manifest(self) -> Dict[str, str]:
+        with self._lock:
+            return {fragment: diagram.version for fragment, diagram in self.diagrams.items()}
+
+    def update(self, fragments: Dict[str, str]) -> List[Diagram]:
+        with self._lock:
+            diagrams = {}
+            for fragment, puml in fragments.items():
+                version = puml_key(puml)
+                previous = self.diagrams.get(fragment)
+                diagrams[fragment] = previous if previous is not None and previous.version == version else \
+                    Diagram(fragment, puml, version)
+            self.diagrams = diagrams
+            return [diagram for diagram in diagrams.values() if diagram.svg is None]
+
+    def set_svg(self, fragment: str, version: str, svg: bytes) -> bool:
+        """
+        Store a rendered fragment, returns False if the fragment changed while it was rendered.
+        """
+        with self._lock:
+            diagram = self.diagrams.get(fragment)
+            if diagram is None or diagram.version != version:
+                return False
+            diagram.svg = svg
+            return True
+
+    def connect(self, client: Hashable, versions: Dict[str, str]):
+        with self._lock:
+            self.clients[client] = dict(versions)
+
+    def disconnect(self, client: Hashable):
+        with self._lock:
+            self.clients.pop(client, None)
+
+    def take_pending(self, client: Hashable) -> List[Diagram]:
+        with self._lock:
+            held = self.clients.get(client)
+            if held is None:
+                return []
+            pending = [diagram for fragment, diagram in self.diagrams.items()
+                       if diagram.svg is not None and held.get(fragment) != diagram.version]
+            for diagram in pending:
+                held[diagram.fragment] = diagram.version
+            # fragments that no longer exist are dropped by the client when it gets the manifest
+            for fragment in [fragment for fragment in held if fragment not in self.diagrams]:
+                del held[fragment]
+            return pending
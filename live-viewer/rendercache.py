@@ -0,0 +1,189 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+
+
+def puml_key(puml_text: str) -> str:
+    """
+    The content address of a diagram, the SHA-256 hex digest of its PUML text.
+    """
+    return hashlib.sha256(puml_text.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """
+    Rendered SVG bytes keyed by the hash of the PUML text they were rendered from.
+
+    The memory tier is an LRU that evicts the least recently used diagrams once their total size exceeds
+    max_bytes. With a cache_dir, diagrams are also written to disk, one file per diagram, and the oldest
+    files are removed once the directory holds more than max_disk_bytes. A diagram found on disk is moved
+    back into memory, so the disk tier survives restarts of the viewer. The cache can be shared by threads.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MEMORY_BYTES, cache_dir: Optional[str] = None,
+                 max_disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.RLock()
+        # bytes of the diagrams on disk, counted once and then kept up to date by every write
+        self._disk_size = 0
+        if cache_dir is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError as e:
+                # the disk tier is best effort, the viewer runs with the memory tier only
+                print(f"Render cache directory {cache_dir} is not usable, caching in memory only: {e}")
+                self.cache_dir = None
+            else:
+                self._disk_size = sum(size for _, size, _ in self._disk_files())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries or (self.cache_dir is not None and os.path.exists(self._path(key)))
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """
+        The number of SVG bytes held in memory.
+        """
+        return self._size
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            svg = self._entries.get(key)
+            if svg is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return svg
+            svg = self._read(key)
+            if svg is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self._remember(key, svg)
+                return svg
+            self.misses += 1
+            return None
+
+    def put(self, key: str, svg: bytes):
+        with self._lock:
+            self._remember(key, svg)
+            if self.cache_dir is not None:
+                self._write(key, svg)
+
+    def get_or_render(self, puml_text: str, render: Callable[[str], bytes]) -> bytes:
+        """
+        The SVG of a diagram, rendered only if it is in neither tier.
+        """
+        key = puml_key(puml_text)
+        svg = self.get(key)
+        if svg is None:
+            svg = render(puml_text)
+            self.put(key, svg)
+        self.log_stats()
+        return svg
+
+    def log_stats(self):
+        print(f"Render cache: {self.hits} hits ({self.disk_hits} from disk), {self.misses} misses, "
+              f"{len(self._entries)} diagrams, {self._size} bytes in memory")
+
+    def _remember(self, key: str, svg: bytes):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        if len(svg) > self.max_bytes:
+            return
+        self._entries[key] = svg
+        self._size += len(svg)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.svg")
+
+    def _read(self, key: str) -> Optional[bytes]:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                svg = f.read()
+            # keeps recently used files away from eviction
+            os.utime(self._path(key))
+        except OSError:
+            return None
+        return svg
+
+    def _write(self, key: str, svg: bytes):
+        # the disk tier is best effort, a full or read-only cache dir leaves the diagram in memory only
+        path = self._path(key)
+        try:
+            previous_size = os.stat(path).st_size
+        except OSError:
+            previous_size = 0
+        try:
+            # written to a temporary file first, so a reader never sees a partial diagram
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(file_descriptor, 'wb') as f:
+                f.write(svg)
+            os.replace(temporary_path, path)
+        except OSError:
+            return
+        finally:
+            # left over unless it was moved into place
+            try:
+                os.unlink(temporary_path)
+            except OSError:
+                pass
+        self._disk_size += len(svg) - previous_size
+        if self._disk_size > self.max_disk_bytes:
+            self._evict_from_disk()
+
+    def _disk_files(self):
+        """
+        The modification time, size and path of every diagram on disk.
+        """
+        files = []
+        try:
+            entries = list(os.scandir(self.cache_dir))
+        except OSError:
+            return files
+        for entry in entries:
+            if entry.name.endswith('.svg'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    # removed in the meantime, by another viewer sharing the directory
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict_from_disk(self):
+        files = self._disk_files()
+        # other viewers may share the directory, the listing is the true size
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._disk_size = total
@@ -0,0 +1,164 @@
+"""
+Renderers turn the PUML text of a diagram into SVG bytes.
+
+Every renderer has a blocking render() and a submit() that renders on the renderer's own worker threads, so
+the live viewer can await it. There are two backends: PlantUMLClient in plantumlclient.py sends diagrams to a
+PlantUML HTTP server, PipeRenderer keeps local PlantUML processes running in pipe mode and writes diagrams to
+their stdin, which saves the HTTP round trip, the URL encoding and the start of a JVM per diagram.
+"""
+import queue
+import shlex
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Sequence, Union
+
+PLANTUML_COMMAND = "java -Djava.awt.headless=true -jar plantuml.jar"
+
+# PlantUML writes this line after every diagram it read from stdin
+PIPE_DELIMITER = "~~py2graph-end-of-diagram~~"
+
+
+class RenderError(Exception):
+    """
+    A diagram could not be rendered, after all retries.
+    """
+
+
+class Renderer(ABC):
+    """
+    Renders diagrams to SVG, at most max_in_flight at the same time.
+    """
+
+    def __init__(self, max_in_flight: int = 2, thread_name_prefix: str = "renderer"):
+        self.max_in_flight = max_in_flight
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix=thread_name_prefix)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    @abstractmethod
+    def render(self, puml_text: str) -> bytes:
+        """
+        Render a diagram to SVG bytes, raises RenderError if that fails.
+        """
+
+    def submit(self, puml_text: str) -> "Future[bytes]":
+        """
+        Render a diagram on a worker thread of the renderer.
+        """
+        return self._executor.submit(self.render, puml_text)
+
+
+class PipeRenderer(Renderer):
+    """
+    Renders diagrams with long-lived local PlantUML processes in pipe mode.
+
+    A process reads diagrams from its stdin and writes every SVG to its stdout, followed by a delimiter line.
+    There are max_in_flight processes, started when they are first needed. A process that does not answer
+    within timeout seconds is killed, and so is one that broke; the next render starts a new process.
+    The command is a list of arguments or a shell-like string, the pipe options are appended to it.
+    """
+
+    def __init__(self, command: Union[str, Sequence[str]] = PLANTUML_COMMAND, max_in_flight: int = 1,
+                 timeout: float = 30):
+        super().__init__(max_in_flight, thread_name_prefix="plantuml-pipe")
+        arguments = shlex.split(command) if isinstance(command, str) else list(command)
+        self.command = arguments + ['-pipe', '-tsvg', '-charset', 'UTF-8', '-pipeNoStderr',
+                                    '-pipedelimitor', PIPE_DELIMITER]
+        self.timeout = timeout
+        self.started = 0
+        # idle processes, None stands for one that is not started yet
+        self._idle: "queue.Queue[Optional[subprocess.Popen]]" = queue.Queue()
+        for _ in range(max_in_flight):
+            self._idle.put(None)
+        self._processes: List[subprocess.Popen] = []
+        self._lock = threading.Lock()
+
+    def close(self):
+        super().close()
+        with self._lock:
+            processes, self._processes = self._processes, []
+        for process in processes:
+            self._stop(process)
+
+    def render(self, puml_text: str) -> bytes:
+        process = self._idle.get()
+        try:
+            if process is None:
+                process = self._start()
+            svg = self._exchange(process, puml_text)
+        except RenderError:
+            if process is not None:
+                self._discard(process)
+                process = None
+            raise
+        finally:
+            self._idle.put(process)
+        if svg.startswith(b"ERROR"):
+            raise RenderError(f"PlantUML could not render the diagram: {' '.join(svg.decode('utf-8').split())}")
+        return svg
+
+    def _start(self) -> subprocess.Popen:
+        try:
+            process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL)
+        except OSError as e:
+            raise RenderError(f"PlantUML could not be started with {self.command[0]}: {e}") from e
+        with self._lock:
+            self._processes.append(process)
+            self.started += 1
+        return process
+
+    def _exchange(self, process: subprocess.Popen, puml_text: str) -> bytes:
+        delimiter = PIPE_DELIMITER.encode('utf-8')
+        # a hung process is killed, which ends the read below
+        watchdog = threading.Timer(self.timeout, process.kill)
+        watchdog.start()
+        try:
+            process.stdin.write(puml_text.encode('utf-8'))
+            if not puml_text.endswith("\n"):
+                process.stdin.write(b"\n")
+            process.stdin.flush()
+            lines = []
+            while True:
+                line = process.stdout.readline()
+                if not line:
+                    raise RenderError(f"PlantUML process {process.pid} ended while rendering, "
+                                      f"or did not answer within {self.timeout} seconds")
+                content = line.rstrip(b"\r\n")
+                # the delimiter follows the last line of an SVG that does not end with a line break
+                if content.endswith(delimiter):
+                    lines.append(content[:-len(delimiter)])
+                    return b"".join(lines)
+                lines.append(line)
+        except OSError as e:
+            raise RenderError(f"PlantUML process {process.pid} broke: {e}") from e
+        finally:
+            watchdog.cancel()
+
+    def _discard(self, process: subprocess.Popen):
+        with self._lock:
+            if process in self._processes:
+                self._processes.remove(process)
+        self._stop(process)
+
+    @staticmethod
+    def _stop(process: subprocess.Popen):
+        for stream in (process.stdin, process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
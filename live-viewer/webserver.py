@@ -0,0 +1,216 @@
+"""
+HTTP and websocket serving on asyncio streams, just what the live viewer needs.
+
+read_request() parses an HTTP request head, send_response() answers it. accept_websocket() upgrades a
+request to a WebSocket (RFC 6455), which reads messages with receive() and queues outgoing ones with send().
+Every WebSocket writes from its own task, a client that does not keep up with its queue is disconnected
+instead of holding up the others.
+"""
+import asyncio
+import base64
+import hashlib
+import itertools
+import struct
+from typing import Dict, Optional, Tuple, Union
+
+from protocol import FIN, OPCODE_BINARY, OPCODE_TEXT, websocket_frame
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+REASONS = {101: "Switching Protocols", 200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed"}
+
+_client_ids = itertools.count(1)
+
+
+class ConnectionClosed(Exception):
+    """
+    The websocket connection was closed, by the client or because it broke the protocol.
+    """
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str]]]:
+    """
+    The method, path and headers of the next request, None if the client closed the connection.
+    Header names are lower case.
+    """
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+        return None
+    if len(head) > MAX_HEADER_BYTES:
+        return None
+    request_line, *header_lines = head.decode('latin-1').split("\r\n")
+    try:
+        method, path, _ = request_line.split(" ", 2)
+    except ValueError:
+        return None
+    headers = {}
+    for line in header_lines:
+        name, separator, value = line.partition(":")
+        if separator:
+            headers[name.strip().lower()] = value.strip()
+    return method, path, headers
+
+
+async def send_response(writer: asyncio.StreamWriter, status: int, body: bytes = b"",
+                        content_type: str = "text/plain; charset=utf-8"):
+    writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                 f"Content-Type: {content_type}\r\n"
+                 f"Content-Length: {len(body)}\r\n"
+                 f"Connection: close\r\n\r\n".encode('latin-1') + body)
+    await writer.drain()
+
+
+def websocket_accept(key: str) -> str:
+    return base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+
+
+async def accept_websocket(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: Dict[str, str],
+                           max_queue: int = 32) -> Optional["WebSocket"]:
+    """
+    Complete the websocket handshake of a request, None if the request is no websocket upgrade.
+    """
+    key = headers.get("sec-websocket-key")
+    if headers.get("upgrade", "").lower() != "websocket" or not key:
+        await send_response(writer, 400, b"websocket upgrade expected")
+        return None
+    writer.write(f"HTTP/1.1 101 {REASONS[101]}\r\n"
+                 f"Upgrade: websocket\r\n"
+                 f"Connection: Upgrade\r\n"
+                 f"Sec-WebSocket-Accept: {websocket_accept(key)}\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    return WebSocket(reader, writer, max_queue)
+
+
+class WebSocket:
+    """
+    The server side of a websocket connection.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, max_queue: int = 32):
+        self.id = next(_client_ids)
+        self.closed = False
+        self._reader = reader
+        self._writer = writer
+        self._queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue(max_queue)
+        self._sender = asyncio.ensure_future(self._send_frames())
+
+    def send(self, message: Union[str, bytes]) -> bool:
+        """
+        Queue a text or binary message, returns False if the connection is closed or the client fell behind.
+        """
+        if self.closed:
+            return False
+        if isinstance(message, str):
+            frame = websocket_frame(message.encode('utf-8'), OPCODE_TEXT)
+        else:
+            frame = websocket_frame(message, OPCODE_BINARY)
+        try:
+            self._queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            print(f"Client {self.id} does not keep up, disconnecting it")
+            self._abort()
+            return False
+        return True
+
+    async def receive(self) -> Union[str, bytes]:
+        """
+        The next text or binary message, answers pings and raises ConnectionClosed once the connection ends.
+        """
+        fragments = []
+        message_opcode = None
+        while True:
+            opcode, final, payload = await self._read_frame()
+            if opcode == OPCODE_CLOSE:
+                self._queue_control(OPCODE_CLOSE, payload[:2])
+                await self.close()
+                raise ConnectionClosed()
+            if opcode == OPCODE_PING:
+                self._queue_control(OPCODE_PONG, payload)
+                continue
+            if opcode == OPCODE_PONG:
+                continue
+            if opcode != OPCODE_CONTINUATION:
+                message_opcode = opcode
+            elif message_opcode is None:
+                raise self._protocol_error("continuation without a message")
+            fragments.append(payload)
+            if sum(len(fragment) for fragment in fragments) > MAX_MESSAGE_BYTES:
+                raise self._protocol_error("message too large")
+            if final:
+                message = b"".join(fragments)
+                return message.decode('utf-8') if message_opcode == OPCODE_TEXT else message
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # the sender writes the queued frames before it closes the connection
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            self._abort()
+        try:
+            await self._sender
+        except asyncio.CancelledError:
+            pass
+
+    async def _read_frame(self) -> Tuple[int, bool, bytes]:
+        try:
+            first, second = await self._reader.readexactly(2)
+            length = second & 0x7F
+            if length == 126:
+                length, = struct.unpack(">H", await self._reader.readexactly(2))
+            elif length == 127:
+                length, = struct.unpack(">Q", await self._reader.readexactly(8))
+            if length > MAX_MESSAGE_BYTES:
+                raise self._protocol_error("frame too large")
+            if not second & 0x80:
+                raise self._protocol_error("client frames must be masked")
+            mask = await self._reader.readexactly(4)
+            payload = await self._reader.readexactly(length)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self._abort()
+            raise ConnectionClosed()
+        # unmasks the payload with integer arithmetic instead of a loop over the bytes
+        key = int.from_bytes((mask * (length // 4 + 1))[:length], 'big')
+        payload = (int.from_bytes(payload, 'big') ^ key).to_bytes(length, 'big')
+        return first & 0x0F, bool(first & FIN), payload
+
+    def _queue_control(self, opcode: int, payload: bytes):
+        try:
+            self._queue.put_nowait(websocket_frame(payload, opcode))
+        except asyncio.QueueFull:
+            self._abort()
+
+    def _protocol_error(self, reason: str) -> ConnectionClosed:
+        print(f"Client {self.id} broke the websocket protocol: {reason}")
+        self._abort()
+        return ConnectionClosed(reason)
+
+    def _abort(self):
+        self.closed = True
+        self._sender.cancel()
+        self._writer.close()
+
+    async def _send_frames(self):
+        try:
+            while True:
+                frame = await self._queue.get()
+                if frame is None:
+                    break
+                self._writer.write(frame)
+                await self._writer.drain()
+        except ConnectionError:
+            self.closed = True
+        finally:
+            self._writer.close()
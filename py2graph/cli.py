@@ -1,11 +1,22 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import json
 from argparse import ArgumentParser
+from functools import partial
 from pathlib import Path
-from sys import path
+from sys import path, stderr, stdout
 
-from py2graph.py2graph import py2graph
+from py2graph import __version__
+from py2graph.graphcreator.parsecache import DEFAULT_CACHE_DIR
+from py2graph.graphcreator.stats import PipelineStats
+from py2graph.graphviewer.dot import ENGINE_ATTRIBUTES, DotGenerator
+from py2graph.graphviewer.exporters import EXPORTERS
+from py2graph.graphviewer.puml import PumlGenerator
+from py2graph.py2graph import GRAPH_BACKENDS, create_graph
+
+# the diagram is streamed to the output file in chunks of this size
+OUTPUT_BUFFER_SIZE = 1 << 20
 
 
 def run():
@@ -16,7 +27,7 @@ def run():
 
     argparser = ArgumentParser(description='Generate PlantUML class diagrams to document your Python application.')
 
-    argparser.add_argument('-v', '--version', action='version', version='py2graph 0.1.0')
+    argparser.add_argument('-v', '--version', action='version', version=f'py2graph {__version__}')
     argparser.add_argument('path', metavar='path', type=str, help='the filepath to the domain')
     argparser.add_argument(
         'module',
@@ -25,6 +36,96 @@ def run():
         help='the module name of the domain',
         default=None,
     )
+    argparser.add_argument(
+        '-j',
+        '--jobs',
+        metavar='N',
+        type=int,
+        help='parse the modules with N worker processes',
+        default=1,
+    )
+    argparser.add_argument(
+        '--cache-dir',
+        metavar='DIR',
+        type=str,
+        help=f'directory of the persistent parse cache (default: {DEFAULT_CACHE_DIR})',
+        default=DEFAULT_CACHE_DIR,
+    )
+    argparser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='parse every module, without reading or writing the parse cache',
+    )
+
+    argparser.add_argument(
+        '--backend',
+        choices=sorted(GRAPH_BACKENDS),
+        help='graph store, compact keeps large graphs in interned arrays (default: networkx)',
+        default='networkx',
+    )
+    argparser.add_argument(
+        '-o',
+        '--output',
+        metavar='FILE',
+        type=str,
+        help='write the diagram to FILE instead of the standard output',
+        default=None,
+    )
+    argparser.add_argument(
+        '--format',
+        choices=['puml', 'graphviz'] + sorted(EXPORTERS),
+        help='a PlantUML or Graphviz class diagram, or the graph as JSON, GraphML or DOT for other tools '
+             '(default: puml)',
+        default='puml',
+    )
+    argparser.add_argument(
+        '--engine',
+        choices=sorted(ENGINE_ATTRIBUTES),
+        help='Graphviz layout of --format graphviz, sfdp and neato lay out very large diagrams without '
+             'package clusters and class members (default: dot)',
+        default='dot',
+    )
+    argparser.add_argument(
+        '--deterministic',
+        action='store_true',
+        help='sort the diagram by name and end it with its content hash, the same code always gives the same output',
+    )
+    argparser.add_argument(
+        '--stats',
+        choices=['text', 'json'],
+        help='report the time, CPU time and peak memory of every stage and the counters of the graph',
+        default=None,
+    )
+    argparser.add_argument(
+        '--stats-file',
+        metavar='FILE',
+        type=str,
+        help='write the --stats report to FILE instead of the standard error',
+        default=None,
+    )
 
     args = argparser.parse_args()
-    print(''.join(py2graph(args.path, args.module)))
+    cache_dir = None if args.no_cache else args.cache_dir
+    stats = PipelineStats()
+    graph = create_graph(args.path, args.module, args.jobs, cache_dir, args.backend, stats)
+    if args.format == 'puml':
+        write = PumlGenerator(graph, "", args.deterministic).write
+    elif args.format == 'graphviz':
+        write = DotGenerator(graph, "", args.deterministic, args.engine,
+                             details=args.engine not in ('sfdp', 'neato')).write
+    else:
+        write = partial(EXPORTERS[args.format], graph, deterministic=args.deterministic)
+    with stats.stage('write'):
+        if args.output is None:
+            write(stdout)
+        else:
+            with open(args.output, 'w', encoding='utf8', buffering=OUTPUT_BUFFER_SIZE) as output:
+                write(output)
+
+    if args.stats is not None:
+        report = json.dumps(stats.to_dict(), indent=2) if args.stats == 'json' else stats.to_text()
+        if args.stats_file is None:
+            print(report, file=stderr)
+        else:
+            with open(args.stats_file, 'w', encoding='utf8') as stats_file:
+                stats_file.write(report + '\n')
@@ -0,0 +1,462 @@
+from array import array
+from collections.abc import Mapping, MutableMapping
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import networkx as nx
+
+from py2graph.graphcreator.simplenode import SimpleNode
+from py2graph.parser.parser_interface import NodeType
+
+NODE_TYPES = list(NodeType)
+NODE_TYPE_CODES = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+
+# target of a removed CSR edge, the slot is dropped by the next compact()
+REMOVED_EDGE = -1
+
+
+class CompactGraph:
+    """
+    Directed graph of the codebase with interned node ids and edges in flat arrays.
+
+    Every fqn is interned to an integer id in insertion order. A node only stores its fqn and a type code,
+    its SimpleNode is created when it is read. The edges are stored CSR-style: the targets of all sources
+    in one array, ordered by source id, and the relations of every edge as codes into a vocabulary of
+    relation names.
+
+    Edges added one at a time go to an overlay, add_edges_from and compact() merge it into the arrays.
+    The graph supports the part of the networkx.DiGraph API that GraphCreator, link_upwards and
+    PumlGenerator use, to_networkx() exports it for everything else.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._fqns: List[Optional[str]] = []  # None for removed nodes, ids are never reused
+        self._names: Dict[int, str] = {}  # only names that differ from the last part of the fqn
+        self._types = array('B')
+        self._in_degree = array('i')
+        self._edge_count = 0
+
+        self._relation_names: List[str] = []
+        self._relation_codes: Dict[str, int] = {}
+
+        # the targets of source id i are _targets[_offsets[i]:_offsets[i + 1]]
+        self._offsets = array('i', [0])
+        self._targets = array('i')
+        # the relations of edge e are _relations[_relation_offsets[e]:_relation_offsets[e + 1]]
+        self._relation_offsets = array('i', [0])
+        self._relations = array('H')
+
+        # changes since the last compact()
+        self._changed_relations: Dict[int, List[int]] = {}
+        self._overlay: Dict[int, Dict[int, List[int]]] = {}
+
+    def __contains__(self, fqn) -> bool:
+        return fqn in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return (fqn for fqn in self._fqns if fqn is not None)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, fqn: str) -> '_Adjacency':
+        if fqn not in self._ids:
+            raise KeyError(fqn)
+        return _Adjacency(self, fqn)
+
+    @property
+    def nodes(self) -> '_NodeView':
+        return _NodeView(self)
+
+    @property
+    def edges(self) -> '_EdgeView':
+        return _EdgeView(self)
+
+    @property
+    def succ(self) -> '_AdjacencyView':
+        return _AdjacencyView(self)
+
+    adj = succ
+
+    def number_of_nodes(self) -> int:
+        return len(self._ids)
+
+    def number_of_edges(self) -> int:
+        return self._edge_count
+
+    def add_node(self, fqn: str, data: Optional[SimpleNode] = None):
+        if data is None:
+            self._intern(fqn)
+        else:
+            self._set_node(fqn, data)
+
+    def add_nodes_from(self, nodes: Iterable):
+        for node in nodes:
+            if isinstance(node, tuple):
+                fqn, attributes = node
+                self.add_node(fqn, **attributes)
+            else:
+                self.add_node(node)
+
+    def remove_node(self, fqn: str):
+        node_id = self._id(fqn)
+        for target_id in [target_id for target_id, _ in self._out(node_id)]:
+            self._remove_edge(node_id, target_id)
+        if self._in_degree[node_id]:
+            for source_id, target_id, _ in list(self._iter_edges()):
+                if target_id == node_id:
+                    self._remove_edge(source_id, target_id)
+        del self._ids[fqn]
+        self._fqns[node_id] = None
+        self._names.pop(node_id, None)
+
+    def in_degree(self, fqn: str) -> int:
+        return self._in_degree[self._id(fqn)]
+
+    def successors(self, fqn: str) -> Iterator[str]:
+        fqns = self._fqns
+        return (fqns[target_id] for target_id, _ in self._out(self._id(fqn)))
+
+    def has_edge(self, source: str, target: str) -> bool:
+        source_id = self._ids.get(source)
+        target_id = self._ids.get(target)
+        return source_id is not None and target_id is not None and self._codes(source_id, target_id) is not None
+
+    def get_edge_data(self, source: str, target: str, default=None):
+        if not self.has_edge(source, target):
+            return default
+        return _EdgeData(self, self._ids[source], self._ids[target])
+
+    def add_edge(self, source: str, target: str, relation: Optional[List[str]] = None):
+        source_id = self._intern(source)
+        target_id = self._intern(target)
+        codes = None if relation is None else self._encode(relation)
+        if self._codes(source_id, target_id) is not None:
+            if codes is not None:
+                self._set_codes(source_id, target_id, codes)
+            return
+        self._overlay.setdefault(source_id, {})[target_id] = codes or []
+        self._in_degree[target_id] += 1
+        self._edge_count += 1
+
+    def add_edges_from(self, edges: Iterable):
+        for edge in edges:
+            if len(edge) == 3:
+                source, target, attributes = edge
+                self.add_edge(source, target, **attributes)
+            else:
+                self.add_edge(*edge)
+        self.compact()
+
+    def remove_edge(self, source: str, target: str):
+        source_id = self._ids.get(source)
+        target_id = self._ids.get(target)
+        if source_id is None or target_id is None or self._codes(source_id, target_id) is None:
+            raise nx.NetworkXError(f"The edge {source}-{target} is not in the graph")
+        self._remove_edge(source_id, target_id)
+
+    def out_edges(self, fqn: Optional[str] = None, data: bool = False) -> Iterator[tuple]:
+        if fqn is None:
+            return self.edges(data=data)
+        source_id = self._id(fqn)
+        fqns = self._fqns
+        if data:
+            return ((fqn, fqns[target_id], _EdgeData(self, source_id, target_id))
+                    for target_id, _ in self._out(source_id))
+        return ((fqn, fqns[target_id]) for target_id, _ in self._out(source_id))
+
+    def compact(self):
+        """
+        Merge the overlay, changed relations and removed edges into the CSR arrays.
+        """
+        offsets = array('i', [0])
+        targets = array('i')
+        relation_offsets = array('i', [0])
+        relations = array('H')
+        for source_id in range(len(self._fqns)):
+            for target_id, codes in self._out(source_id):
+                targets.append(target_id)
+                relations.extend(codes)
+                relation_offsets.append(len(relations))
+            offsets.append(len(targets))
+        self._offsets, self._targets = offsets, targets
+        self._relation_offsets, self._relations = relation_offsets, relations
+        self._changed_relations = {}
+        self._overlay = {}
+
+    def to_networkx(self) -> nx.DiGraph:
+        """
+        Export the graph, with the same node and edge order, as a networkx.DiGraph.
+        """
+        graph = nx.DiGraph()
+        graph.add_nodes_from((fqn, {'data': self._node(node_id)})
+                             for node_id, fqn in enumerate(self._fqns) if fqn is not None)
+        fqns = self._fqns
+        graph.add_edges_from((fqns[source_id], fqns[target_id], {'relation': self._decode(codes)})
+                             for source_id, target_id, codes in self._iter_edges())
+        return graph
+
+    def _id(self, fqn: str) -> int:
+        node_id = self._ids.get(fqn)
+        if node_id is None:
+            raise nx.NetworkXError(f"The node {fqn} is not in the graph.")
+        return node_id
+
+    def _intern(self, fqn: str) -> int:
+        node_id = self._ids.get(fqn)
+        if node_id is None:
+            node_id = self._ids[fqn] = len(self._fqns)
+            self._fqns.append(fqn)
+            self._types.append(NODE_TYPE_CODES[NodeType.PLACEHOLDER])
+            self._in_degree.append(0)
+        return node_id
+
+    def _node(self, node_id: int) -> SimpleNode:
+        fqn = self._fqns[node_id]
+        name = self._names.get(node_id)
+        return SimpleNode(fqn, fqn.rpartition('.')[2] if name is None else name, NODE_TYPES[self._types[node_id]])
+
+    def _set_node(self, fqn: str, node: SimpleNode):
+        node_id = self._intern(fqn)
+        self._types[node_id] = NODE_TYPE_CODES[node.node_type]
+        if node.name == fqn.rpartition('.')[2]:
+            self._names.pop(node_id, None)
+        else:
+            self._names[node_id] = node.name
+
+    def _encode(self, relations: Iterable[str]) -> List[int]:
+        codes = []
+        for relation in relations:
+            code = self._relation_codes.get(relation)
+            if code is None:
+                code = self._relation_codes[relation] = len(self._relation_names)
+                self._relation_names.append(relation)
+            codes.append(code)
+        return codes
+
+    def _decode(self, codes: Sequence[int]) -> List[str]:
+        names = self._relation_names
+        return [names[code] for code in codes]
+
+    def _csr_index(self, source_id: int, target_id: int) -> int:
+        if source_id + 1 < len(self._offsets):
+            targets = self._targets
+            for index in range(self._offsets[source_id], self._offsets[source_id + 1]):
+                if targets[index] == target_id:
+                    return index
+        return -1
+
+    def _csr_codes(self, index: int) -> Sequence[int]:
+        codes = self._changed_relations.get(index)
+        if codes is None:
+            codes = self._relations[self._relation_offsets[index]:self._relation_offsets[index + 1]]
+        return codes
+
+    def _codes(self, source_id: int, target_id: int) -> Optional[Sequence[int]]:
+        index = self._csr_index(source_id, target_id)
+        if index >= 0:
+            return self._csr_codes(index)
+        return self._overlay.get(source_id, {}).get(target_id)
+
+    def _set_codes(self, source_id: int, target_id: int, codes: List[int]):
+        index = self._csr_index(source_id, target_id)
+        if index < 0:
+            self._overlay[source_id][target_id] = codes
+        elif len(codes) == self._relation_offsets[index + 1] - self._relation_offsets[index]:
+            self._changed_relations.pop(index, None)
+            self._relations[self._relation_offsets[index]:self._relation_offsets[index + 1]] = array('H', codes)
+        else:
+            self._changed_relations[index] = codes
+
+    def _remove_edge(self, source_id: int, target_id: int):
+        index = self._csr_index(source_id, target_id)
+        if index >= 0:
+            self._targets[index] = REMOVED_EDGE
+            self._changed_relations.pop(index, None)
+        else:
+            del self._overlay[source_id][target_id]
+        self._in_degree[target_id] -= 1
+        self._edge_count -= 1
+
+    def _out(self, source_id: int) -> Iterator[Tuple[int, Sequence[int]]]:
+        """
+        The targets and relation codes of a source, the CSR edges first, then the overlay.
+        """
+        if source_id + 1 < len(self._offsets):
+            targets = self._targets
+            for index in range(self._offsets[source_id], self._offsets[source_id + 1]):
+                if targets[index] != REMOVED_EDGE:
+                    yield targets[index], self._csr_codes(index)
+        yield from self._overlay.get(source_id, {}).items()
+
+    def _iter_edges(self) -> Iterator[Tuple[int, int, Sequence[int]]]:
+        for source_id, fqn in enumerate(self._fqns):
+            if fqn is not None:
+                for target_id, codes in self._out(source_id):
+                    yield source_id, target_id, codes
+
+
+class _NodeData(MutableMapping):
+    """
+    The attribute dict of a node, with its SimpleNode as 'data'.
+    """
+    __slots__ = ('_graph', '_fqn')
+
+    def __init__(self, graph: CompactGraph, fqn: str):
+        self._graph = graph
+        self._fqn = fqn
+
+    def __getitem__(self, key):
+        if key != 'data':
+            raise KeyError(key)
+        return self._graph._node(self._graph._ids[self._fqn])
+
+    def __setitem__(self, key, node: SimpleNode):
+        if key != 'data':
+            raise KeyError(key)
+        self._graph._set_node(self._fqn, node)
+
+    def __delitem__(self, key):
+        raise TypeError("every node of a CompactGraph has data")
+
+    def __iter__(self):
+        return iter(('data',))
+
+    def __len__(self):
+        return 1
+
+
+class _EdgeData(MutableMapping):
+    """
+    The attribute dict of an edge, with its list of relations as 'relation'.
+
+    The list is decoded on every read, changing it has no effect until it is assigned back.
+    """
+    __slots__ = ('_graph', '_source_id', '_target_id')
+
+    def __init__(self, graph: CompactGraph, source_id: int, target_id: int):
+        self._graph = graph
+        self._source_id = source_id
+        self._target_id = target_id
+
+    def __getitem__(self, key):
+        if key != 'relation':
+            raise KeyError(key)
+        return self._graph._decode(self._graph._codes(self._source_id, self._target_id))
+
+    def __setitem__(self, key, relations: List[str]):
+        if key != 'relation':
+            raise KeyError(key)
+        graph = self._graph
+        graph._set_codes(self._source_id, self._target_id, graph._encode(relations))
+
+    def __delitem__(self, key):
+        raise TypeError("every edge of a CompactGraph has a relation")
+
+    def __iter__(self):
+        return iter(('relation',))
+
+    def __len__(self):
+        return 1
+
+
+class _Adjacency(Mapping):
+    """
+    The successors of a node, mapped to the attribute dicts of the edges.
+    """
+    __slots__ = ('_graph', '_fqn')
+
+    def __init__(self, graph: CompactGraph, fqn: str):
+        self._graph = graph
+        self._fqn = fqn
+
+    def __getitem__(self, target: str) -> _EdgeData:
+        graph = self._graph
+        if not graph.has_edge(self._fqn, target):
+            raise KeyError(target)
+        return _EdgeData(graph, graph._ids[self._fqn], graph._ids[target])
+
+    def __iter__(self):
+        return self._graph.successors(self._fqn)
+
+    def __len__(self):
+        return sum(1 for _ in self._graph._out(self._graph._id(self._fqn)))
+
+    def items(self):
+        graph = self._graph
+        source_id = graph._id(self._fqn)
+        fqns = graph._fqns
+        return ((fqns[target_id], _EdgeData(graph, source_id, target_id)) for target_id, _ in graph._out(source_id))
+
+
+class _AdjacencyView(Mapping):
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph: CompactGraph):
+        self._graph = graph
+
+    def __getitem__(self, fqn: str) -> _Adjacency:
+        return self._graph[fqn]
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+
+class _NodeView(Mapping):
+    """
+    The nodes of the graph, with the same calling conventions as DiGraph.nodes.
+    """
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph: CompactGraph):
+        self._graph = graph
+
+    def __call__(self, data: bool = False):
+        if data:
+            graph = self._graph
+            return ((fqn, _NodeData(graph, fqn)) for fqn in graph)
+        return iter(self._graph)
+
+    def __getitem__(self, fqn: str) -> _NodeData:
+        if fqn not in self._graph:
+            raise KeyError(fqn)
+        return _NodeData(self._graph, fqn)
+
+    def __contains__(self, fqn) -> bool:
+        return fqn in self._graph
+
+    def __iter__(self):
+        return iter(self._graph)
+
+    def __len__(self):
+        return len(self._graph)
+
+
+class _EdgeView:
+    """
+    The edges of the graph, with the same calling conventions as DiGraph.edges.
+    """
+    __slots__ = ('_graph',)
+
+    def __init__(self, graph: CompactGraph):
+        self._graph = graph
+
+    def __call__(self, data: bool = False):
+        graph = self._graph
+        fqns = graph._fqns
+        if data:
+            return ((fqns[source_id], fqns[target_id], _EdgeData(graph, source_id, target_id))
+                    for source_id, target_id, _ in graph._iter_edges())
+        return ((fqns[source_id], fqns[target_id]) for source_id, target_id, _ in graph._iter_edges())
+
+    def __contains__(self, edge) -> bool:
+        return self._graph.has_edge(*edge)
+
+    def __iter__(self):
+        return self()
+
+    def __len__(self):
+        return self._graph.number_of_edges()
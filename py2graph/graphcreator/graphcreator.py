@@ -1,59 +1,349 @@
-from typing import Dict, Type, List
+import ast
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Type, List, Iterable, Iterator, Optional, Set, Tuple, Union
 
 import networkx as nx
 
+from py2graph.graphcreator.compactgraph import CompactGraph
+from py2graph.graphcreator.parsecache import ParseCache
 from py2graph.graphcreator.simplenode import SimpleNode
-from py2graph.parser.package import PackageParser
-from py2graph.parser.parser_interface import IParser, NodeType
+from py2graph.graphcreator.stats import PipelineStats
+from py2graph.graphcreator.symbolindex import SymbolIndex, ResolutionTier
+from py2graph.parser.package import PackageParser, read_module_ast
+from py2graph.parser.parser_interface import IParser, NodeType, DeferredParsingExpression, ModuleSource, \
+    ModuleLevels, ParsedEntity
+
+# modules sent to a worker process at once
+MODULE_CHUNKSIZE = 8
 
 
 class GraphCreator:
-    def __init__(self, graph: nx.DiGraph, parser_to_use: Dict[str, Type[IParser]]):
+    def __init__(self, graph: Union[nx.DiGraph, CompactGraph], parser_to_use: Dict[str, Type[IParser]],
+                 cache: Optional[ParseCache] = None, stats: Optional[PipelineStats] = None):
         self.graph = graph
-        self.deferred = []
         self.parser = parser_to_use
         self.parser["package"] = PackageParser
+        self.cache = cache
+        self.package_path = None
+        self.package_name = None
+        # module file path -> module source, module fqn -> fqns of the entities parsed from it, in parse order
+        self.module_sources: Dict[str, ModuleSource] = {}
+        self.module_nodes: Dict[str, Dict[str, None]] = {}
+        # target without a dot -> source -> [relation, resolved target] for every occurrence
+        self.dotless_references: Dict[str, Dict[str, List[List[str]]]] = {}
+        self.symbols = SymbolIndex()
+        self.stats = stats if stats is not None else PipelineStats()
+        # how often each resolution tier matched a relationship target
+        self.resolution_tiers: Counter = self.stats.resolution_tiers
 
-    def parse_package(self, package_path: str, package_name: str) -> None:
+    def parse_package(self, package_path: str, package_name: str, workers: int = 1) -> PipelineStats:
         """
         Parse the given package and update the graph by adding entities and resolving deferred items.
 
+        Modules are streamed: each one is read, parsed and reduced to its entities before the next one is
+        read, so no more than one module AST per worker is alive at a time.
+
         Args:
             package_path (str): The path to the package to be parsed.
             package_name (str): The name of the package to be parsed.
+            workers (int): Number of processes parsing modules, 1 parses them in this process.
 
         Returns:
-            None
+            The stats of the run, with the time of every stage and the counters of the graph.
         """
+        self.package_path = package_path
+        self.package_name = package_name
+        stats = self.stats
         parser = self.parser["package"](package_path)
-        entities, deferred = parser.parse("", package_name)
-        for entity in entities:
-            self._add_to_graph(entity)
-        self.deferred.extend(deferred)
+        package_entities = []
+
+        def module_sources():
+            for item in parser.iter_package(package_name):
+                if isinstance(item, ModuleSource):
+                    self.module_sources[os.path.abspath(item.path)] = item
+                    stats.files += 1
+                    stats.bytes += os.path.getsize(item.path)
+                    yield item
+                else:
+                    package_entities.append(item)
 
-        self._parse_deferred()
+        # discovering the modules is streamed into parsing them, they are one stage
+        with stats.stage("parse"):
+            module_levels = list(self._parse_modules(module_sources(), workers))
+        if self.cache is not None:
+            stats.cache_hits, stats.cache_misses = self.cache.hits, self.cache.misses
 
-        self.graph = link_upwards(self.graph, package_name)
-        inconsistent_nodes = self._check_graph_consistency(package_name)
+        self.add_module_levels(package_entities, module_levels)
 
+        with stats.stage("link_upwards"):
+            self.graph = link_upwards(self.graph, package_name)
+        with stats.stage("consistency_check"):
+            inconsistent_nodes = self._check_graph_consistency(package_name)
+        stats.count_graph(self.graph, len(inconsistent_nodes))
+
+        # on stderr, the diagram may be written to stdout
         if inconsistent_nodes:
-            print("Inconsistent nodes found (placeholders):")
+            print("Inconsistent nodes found (placeholders):", file=sys.stderr)
             # need to check what kind of method is expected. what is the difference between int and sum().
             # currently int leads to int, whereas sum() leads to package.sum
             for node_fqn in inconsistent_nodes:
-                print(f"- {node_fqn}")
+                print(f"- {node_fqn}", file=sys.stderr)
         else:
-            print("Graph is consistent. No placeholders remain.")
+            print("Graph is consistent. No placeholders remain.", file=sys.stderr)
+        return stats
 
-    def _parse_deferred(self):
-        while self.deferred:
-            deferred_expression = self.deferred.pop(0)
-            next_parser = self.parser[deferred_expression.context](deferred_expression.imported_fqn)
-            entity, more_deferred = next_parser.parse(deferred_expression.node, deferred_expression.fqn)
-            self._add_to_graph(entity)
-            self.deferred.extend(more_deferred)
+    def add_module_levels(self, package_entities: List[ParsedEntity], module_levels: List[ModuleLevels]) -> None:
+        """
+        Add the entities of the packages and of the parsed modules to the graph, the stages "declare" and
+        "add_to_graph" of parse_package.
+
+        Every symbol is declared first, so resolving a target does not depend on the parse order, then the
+        entities are added level by level, in the order the deferred queue visits them.
+
+        Args:
+            package_entities (list): The entities of the packages.
+            module_levels (list): The parsed entities of every module, grouped by their depth.
+
+        Returns:
+            None
+        """
+        with self.stats.stage("declare"):
+            for entity in package_entities:
+                self.symbols.declare(entity)
+            for levels in module_levels:
+                self._declare_module(levels)
+                self.stats.count_deferred(levels)
+
+        with self.stats.stage("add_to_graph"):
+            self._add_entities(chain(package_entities, iter_module_levels(module_levels)))
+            for levels in module_levels:
+                self._record_module(levels)
+
+    def update_module(self, module_path: str) -> None:
+        """
+        Parse a single module file again and replace the part of the graph it owns.
+
+        The nodes and edges of the previous version are dropped and the new entities are added. References
+        from other modules to names the module defined or defines are resolved again, and only the classes
+        of the module are linked upwards again. The cost depends on the size of the module, not of the package.
+
+        Args:
+            module_path (str): Path of a module in the parsed package, it may be new.
+
+        Returns:
+            None
+        """
+        key = os.path.abspath(module_path)
+        module_source = self.module_sources.get(key) or self._new_module_source(module_path)
+        levels = next(self._parse_modules([module_source], 1))
+
+        previous_nodes, released = self._drop_module(module_source.fqn)
+        self._declare_module(levels)
+        for level in levels:
+            for entity in level:
+                self._add_to_graph(entity)
+        self.module_sources[key] = module_source
+        self._record_module(levels)
+        nodes = self.module_nodes[module_source.fqn]
+
+        parent_fqn = module_source.fqn.rsplit('.', 1)[0]
+        if parent_fqn in self.graph and self.graph.nodes[parent_fqn]['data'].node_type == NodeType.PACKAGE and \
+                not self.graph.has_edge(parent_fqn, module_source.fqn):
+            self._add_edge(parent_fqn, module_source.fqn, "contains")
+
+        self._resolve_again(previous_nodes ^ nodes.keys(), module_source.fqn, released)
+        self._remove_orphans(previous_nodes - nodes.keys(), released)
+        # in parse order like a full parse, the last attribute of a class decides its relation to a type
+        link_upwards(self.graph, self.package_name, nodes)
+
+    def remove_module(self, module_path: str) -> None:
+        """
+        Remove a module file from the graph, as if it had never been parsed.
+
+        Symbols of the module that other modules still refer to remain as placeholders.
+
+        Args:
+            module_path (str): Path of a module in the parsed package.
+
+        Returns:
+            None
+        """
+        key = os.path.abspath(module_path)
+        if key not in self.module_sources:
+            raise ValueError(f"Unknown module: {module_path}. It is not part of the parsed package.")
+        module_source = self.module_sources.pop(key)
+
+        parent_fqn = module_source.fqn.rsplit('.', 1)[0]
+        if self.graph.has_edge(parent_fqn, module_source.fqn):
+            self.graph.remove_edge(parent_fqn, module_source.fqn)
+        previous_nodes, released = self._drop_module(module_source.fqn)
+
+        self._resolve_again(previous_nodes, module_source.fqn, released)
+        self._remove_orphans(previous_nodes, released)
+
+    def _new_module_source(self, module_path: str) -> ModuleSource:
+        if self.package_name is None:
+            raise ValueError("No package has been parsed yet.")
+        path = Path(module_path)
+        # same naming as PackageParser, which only uses the name of the innermost directory
+        if path.parent.resolve() == Path(self.package_path).resolve():
+            return ModuleSource(fqn=f"{self.package_name}.{path.stem}", path=str(path))
+        return ModuleSource(fqn=f"{self.package_name}.{path.parent.name}.{path.stem}", path=str(path))
+
+    def _declare_module(self, levels: ModuleLevels):
+        for level in levels:
+            for entity in level:
+                self.symbols.declare(entity)
+
+    def _record_module(self, levels: ModuleLevels):
+        module_fqn = levels[0][0].fqn
+        self.module_nodes[module_fqn] = dict.fromkeys(entity.fqn for level in levels for entity in level)
+
+    def _drop_module(self, module_fqn: str):
+        """
+        Remove the edges a module owns, and its nodes unless other modules refer to them.
+
+        Returns:
+            The nodes the module owned and the targets of its removed edges.
+        """
+        nodes = set(self.module_nodes.pop(module_fqn, {}))
+        released = set()
+        for node_fqn in nodes:
+            self.symbols.discard(node_fqn)
+            if node_fqn not in self.graph:
+                continue
+            for target in list(self.graph.successors(node_fqn)):
+                references = self.dotless_references.get(target.split('.')[-1], {})
+                references.pop(node_fqn, None)
+                self.graph.remove_edge(node_fqn, target)
+                released.add(target)
+        for node_fqn in nodes:
+            if node_fqn not in self.graph:
+                continue
+            if self.graph.in_degree(node_fqn) == 0:
+                self.graph.remove_node(node_fqn)
+            else:
+                self.graph.nodes[node_fqn]['data'] = SimpleNode(node_fqn, node_fqn.split('.')[-1],
+                                                                NodeType.PLACEHOLDER)
+        return nodes, released
+
+    def _resolve_again(self, changed_nodes: Set[str], module_fqn: str, released: Set[str]):
+        """
+        Resolve the targets without a dot again that may now point at one of the changed nodes.
+        """
+        own_prefix = module_fqn + '.'
+        for name in {node_fqn.split('.')[-1] for node_fqn in changed_nodes}:
+            for source, references in self.dotless_references.get(name, {}).items():
+                if source == module_fqn or source.startswith(own_prefix):
+                    continue
+                for reference in references:
+                    relation, target = reference
+                    resolved, _ = self.symbols.resolve(source, name)
+                    if resolved != target:
+                        self._remove_relation(source, target, relation)
+                        released.add(target)
+                        self._add_edge(source, resolved, relation)
+                        reference[1] = resolved
+
+    def _remove_relation(self, source: str, target: str, relation: str):
+        relations = self.graph[source][target]['relation']
+        relations.remove(relation)
+        if relations:
+            # assign the list back, a CompactGraph decodes a new list on every read
+            self.graph[source][target]['relation'] = relations
+        else:
+            self.graph.remove_edge(source, target)
+
+    def _remove_orphans(self, node_fqns: Set[str], released: Set[str]):
+        """
+        Remove the placeholders nothing refers to anymore.
+        """
+        for node_fqn in node_fqns | released:
+            if node_fqn in self.graph and self.graph.nodes[node_fqn]['data'].node_type == NodeType.PLACEHOLDER \
+                    and self.graph.in_degree(node_fqn) == 0:
+                self.graph.remove_node(node_fqn)
+
+    def _parse_modules(self, module_sources: Iterable[ModuleSource], workers: int) -> Iterator[ModuleLevels]:
+        if workers < 1:
+            raise ValueError(f"Invalid number of workers: {workers}. Expected at least 1.")
+        parse = partial(parse_module_source, parser_to_use=self.parser)
+        if self.cache is not None:
+            parse = partial(self.cache.parse, parse_module=parse)
+
+        if workers == 1:
+            results = map(parse, module_sources)
+            yield from self._record_cache_hits(results)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(parse, module_sources, chunksize=MODULE_CHUNKSIZE)
+            yield from self._record_cache_hits(results)
+
+    def _record_cache_hits(self, results) -> Iterator[ModuleLevels]:
+        if self.cache is None:
+            yield from results
+            return
+        for levels, hit in results:
+            self.cache.record(hit)
+            yield levels
+
+    def _add_entities(self, entities: Iterable[ParsedEntity]):
+        """
+        Add many entities at once, for a graph in which every symbol they declare is already known.
+
+        The nodes and edges are collected first, with the relations of every edge merged and placeholders
+        upgraded in place, then inserted with add_nodes_from and add_edges_from. The result is the same
+        as adding the entities one by one with _add_to_graph.
+        """
+        graph = self.graph
+        resolve = self.symbols.resolve
+        tiers = self.resolution_tiers
+        dotless = (ResolutionTier.LOCAL, ResolutionTier.UNRESOLVED)
+        # insertion order matches _add_to_graph, dicts keep it
+        nodes: Dict[str, SimpleNode] = {}
+        edges: Dict[str, Dict[str, List[str]]] = {}
+        for entity in entities:
+            node = nodes.get(entity.fqn)
+            if node is None and entity.fqn in graph:
+                node = graph.nodes[entity.fqn]['data']
+            if node is None or node.node_type == NodeType.PLACEHOLDER:
+                nodes[entity.fqn] = SimpleNode(entity.fqn, entity.name, entity.entity_type)
+
+            for source, target, relation in entity.relationships:
+                target = target or 'None'
+                resolved, tier = resolve(source, target)
+                tiers[tier] += 1
+                if tier in dotless:
+                    self.dotless_references.setdefault(target, {}).setdefault(source, []).append([relation, resolved])
+
+                if resolved not in nodes and resolved not in graph:
+                    nodes[resolved] = SimpleNode(resolved, resolved.split('.')[-1], NodeType.PLACEHOLDER)
+                targets = edges.get(source)
+                if targets is None:
+                    targets = edges[source] = {}
+                relations = targets.get(resolved)
+                if relations is None:
+                    targets[resolved] = [relation]
+                else:
+                    relations.append(relation)
+
+        graph.add_nodes_from((fqn, {'data': node}) for fqn, node in nodes.items())
+        if graph.number_of_edges():
+            for source, targets in edges.items():
+                for target, relations in targets.items():
+                    if graph.has_edge(source, target):
+                        relations[:0] = graph[source][target]['relation']
+        graph.add_edges_from((source, target, {'relation': relations})
+                             for source, targets in edges.items() for target, relations in targets.items())
 
     def _add_to_graph(self, entity):
+        self.symbols.declare(entity)
         if entity.fqn in self.graph:
             existing_node = self.graph.nodes[entity.fqn]['data']
             if existing_node.node_type == NodeType.PLACEHOLDER:
@@ -65,27 +355,26 @@ class GraphCreator:
             target = target or 'None'
 
             # Resolve target module if necessary
-            # spaghetti code, we search for the module by brute force
-            # first look in the same class, then module, then package
-            if "." not in target:
-                for i in range(1, 4):
-                    source_module = '.'.join(source.split('.')[:-i])
-                    real_target = f"{source_module}.{target}"
-                    if real_target in self.graph:
-                        target = real_target
-                        break
-
-            # Add placeholder node if target doesn't exist
-            if target not in self.graph:
-                self.graph.add_node(target, data=SimpleNode(target, target.split('.')[-1], NodeType.PLACEHOLDER))
-
-            # Add or update edge
-            if not self.graph.has_edge(source, target):
-                self.graph.add_edge(source, target, relation=[relation])
-            else:
-                existing_data = self.graph.get_edge_data(source, target)['relation']
-                existing_data.append(relation)
-                self.graph.add_edge(source, target, relation=existing_data)
+            resolved, tier = self.symbols.resolve(source, target)
+            self.resolution_tiers[tier] += 1
+            if tier in (ResolutionTier.LOCAL, ResolutionTier.UNRESOLVED):
+                # remember the name, another module may define it later on
+                self.dotless_references.setdefault(target, {}).setdefault(source, []).append([relation, resolved])
+
+            self._add_edge(source, resolved, relation)
+
+    def _add_edge(self, source: str, target: str, relation: str):
+        # Add placeholder node if target doesn't exist
+        if target not in self.graph:
+            self.graph.add_node(target, data=SimpleNode(target, target.split('.')[-1], NodeType.PLACEHOLDER))
+
+        # Add or update edge
+        if not self.graph.has_edge(source, target):
+            self.graph.add_edge(source, target, relation=[relation])
+        else:
+            existing_data = self.graph.get_edge_data(source, target)['relation']
+            existing_data.append(relation)
+            self.graph.add_edge(source, target, relation=existing_data)
 
     def _check_graph_consistency(self, package_name: str = '') -> List[str]:
         inconsistent_nodes = []
@@ -96,15 +385,76 @@ class GraphCreator:
         return inconsistent_nodes
 
 
-def link_upwards(graph, root_package_fqn):
+def iter_module_levels(module_levels: List[ModuleLevels]) -> Iterator[ParsedEntity]:
+    """
+    Merge the per-module results level by level, which is the order the deferred queue visits them.
+    """
+    depth = max((len(levels) for levels in module_levels), default=0)
+    for level in range(depth):
+        for levels in module_levels:
+            if level < len(levels):
+                yield from levels[level]
+
+
+def parse_module_source(module_source: ModuleSource, parser_to_use: Dict[str, Type[IParser]],
+                        source_code: Optional[bytes] = None) -> ModuleLevels:
+    """
+    Read and parse a single module, then run it through the module, class, method and body parsers.
+
+    Args:
+        module_source (ModuleSource): The module file and its fully-qualified name.
+        parser_to_use (dict): The parser for each deferred context. If it has an "extractor", that
+            extracts all entities of the module at once instead.
+        source_code (bytes): The content of the module file, if it has already been read.
+
+    Returns:
+        The parsed entities grouped by their depth in the deferred chain, the module entity first.
+    """
+    return parse_module_ast(read_module_ast(module_source, source_code), module_source.fqn, parser_to_use)
+
+
+def parse_module_ast(module_ast: ast.Module, module_fqn: str,
+                     parser_to_use: Dict[str, Type[IParser]]) -> ModuleLevels:
+    """
+    Run the AST of a module through the module, class, method and body parsers, or the extractor.
+
+    Returns:
+        The parsed entities grouped by their depth in the deferred chain, the module entity first.
+    """
+    if "extractor" in parser_to_use:
+        # the single-pass replacement of the parser chain
+        return parser_to_use["extractor"](module_fqn).extract(module_ast)
+
+    deferred = [DeferredParsingExpression(fqn=module_fqn, node=module_ast, context="module", imported_fqn={})]
+    levels = []
+    while deferred:
+        entities = []
+        next_deferred = []
+        for deferred_expression in deferred:
+            next_parser = parser_to_use[deferred_expression.context](deferred_expression.imported_fqn)
+            entity, more_deferred = next_parser.parse(deferred_expression.node, deferred_expression.fqn)
+            entities.append(entity)
+            next_deferred.extend(more_deferred)
+        levels.append(entities)
+        deferred = next_deferred
+    return levels
+
+
+def link_upwards(graph, root_package_fqn, node_fqns=None):
     """
     Links attributes, methods, and method bodies upwards to their respective classes or packages.
 
     Args:
         graph (nx.DiGraph): The directed graph representing the codebase.
         root_package_fqn (str): Fully-qualified name of the root package to check for type containment.
+        node_fqns (iterable): Only link these nodes, in this order, all nodes of the graph if None.
     """
-    for node_fqn, node_data in graph.nodes(data=True):
+    if node_fqns is None:
+        nodes = list(graph.nodes(data=True))
+    else:
+        nodes = [(node_fqn, graph.nodes[node_fqn]) for node_fqn in node_fqns if node_fqn in graph]
+
+    for node_fqn, node_data in nodes:
         node = node_data['data']
         if node.node_type == NodeType.ATTRIBUTE:
             # Handle attributes: link to class with a "defines" relationship
@@ -125,7 +475,7 @@ def link_upwards(graph, root_package_fqn):
     attribute_edges = ['composition', 'aggregation', 'has_attribute_with_type']
 
     # check that no duplicate edges are in the graph
-    for node_fqn, node_data in graph.nodes(data=True):
+    for node_fqn, node_data in nodes:
         node = node_data['data']
         if node.node_type == NodeType.CLASS:
             # Dictionary to track if a word from attribute_edges is already added
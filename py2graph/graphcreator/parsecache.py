@@ -0,0 +1,118 @@
+import hashlib
+import os
+import pickle
+import platform
+import sys
+import tempfile
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Type
+
+from py2graph import __version__
+from py2graph.parser.parser_interface import IParser, ModuleSource, ModuleLevels
+
+# bump when the layout of a cache entry changes
+CACHE_FORMAT = 2
+
+DEFAULT_CACHE_DIR = '.py2graph_cache'
+
+
+@dataclass
+class CacheEntry:
+    mtime_ns: int
+    size: int
+    content_hash: str
+    levels: ModuleLevels
+
+
+class ParseCache:
+    """
+    Persistent cache of the entities parsed from each module.
+
+    An entry is looked up by the module path and fqn, the py2graph and Python versions and the parsers in use.
+    It is valid while the mtime and size of the file are unchanged, or else while its content hash is.
+    Entries are replaced atomically, so several runs can share one cache directory.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, parser_to_use: Optional[Dict[str, Type[IParser]]] = None):
+        self.cache_dir = Path(cache_dir)
+        parsers = sorted(f"{context}={parser.__module__}.{parser.__qualname__}"
+                         for context, parser in (parser_to_use or {}).items())
+        self.salt = '|'.join([str(CACHE_FORMAT), __version__, platform.python_implementation(),
+                              '.'.join(map(str, sys.version_info[:3]))] + parsers)
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, module_source: ModuleSource,
+              parse_module: Callable[[ModuleSource, bytes], ModuleLevels]) -> Tuple[ModuleLevels, bool]:
+        """
+        Return the entities of a module from the cache, or parse the module and store them.
+
+        Args:
+            module_source (ModuleSource): The module to parse.
+            parse_module (callable): Parses the module from its source code on a cache miss.
+
+        Returns:
+            The entities grouped by depth and whether they were found in the cache.
+        """
+        entry_path = self._entry_path(module_source)
+        entry = self._load(entry_path)
+        stat = os.stat(module_source.path)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry.levels, True
+
+        with open(module_source.path, 'rb') as f:
+            source_code = f.read()
+        content_hash = hashlib.sha256(source_code).hexdigest()
+        if entry is not None and entry.content_hash == content_hash:
+            # touched but unchanged, refresh the metadata to skip hashing next time
+            self._store(entry_path, replace(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size))
+            return entry.levels, True
+
+        levels = parse_module(module_source, source_code=source_code)
+        self._store(entry_path, CacheEntry(stat.st_mtime_ns, stat.st_size, content_hash, levels))
+        return levels, False
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def _entry_path(self, module_source: ModuleSource) -> Path:
+        key = '|'.join([self.salt, module_source.fqn, os.path.abspath(module_source.path)])
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return self.cache_dir / digest[:2] / f"{digest}.pickle"
+
+    @staticmethod
+    def _load(entry_path: Path) -> Optional[CacheEntry]:
+        try:
+            with open(entry_path, 'rb') as f:
+                entry = pickle.load(f)
+        except Exception:
+            # missing, unreadable or written by an incompatible version, parse again
+            return None
+        return entry if isinstance(entry, CacheEntry) else None
+
+    @staticmethod
+    def _store(entry_path: Path, entry: CacheEntry):
+        # the cache is an optimisation, a read-only or full disk must not stop the parse
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=entry_path.parent, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # readers see either the previous entry or this one, never a partial write
+            os.replace(temp_path, entry_path)
+        except Exception:
+            # a full disk, or levels that do not pickle, pickle raises more than PicklingError
+            pass
+        finally:
+            # left over unless it was moved into place
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
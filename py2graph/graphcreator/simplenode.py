@@ -2,6 +2,8 @@ from py2graph.parser.parser_interface import NodeType
 
 
 class SimpleNode:
+    __slots__ = ('fqn', 'name', 'node_type')
+
     def __init__(self, fqn: str, name: str, node_type: NodeType):
         if not isinstance(node_type, NodeType):
             raise ValueError(f"Invalid node_type: {node_type}. Expected a NodeType enum value.")
@@ -0,0 +1,130 @@
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+from py2graph.graphcreator.symbolindex import ResolutionTier
+from py2graph.parser.parser_interface import ModuleLevels
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the peak memory is not measured there
+    resource = None
+
+
+def peak_rss_mib() -> Optional[float]:
+    """
+    The peak resident set size of this process so far, None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes everywhere else
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+@dataclass
+class StageStats:
+    wall_seconds: float
+    cpu_seconds: float
+    # of the whole process up to the end of the stage
+    peak_rss_mib: Optional[float]
+
+
+# called with the name of a stage and the stats when the stage ends
+StageHook = Callable[[str, "PipelineStats"], None]
+
+
+class PipelineStats:
+    """
+    Timings and counters of a run of the py2graph pipeline.
+
+    Every stage records its wall time, the CPU time of this process, which leaves out worker processes, and
+    the peak RSS when it ended. The counters are the files and bytes parsed, the deferred expressions by
+    their context, the nodes by type and edges by relation of the graph, the placeholders left in the
+    package and how often each resolution tier matched a relationship target.
+
+    The hooks are called whenever a stage ends, embedding applications register them to follow a run.
+    """
+
+    def __init__(self, hooks: Iterable[StageHook] = ()):
+        self.hooks: List[StageHook] = list(hooks)
+        self.stages: Dict[str, StageStats] = {}
+        self.files = 0
+        self.bytes = 0
+        self.deferred: Counter = Counter()
+        self.nodes: Counter = Counter()
+        self.edges: Counter = Counter()
+        self.placeholders = 0
+        self.resolution_tiers: Counter = Counter()
+        self.cache_hits: Optional[int] = None
+        self.cache_misses: Optional[int] = None
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measure the code run in the with block as the stage name, a stage run again adds to its times.
+        """
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        yield
+        wall_seconds, cpu_seconds = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        previous = self.stages.get(name)
+        if previous is not None:
+            wall_seconds += previous.wall_seconds
+            cpu_seconds += previous.cpu_seconds
+        self.stages[name] = StageStats(wall_seconds, cpu_seconds, peak_rss_mib())
+        for hook in self.hooks:
+            hook(name, self)
+
+    def count_deferred(self, levels: ModuleLevels):
+        """
+        Count the deferred expressions of a module, every parsed entity is the result of one.
+        """
+        for level in levels:
+            for entity in level:
+                # the name and not the value, some NodeType values are tuples
+                self.deferred[entity.entity_type.name.lower()] += 1
+
+    def count_graph(self, graph, placeholders: int):
+        """
+        Count the nodes and edges of the graph, from scratch.
+        """
+        self.nodes = Counter(node_data['data'].node_type.name.lower() for _, node_data in graph.nodes(data=True))
+        self.edges = Counter(relation for _, _, edge_data in graph.edges(data=True)
+                             for relation in edge_data['relation'])
+        self.placeholders = placeholders
+
+    @property
+    def wall_seconds(self) -> float:
+        return sum(stage.wall_seconds for stage in self.stages.values())
+
+    def to_dict(self) -> dict:
+        result = {"wall_seconds": self.wall_seconds,
+                  "stages": {name: asdict(stage) for name, stage in self.stages.items()},
+                  "files": self.files,
+                  "bytes": self.bytes,
+                  "deferred": dict(self.deferred),
+                  "nodes": dict(self.nodes),
+                  "edges": dict(self.edges),
+                  "placeholders": self.placeholders,
+                  "resolution_tiers": {tier.value: self.resolution_tiers[tier] for tier in ResolutionTier}}
+        if self.cache_hits is not None:
+            result["cache"] = {"hits": self.cache_hits, "misses": self.cache_misses}
+        return result
+
+    def to_text(self) -> str:
+        lines = [f"{name}: {stage.wall_seconds:.3f} s wall, {stage.cpu_seconds:.3f} s CPU"
+                 + (f", peak RSS {stage.peak_rss_mib} MiB" if stage.peak_rss_mib is not None else "")
+                 for name, stage in self.stages.items()]
+        lines.append(f"Parsed {self.files} files, {self.bytes} bytes")
+        lines.append(f"Graph: {sum(self.nodes.values())} nodes, {sum(self.edges.values())} relations, "
+                     f"{self.placeholders} placeholders in the package")
+        if self.cache_hits is not None:
+            lines.append(f"Parse cache: {self.cache_hits} hits, {self.cache_misses} misses")
+        lines.append("Resolved targets: " + ", ".join(f"{self.resolution_tiers[tier]} {tier.value}"
+                                                      for tier in ResolutionTier))
+        lines.append(f"Execution time: {self.wall_seconds} seconds")
+        return '\n'.join(lines)
@@ -0,0 +1,72 @@
+from enum import Enum
+from typing import Dict, Set, Tuple
+
+from py2graph.parser.parser_interface import ParsedEntity
+
+# relationships that declare their target as a member of the source scope
+DECLARING_RELATIONS = {"contains", "defines"}
+
+
+class ResolutionTier(Enum):
+    LOCAL = "local"  # name without a dot, defined in an enclosing scope of the source
+    QUALIFIED = "qualified"  # qualified name of a parsed symbol, from an import or the package structure
+    EXTERNAL = "external"  # qualified name outside of the parsed package, e.g. typing.List
+    UNRESOLVED = "unresolved"  # name without a dot that no enclosing scope defines, e.g. a builtin
+
+
+class SymbolIndex:
+    """
+    The names declared in every package, module, class and method scope.
+
+    Resolving a target only depends on the declared symbols, not on the order entities are added to the graph.
+    """
+
+    def __init__(self):
+        self.scopes: Dict[str, Set[str]] = {}
+
+    def __contains__(self, fqn: str) -> bool:
+        scope, _, name = fqn.rpartition('.')
+        return name in self.scopes.get(scope, ())
+
+    def add(self, fqn: str):
+        scope, _, name = fqn.rpartition('.')
+        self.scopes.setdefault(scope, set()).add(name)
+
+    def discard(self, fqn: str):
+        scope, _, name = fqn.rpartition('.')
+        names = self.scopes.get(scope)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self.scopes[scope]
+
+    def declare(self, entity: ParsedEntity):
+        """
+        Add an entity and the members it declares.
+        """
+        self.add(entity.fqn)
+        for _, target, relation in entity.relationships:
+            if relation in DECLARING_RELATIONS and target:
+                self.add(target)
+
+    def resolve(self, source: str, target: str) -> Tuple[str, ResolutionTier]:
+        """
+        Resolve the target of a relationship.
+
+        A name without a dot is looked up in the three scopes enclosing the source, innermost first:
+        the class, then the module, then the package of a method body.
+
+        Returns:
+            The fully-qualified target and how it was resolved.
+        """
+        if '.' in target:
+            return target, ResolutionTier.QUALIFIED if target in self else ResolutionTier.EXTERNAL
+
+        scope = source
+        for _ in range(3):
+            scope = scope.rpartition('.')[0]
+            if not scope:
+                break
+            if target in self.scopes.get(scope, ()):
+                return f"{scope}.{target}", ResolutionTier.LOCAL
+        return target, ResolutionTier.UNRESOLVED
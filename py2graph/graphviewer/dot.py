@@ -0,0 +1,174 @@
+from typing import Dict, Iterator, List
+
+import networkx as nx
+
+from py2graph.graphviewer.exporters import dot_id
+from py2graph.graphviewer.puml import PumlGenerator
+from py2graph.parser.parser_interface import NodeType
+
+DOT_FILE_START = """digraph {diagram_name} {{
+  layout={engine};
+{engine_attributes}
+  node [fontname="Helvetica", fontsize=10, shape={shape}];
+  edge [fontname="Helvetica", fontsize=8];"""
+
+DOT_FILE_END = """}"""
+
+DOT_CONTENT_HASH_TPL = """  // content-hash: sha256:{content_hash}"""
+
+# graph attributes for every layout engine, dot ranks the classes, the force-directed engines scale to
+# graphs with many thousand classes but ignore the clusters
+ENGINE_ATTRIBUTES: Dict[str, List[str]] = {
+    "dot": ["rankdir=BT", "newrank=true", "compound=true"],
+    "fdp": ["overlap=prism", "splines=true"],
+    "sfdp": ["overlap=prism", "quadtree=fast", "splines=false", "outputorder=edgesfirst"],
+    "neato": ["mode=sgd", "overlap=prism", "splines=false", "outputorder=edgesfirst"],
+}
+
+# edge attributes for the PlantUML arrows of _map_relation_type
+DOT_EDGE_STYLES = {
+    '--|>': 'arrowhead=empty',
+    '-->': 'arrowhead=vee',
+    '*--': 'dir=back, arrowtail=diamond',
+    'o--': 'dir=back, arrowtail=odiamond',
+}
+
+INDENT = "  "
+
+
+class DotGenerator(PumlGenerator):
+    """
+    Renders the class diagram of a graph as Graphviz DOT, for diagrams too large for PlantUML.
+
+    Packages and modules become nested cluster subgraphs, classes are record nodes with their attributes
+    and methods, the free functions of a module one node next to its classes. Relationships are the ones
+    of the PUML diagram, styled by their PlantUML arrow.
+
+    The engine sets the layout and its attributes: dot for a ranked diagram with clusters, sfdp or neato for
+    very large ones, which lay out faster but do not draw clusters. Without details, classes are plain boxes
+    and relationships have no labels, which keeps the output of large diagrams small.
+    """
+
+    def __init__(self, graph: nx.DiGraph, diagram_name: str = "", deterministic: bool = False,
+                 engine: str = "dot", details: bool = True):
+        if engine not in ENGINE_ATTRIBUTES:
+            raise ValueError(f"Unknown Graphviz engine {engine}, expected one of {', '.join(ENGINE_ATTRIBUTES)}")
+        super().__init__(graph, diagram_name, deterministic)
+        self.engine = engine
+        self.details = details
+
+    def _iter_content(self) -> Iterator[str]:
+        """
+        Yield the lines of the diagram from the file start up to the last relationship.
+        """
+        yield self._puml_file_start()
+        self.visited = set()
+        self._build_indexes()
+        nodes = self._nodes
+
+        modules = [node_fqn for node_fqn in (sorted(nodes) if self.deterministic else nodes)
+                   if nodes[node_fqn].node_type is NodeType.MODULE]
+        packages: Dict[str, List[str]] = {"": []}
+        for module_fqn in modules:
+            package = module_fqn.rpartition('.')[0]
+            while package not in packages:
+                packages[package] = []
+                package = package.rpartition('.')[0]
+        for name in packages:
+            if name:
+                packages[name.rpartition('.')[0]].append(name)
+        if self.deterministic:
+            for children in packages.values():
+                children.sort()
+        yield from self._iter_cluster("", packages, modules, 0)
+
+        for source, relation, target, extra in self._iter_relationships():
+            attributes = DOT_EDGE_STYLES[relation]
+            if self.details and extra:
+                attributes += f", label={dot_id(extra.lstrip(': '))}"
+            yield f"{INDENT}{dot_id(source)} -> {dot_id(target)} [{attributes}];"
+
+    def _iter_cluster(self, package: str, packages: Dict[str, List[str]], modules: List[str],
+                      depth: int) -> Iterator[str]:
+        """
+        Yield the cluster of a package with the clusters of its subpackages and modules.
+        """
+        indent = INDENT * depth
+        if package:
+            yield f"{indent}subgraph {dot_id('cluster_' + package)} {{"
+            yield f"{indent}{INDENT}label={dot_id(package.rpartition('.')[2])};"
+        for subpackage in packages[package]:
+            yield from self._iter_cluster(subpackage, packages, modules, depth + 1)
+        for module_fqn in modules:
+            if module_fqn.rpartition('.')[0] != package or module_fqn in self.visited:
+                continue
+            lines = list(self._dfs_stack(module_fqn))
+            if not lines:
+                continue
+            yield f"{indent}{INDENT}subgraph {dot_id('cluster_' + module_fqn)} {{"
+            yield f"{indent}{INDENT * 2}label={dot_id(module_fqn.rpartition('.')[2])}; style=dashed;"
+            for line in lines:
+                yield f"{indent}{INDENT * 2}{line}"
+            yield f"{indent}{INDENT}}}"
+        if package:
+            yield f"{indent}}}"
+
+    def _process_class(self, class_fqn):
+        """
+        Process a class node, yielding its node.
+        """
+        name = class_fqn.rpartition('.')[2]
+        if self._is_abstract(class_fqn):
+            name = f"«abstract» {name}"
+        if not self.details:
+            yield f"{dot_id(class_fqn)} [label={dot_id(name)}];"
+            return
+        attributes, methods = self._class_members(class_fqn)
+        fields = [_record_field([name]),
+                  _record_field([f"{attr_name}: {attr_type}" for attr_name, attr_type in attributes]),
+                  _record_field(methods)]
+        yield f"{dot_id(class_fqn)} [label={_record_label(fields)}];"
+
+    def _process_module(self, module_fqn):
+        """
+        Process a module node, yielding the node of its free functions.
+        """
+        methods = self._module_functions(module_fqn)
+        if len(methods) == 0:
+            return
+        node_id = dot_id(f"{module_fqn}.Methods")
+        if not self.details:
+            yield f"{node_id} [label=\"Methods\", style=rounded];"
+            return
+        fields = [_record_field(["Methods"]), _record_field(methods)]
+        yield f"{node_id} [label={_record_label(fields)}, style=rounded];"
+
+    def _puml_file_start(self):
+        return DOT_FILE_START.format(diagram_name=dot_id(self.diagram_name or "py2graph"), engine=self.engine,
+                                     engine_attributes='\n'.join(f"{INDENT}{attribute};"
+                                                                 for attribute in ENGINE_ATTRIBUTES[self.engine]),
+                                     shape="record" if self.details else "box")
+
+    def _puml_file_end(self):
+        return DOT_FILE_END
+
+    def _content_hash_comment(self, content_hash: str):
+        return DOT_CONTENT_HASH_TPL.format(content_hash=content_hash)
+
+
+def _record_field(lines: List[str]) -> str:
+    """
+    A field of a record label, its lines left aligned.
+    """
+    return ''.join(f"{line.translate(RECORD_ESCAPES)}\\l" for line in lines)
+
+
+def _record_label(fields: List[str]) -> str:
+    """
+    The quoted label of a record with its fields stacked vertically.
+    """
+    return '"{' + '|'.join(fields) + '}"'
+
+
+# characters with a meaning in record labels or quoted strings
+RECORD_ESCAPES = str.maketrans({character: f"\\{character}" for character in '\\{}|<>"'})
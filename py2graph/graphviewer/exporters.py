@@ -0,0 +1,119 @@
+"""
+Machine-readable exports of the graph GraphCreator builds: JSON, GraphML and DOT.
+
+Every exporter writes to a text file object while it walks the graph, one node or edge at a time, so the
+export of a large graph never holds more than one record in memory besides the graph itself. With
+deterministic, nodes and edges are sorted by fqn, which needs a sorted list of them.
+"""
+import json
+from typing import Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from py2graph.graphcreator.simplenode import SimpleNode
+
+GRAPHML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns"
+    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+    xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">
+  <key id="name" for="node" attr.name="name" attr.type="string"/>
+  <key id="type" for="node" attr.name="type" attr.type="string"/>
+  <key id="relation" for="edge" attr.name="relation" attr.type="string"/>
+  <graph id="py2graph" edgedefault="directed">
+"""
+GRAPHML_FOOTER = """  </graph>
+</graphml>
+"""
+
+# the separator of the relations of an edge in the single relation attribute of GraphML and DOT
+RELATION_SEPARATOR = ","
+
+
+def node_type_name(node: Optional[SimpleNode]) -> Optional[str]:
+    """
+    The lower case name of the type of a node, None for nodes without data.
+    """
+    # the name and not the value, some NodeType values are tuples
+    return node.node_type.name.lower() if node is not None else None
+
+
+def iter_nodes(graph, deterministic: bool = False) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """
+    The fqn, name and type name of every node.
+    """
+    nodes = graph.nodes(data=True)
+    for fqn, node_data in sorted(nodes, key=lambda item: item[0]) if deterministic else nodes:
+        node = node_data.get('data')
+        yield fqn, node.name if node is not None else fqn.rpartition('.')[2], node_type_name(node)
+
+
+def iter_edges(graph, deterministic: bool = False) -> Iterator[Tuple[str, str, List[str]]]:
+    """
+    The source, target and relations of every edge.
+    """
+    edges = graph.edges(data=True)
+    for source, target, edge_data in sorted(edges, key=lambda item: item[:2]) if deterministic else edges:
+        relations = edge_data.get('relation') or []
+        yield source, target, [relations] if isinstance(relations, str) else list(relations)
+
+
+def write_json(graph, fp: TextIO, deterministic: bool = False):
+    """
+    Write the graph as {"directed": true, "nodes": [...], "edges": [...]}, one node or edge per line.
+
+    A node is {"id": fqn, "name": ..., "type": ...}, an edge {"source": ..., "target": ..., "relation": [...]}.
+    """
+    fp.write('{"directed": true,\n"nodes": [')
+    separator = "\n"
+    for fqn, name, node_type in iter_nodes(graph, deterministic):
+        fp.write(separator + json.dumps({"id": fqn, "name": name, "type": node_type}))
+        separator = ",\n"
+    fp.write('\n],\n"edges": [')
+    separator = "\n"
+    for source, target, relations in iter_edges(graph, deterministic):
+        fp.write(separator + json.dumps({"source": source, "target": target, "relation": relations}))
+        separator = ",\n"
+    fp.write('\n]}\n')
+
+
+def write_graphml(graph, fp: TextIO, deterministic: bool = False):
+    """
+    Write the graph as GraphML, with the name and type of every node and the relations of every edge.
+    """
+    fp.write(GRAPHML_HEADER)
+    for fqn, name, node_type in iter_nodes(graph, deterministic):
+        fp.write(f'    <node id={quoteattr(fqn)}><data key="name">{escape(name)}</data>')
+        if node_type is not None:
+            fp.write(f'<data key="type">{node_type}</data>')
+        fp.write('</node>\n')
+    for source, target, relations in iter_edges(graph, deterministic):
+        fp.write(f'    <edge source={quoteattr(source)} target={quoteattr(target)}>'
+                 f'<data key="relation">{escape(RELATION_SEPARATOR.join(relations))}</data></edge>\n')
+    fp.write(GRAPHML_FOOTER)
+
+
+def dot_id(text: str) -> str:
+    """
+    A quoted DOT identifier.
+    """
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def write_dot(graph, fp: TextIO, deterministic: bool = False):
+    """
+    Write the graph as a flat DOT digraph, nodes are labelled with their name, edges with their relations.
+    """
+    fp.write('digraph py2graph {\n')
+    for fqn, name, node_type in iter_nodes(graph, deterministic):
+        attributes = f'label={dot_id(name)}'
+        if node_type is not None:
+            attributes += f', type={dot_id(node_type)}'
+        fp.write(f'  {dot_id(fqn)} [{attributes}];\n')
+    for source, target, relations in iter_edges(graph, deterministic):
+        fp.write(f'  {dot_id(source)} -> {dot_id(target)} [label={dot_id(RELATION_SEPARATOR.join(relations))}];\n')
+    fp.write('}\n')
+
+
+# the export formats next to PUML, by the name --format selects them with
+EXPORTERS: Dict[str, Callable[..., None]] = {"json": write_json,
+                                             "graphml": write_graphml,
+                                             "dot": write_dot}
@@ -0,0 +1,184 @@
+import json
+import math
+import os
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import networkx as nx
+
+from py2graph.parser.parser_interface import NodeType
+
+# bump when the layout of the position cache changes
+LAYOUT_FORMAT = 1
+
+# distance between neighbouring nodes of a cluster, and the gap between clusters
+NODE_SPACING = 1.0
+CLUSTER_MARGIN = 2.0
+
+# clusters with more nodes are placed on a spiral, a spring layout of them would take too long
+MAX_SPRING_NODES = 300
+
+# the cluster of nodes outside the parsed packages that have no package of their own, like builtins
+EXTERNAL_CLUSTER = "builtins"
+
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))
+
+Position = Tuple[float, float]
+
+
+class PositionCache:
+    """
+    Node positions of earlier layouts, stored in a JSON file.
+
+    Every position is relative to the centre of the node's cluster, so a node keeps its place in its cluster
+    while clusters are added or removed around it. A missing or unreadable file is an empty cache, and the
+    file is replaced atomically.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[str, Tuple[str, Position]]:
+        """
+        The cluster and the relative position of every cached node.
+        """
+        try:
+            with open(self.path, encoding='utf8') as f:
+                content = json.load(f)
+            if content.get('format') != LAYOUT_FORMAT:
+                return {}
+            return {fqn: (cluster, (x, y)) for fqn, (cluster, x, y) in content['positions'].items()}
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return {}
+
+    def store(self, positions: Dict[str, Tuple[str, Position]]):
+        content = {'format': LAYOUT_FORMAT,
+                   'positions': {fqn: [cluster, x, y] for fqn, (cluster, (x, y)) in positions.items()}}
+        # the cache is an optimisation, a read-only or full disk must not stop the drawing
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'w', encoding='utf8') as f:
+                json.dump(content, f)
+            os.replace(temp_path, self.path)
+        except (OSError, TypeError, ValueError):
+            pass
+        finally:
+            # left over unless it was moved into place
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+
+def node_clusters(graph) -> Dict[str, str]:
+    """
+    The cluster of every node: the module that contains it, or for nodes outside of modules their
+    top level package.
+    """
+    node_types = {fqn: node_data['data'].node_type for fqn, node_data in graph.nodes(data=True)
+                  if node_data.get('data') is not None}
+    clusters = {}
+    for fqn in graph.nodes:
+        prefix = fqn
+        while prefix and node_types.get(prefix) is not NodeType.MODULE:
+            prefix = prefix.rpartition('.')[0]
+        if not prefix:
+            prefix = fqn.partition('.')[0]
+            if prefix == fqn and node_types.get(fqn) is not NodeType.PACKAGE:
+                prefix = EXTERNAL_CLUSTER
+        clusters[fqn] = prefix
+    return clusters
+
+
+def cluster_layout(graph, cache: Optional[PositionCache] = None, seed: int = 0) -> Dict[str, Position]:
+    """
+    Position the nodes of a graph cluster by cluster.
+
+    The nodes are grouped by the module that contains them, every group is laid out on its own and the groups
+    are then packed in rows, in the order of their names, so the modules of a package end up next to each other.
+    Small clusters get a spring layout, large ones a spiral. With a cache, nodes that were laid out before keep
+    their position in their cluster, only new nodes are placed, and the cache is updated.
+
+    Args:
+        graph (nx.DiGraph): The graph to lay out.
+        cache (PositionCache): Positions of earlier runs, or None to lay out every node.
+        seed (int): Seed of the spring layouts, the same graph always gets the same layout.
+
+    Returns:
+        The position of every node.
+    """
+    clusters = node_clusters(graph)
+    members: Dict[str, List[str]] = {}
+    for fqn, cluster in clusters.items():
+        members.setdefault(cluster, []).append(fqn)
+    internal_edges: Dict[str, List[Tuple[str, str]]] = {}
+    for source, target in graph.edges():
+        if source != target and clusters[source] == clusters[target]:
+            internal_edges.setdefault(clusters[source], []).append((source, target))
+
+    cached = cache.load() if cache is not None else {}
+    local: Dict[str, Tuple[str, Position]] = {}
+    radii = {}
+    for cluster, nodes in members.items():
+        known = {fqn: cached[fqn][1] for fqn in nodes if fqn in cached and cached[fqn][0] == cluster}
+        positions = _layout_cluster(sorted(nodes), internal_edges.get(cluster, []), known, seed)
+        radii[cluster] = max(math.hypot(x, y) for x, y in positions.values()) + NODE_SPACING
+        local.update((fqn, (cluster, position)) for fqn, position in positions.items())
+    if cache is not None:
+        cache.store(local)
+
+    centres = _pack_clusters(radii)
+    return {fqn: (centres[cluster][0] + x, centres[cluster][1] + y) for fqn, (cluster, (x, y)) in local.items()}
+
+
+def _layout_cluster(nodes: List[str], edges: List[Tuple[str, str]], known: Dict[str, Position],
+                    seed: int) -> Dict[str, Position]:
+    new_nodes = [fqn for fqn in nodes if fqn not in known]
+    if not new_nodes:
+        return known
+    if len(nodes) > MAX_SPRING_NODES:
+        # new nodes take the spiral slots after the outermost known one, slot i lies at radius sqrt(i + 0.5),
+        # counting the known nodes would reuse the slots of removed ones and place nodes on top of each other
+        start = max((round((x * x + y * y) / NODE_SPACING ** 2 - 0.5) + 1 for x, y in known.values()), default=0)
+        positions = dict(known)
+        for index, fqn in enumerate(new_nodes, start=start):
+            radius = NODE_SPACING * math.sqrt(index + 0.5)
+            positions[fqn] = (radius * math.cos(index * GOLDEN_ANGLE), radius * math.sin(index * GOLDEN_ANGLE))
+        return positions
+    if len(nodes) == 1:
+        return {nodes[0]: (0.0, 0.0)}
+
+    cluster_graph = nx.Graph()
+    cluster_graph.add_nodes_from(nodes)
+    cluster_graph.add_edges_from(edges)
+    if known:
+        # only the new nodes move, spring_layout does not rescale the fixed ones
+        layout = nx.spring_layout(cluster_graph, k=NODE_SPACING, pos=known, fixed=list(known), seed=seed)
+    else:
+        layout = nx.spring_layout(cluster_graph, k=NODE_SPACING / math.sqrt(len(nodes)), seed=seed,
+                                  scale=NODE_SPACING * math.sqrt(len(nodes)))
+    return {fqn: (float(x), float(y)) for fqn, (x, y) in layout.items()}
+
+
+def _pack_clusters(radii: Dict[str, float]) -> Dict[str, Position]:
+    """
+    Place the clusters in rows of about the same width, in the order of their names.
+    """
+    sizes = {cluster: 2 * (radius + CLUSTER_MARGIN) for cluster, radius in radii.items()}
+    row_width = math.sqrt(sum(size * size for size in sizes.values()))
+    centres = {}
+    x = y = row_height = 0.0
+    for cluster in sorted(sizes):
+        size = sizes[cluster]
+        if x > 0 and x + size > row_width:
+            x = 0.0
+            y -= row_height
+            row_height = 0.0
+        centres[cluster] = (x + size / 2, y - size / 2)
+        x += size
+        row_height = max(row_height, size)
+    return centres
@@ -1,75 +1,197 @@
+from typing import Callable, Dict, List, Optional
+
 import matplotlib.pyplot as plt
 import networkx as nx
+from matplotlib.collections import LineCollection
+
+from py2graph.graphcreator.simplenode import SimpleNode
+from py2graph.graphviewer.layout import PositionCache, cluster_layout
+from py2graph.parser.parser_interface import NodeType
+
+# Define node shapes by NodeType
+NODE_SHAPES = {
+    "MODULE": "s",  # Square
+    "CLASS": "o",  # Circle
+    "METHOD": "d",  # Diamond
+    "ATTRIBUTE": "^",  # Triangle up
+    "FUNCTION": "h",  # Hexagon
+    "PACKAGE": "p",  # Pentagon
+    "PLACEHOLDER": "x"  # Cross
+}
+
+# Define edge colors by relationship type
+EDGE_COLORS = {
+    "inherits": "blue",
+    "uses": "green",
+    "defines": "red",
+    "has_type": "orange",
+    "imports": "purple",
+}
+
+# graphs with more nodes are drawn at a lower level of detail
+DEFAULT_MAX_NODES = 2000
+DEFAULT_MAX_LABELS = 100
+
+MEMBER_TYPES = (NodeType.METHOD, NodeType.ATTRIBUTE, NodeType.CONSTRUCTOR, NodeType.BODY)
+
+# the levels of detail, from the full graph to one node per package
+LEVELS_OF_DETAIL = ("all", "without placeholders", "classes", "packages")
+
+
+def collapse_graph(graph, level: int) -> nx.DiGraph:
+    """
+    The graph at a level of detail of LEVELS_OF_DETAIL.
+
+    Level 1 drops the placeholders of types outside the parsed packages, level 2 also collapses methods and
+    attributes into their class, or their module for free functions, and level 3 collapses everything into
+    its package. Edges between collapsed nodes are merged, every node has a weight, the number of nodes
+    it stands for.
+    """
+    node_types = {fqn: node_data['data'].node_type for fqn, node_data in graph.nodes(data=True)
+                  if node_data.get('data') is not None}
+    representative = _representative(node_types, level)
+    collapsed = nx.DiGraph()
+    representatives = {}
+    for fqn, node_data in graph.nodes(data=True):
+        target = representative(fqn)
+        representatives[fqn] = target
+        if target is None:
+            continue
+        if target in collapsed:
+            collapsed.nodes[target]['weight'] += 1
+        else:
+            node = node_data.get('data') if target == fqn else graph.nodes[target].get('data')
+            collapsed.add_node(target, data=node or SimpleNode(target, target.rpartition('.')[2],
+                                                               NodeType.PLACEHOLDER), weight=1)
+    for source, target, edge_data in graph.edges(data=True):
+        source, target = representatives[source], representatives[target]
+        if source is None or target is None or source == target:
+            continue
+        relations = _relations(edge_data)
+        if collapsed.has_edge(source, target):
+            merged = collapsed[source][target]['relation']
+            merged.extend(relation for relation in relations if relation not in merged)
+        else:
+            collapsed.add_edge(source, target, relation=list(relations))
+    return collapsed
+
+
+def level_of_detail(graph, max_nodes: Optional[int] = DEFAULT_MAX_NODES) -> int:
+    """
+    The most detailed level at which the graph has at most max_nodes nodes, the coarsest level if none has.
+    """
+    if max_nodes is None or graph.number_of_nodes() <= max_nodes:
+        return 0
+    node_types = {fqn: node_data['data'].node_type for fqn, node_data in graph.nodes(data=True)
+                  if node_data.get('data') is not None}
+    for level in range(1, len(LEVELS_OF_DETAIL) - 1):
+        representative = _representative(node_types, level)
+        if len({representative(fqn) for fqn in graph.nodes} - {None}) <= max_nodes:
+            return level
+    return len(LEVELS_OF_DETAIL) - 1
 
 
-def visualize_graph(graph, output_file=None):
+def visualize_graph(graph, output_file=None, layout_cache=None, max_nodes=DEFAULT_MAX_NODES,
+                    max_labels=DEFAULT_MAX_LABELS):
     """
     Visualize the graph with different shapes for NodeType and colors for edge relationships.
 
+    Graphs with more than max_nodes nodes are collapsed to a coarser level of detail first, see
+    collapse_graph. The edges are drawn as one collection without arrow heads, and only the max_labels
+    nodes with the highest degree are labelled.
+
     Args:
-        graph (nx.DiGraph): The directed graph to visualize.
+        graph (nx.DiGraph): The directed graph to visualize, a CompactGraph is exported to networkx first.
         output_file (str): Path to save the visualization as an image. If None, show it interactively.
+        layout_cache (str): Path of a file that keeps the node positions between runs, so only new nodes
+            are laid out and the others stay in place. If None, every node is laid out.
+        max_nodes (int): The most nodes to draw, None to always draw every node.
+        max_labels (int): The number of nodes that get a label.
+
+    Returns:
+        int: The level of detail the graph was drawn at, an index of LEVELS_OF_DETAIL.
     """
-    # Define node shapes by NodeType
-    node_shapes = {
-        "MODULE": "s",  # Square
-        "CLASS": "o",  # Circle
-        "METHOD": "d",  # Diamond
-        "ATTRIBUTE": "^",  # Triangle up
-        "FUNCTION": "h",  # Hexagon
-        "PACKAGE": "p",  # Pentagon
-        "PLACEHOLDER": "x"  # Cross
-    }
-
-    # Define edge colors by relationship type
-    edge_colors = {
-        "inherits": "blue",
-        "uses": "green",
-        "defines": "red",
-        "has_type": "orange",
-        "imports": "purple",
-    }
-    plt.figure(figsize=(30, 30))  # Adjust as needed
-
-    pos = nx.spring_layout(graph, k=1, scale=100)  # Positioning of nodes
-    color_map = []
-    shape_map = {}
-
-    # Separate nodes by shape
+    if not isinstance(graph, nx.DiGraph):
+        graph = graph.to_networkx()
+    level = level_of_detail(graph, max_nodes)
+    if level:
+        graph = collapse_graph(graph, level)
+
+    figure, axes = plt.subplots(figsize=(30, 30))  # Adjust as needed
+    axes.set_axis_off()
+
+    # nodes are laid out by module, the modules are packed next to each other
+    pos = cluster_layout(graph, PositionCache(layout_cache) if layout_cache else None)
+
+    # Separate nodes by shape, every shape is drawn with a single scatter
+    shape_map: Dict[str, List[str]] = {}
     for node_fqn, node_data in graph.nodes(data=True):
-        node_type = node_data['data'].node_type.name
-        shape = node_shapes.get(node_type, "o")  # Default to circle if not defined
+        node = node_data.get('data')
+        shape = NODE_SHAPES.get(node.node_type.name if node is not None else "PLACEHOLDER", "o")
         shape_map.setdefault(shape, []).append(node_fqn)
-
-    # Draw nodes
     for shape, nodes in shape_map.items():
-        nx.draw_networkx_nodes(
-            graph,
-            pos,
-            nodelist=nodes,
-            node_shape=shape,
-            node_color="skyblue",
-            label=shape
-        )
-
-    # Draw edges
-    edge_color_values = [
-        edge_colors.get(data['relation'], "black")  # Default to black if type not defined
-        for _, _, data in graph.edges(data=True)
-    ]
-    nx.draw_networkx_edges(graph, pos, edge_color=edge_color_values)
+        axes.scatter([pos[fqn][0] for fqn in nodes], [pos[fqn][1] for fqn in nodes],
+                     s=[60 * graph.nodes[fqn].get('weight', 1) ** 0.5 for fqn in nodes],
+                     marker=shape, c="skyblue", zorder=2)
+
+    # Draw edges, all of them in one collection
+    segments = []
+    edge_color_values = []
+    for source, target, edge_data in graph.edges(data=True):
+        segments.append((pos[source], pos[target]))
+        edge_color_values.append(next((EDGE_COLORS[relation] for relation in _relations(edge_data)
+                                       if relation in EDGE_COLORS), "black"))  # Default to black if not defined
+    axes.add_collection(LineCollection(segments, colors=edge_color_values, linewidths=0.5, alpha=0.6, zorder=1))
 
-    # Draw labels
-    nx.draw_networkx_labels(graph, pos)
+    # Draw labels of the best connected nodes
+    degrees = graph.degree()
+    for node_fqn in sorted(graph.nodes, key=lambda fqn: (-degrees[fqn], fqn))[:max_labels]:
+        node = graph.nodes[node_fqn].get('data')
+        axes.annotate(node.name if node is not None else node_fqn, pos[node_fqn], fontsize=8, ha="center",
+                      va="bottom", zorder=3)
+    axes.autoscale_view()
 
     # Add a legend for edge colors
     legend_elements = [
         plt.Line2D([0], [0], color=color, lw=2, label=relation)
-        for relation, color in edge_colors.items()
+        for relation, color in EDGE_COLORS.items()
     ]
-    plt.legend(handles=legend_elements, loc="upper left", title="Edge Types")
+    axes.legend(handles=legend_elements, loc="upper left", title="Edge Types")
 
     if output_file:
-        plt.savefig(output_file)
+        figure.savefig(output_file)
+        plt.close(figure)
     else:
         plt.show()
+    return level
+
+
+def _relations(edge_data) -> List[str]:
+    # graphs built by GraphCreator hold a list of relations, hand-made ones may hold a single one
+    relations = edge_data.get('relation') or []
+    return [relations] if isinstance(relations, str) else relations
+
+
+def _representative(node_types: Dict[str, NodeType], level: int) -> Callable[[str], Optional[str]]:
+    """
+    Maps a node to the node that stands for it at a level of detail, None for nodes that are dropped.
+    """
+    def owner(fqn: str, owner_types) -> Optional[str]:
+        prefix = fqn.rpartition('.')[0]
+        while prefix and node_types.get(prefix) not in owner_types:
+            prefix = prefix.rpartition('.')[0]
+        return prefix or None
+
+    def representative(fqn: str) -> Optional[str]:
+        node_type = node_types.get(fqn)
+        if level == 0:
+            return fqn
+        if node_type is None or node_type is NodeType.PLACEHOLDER:
+            return None
+        if level >= 3 and node_type is not NodeType.PACKAGE:
+            return owner(fqn, (NodeType.PACKAGE,)) or owner(fqn, (NodeType.MODULE,)) or fqn
+        if level >= 2 and node_type in MEMBER_TYPES:
+            return owner(fqn, (NodeType.CLASS, NodeType.MODULE)) or fqn
+        return fqn
+
+    return representative
@@ -1,5 +1,9 @@
+from hashlib import sha256
+from typing import Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
 import networkx as nx
 
+from py2graph.graphcreator.simplenode import SimpleNode
 from py2graph.parser.parser_interface import NodeType
 
 PUML_FILE_START = """@startuml {diagram_name}
@@ -11,6 +15,8 @@ PUML_FILE_FOOTER = """footer Generated by //CodebaseGraph//"""
 
 PUML_FILE_END = """@enduml"""
 
+PUML_CONTENT_HASH_TPL = """' content-hash: sha256:{content_hash}"""
+
 PUML_ITEM_START_TPL = """{item_type} {item_name} {{"""
 
 PUML_ATTR_TPL = """  {attr_name}: {attr_type}{staticity}"""
@@ -26,34 +32,125 @@ FEATURE_INSTANCE = ''
 
 
 class PumlGenerator:
-    def __init__(self, graph: nx.DiGraph, diagram_name: str = ""):
+    """
+    Renders the class diagram of a graph as PlantUML.
+
+    Every render first indexes the graph in a single pass over its nodes and edges: the node of every
+    fqn, the out edges of every node, the members contained by modules, the abstract classes and the
+    argument, return and attribute types of every node. Classes, modules and relationships are then
+    written from these indexes, which keeps a render linear in the size of the graph.
+
+    generate() returns the diagram as one string, iter_lines() and write() stream it line by line.
+
+    By default classes and relationships follow the insertion order of the graph, which follows the order
+    the package was walked in. A deterministic generator sorts modules, the classes of every module,
+    relationships and their relations by name instead, so the same code always gives the same text, and it
+    ends the diagram with a comment holding the content hash of everything above it. content_hash()
+    returns the same hash without writing the diagram.
+
+    With a package, the diagram only shows the modules directly in that package and the relationships
+    starting from their classes and functions.
+    """
+
+    def __init__(self, graph: nx.DiGraph, diagram_name: str = "", deterministic: bool = False,
+                 package: Optional[str] = None):
         self.graph = graph
         self.diagram_name = diagram_name
-        self.puml_lines = []
+        self.deterministic = deterministic
+        self.package = package
         self.visited = set()
+        self._nodes: Dict[str, SimpleNode] = {}
+        self._successors: Dict[str, List[Tuple[str, List[str]]]] = {}
+        self._contained: Dict[str, List[str]] = {}
+        self._abstract_classes: Set[str] = set()
+        self._arguments: Dict[str, List[str]] = {}
+        self._returns: Dict[str, List[str]] = {}
+        self._types: Dict[str, List[str]] = {}
 
     def generate(self) -> str:
         """
         Generate a PlantUML file content from the graph using stack-based DFS.
         """
-        self.puml_lines = [self._puml_file_start()]
+        return '\n'.join(self.iter_lines())
+
+    def write(self, fp: TextIO):
+        """
+        Write the PlantUML file content to a text file, every line as soon as it is generated.
+        """
+        fp.writelines(f"{line}\n" for line in self.iter_lines())
+
+    def iter_lines(self) -> Iterator[str]:
+        """
+        Yield the lines of the PlantUML file content without line endings, the file start comes as one block.
+        """
+        if not self.deterministic:
+            yield from self._iter_content()
+            yield self._puml_file_end()
+            return
+
+        digest = sha256()
+        for line in self._iter_content():
+            digest.update(line.encode('utf8') + b'\n')
+            yield line
+        yield self._content_hash_comment(digest.hexdigest())
+        yield self._puml_file_end()
+
+    def content_hash(self) -> str:
+        """
+        The SHA-256 hex digest of the diagram, without the content hash comment and the file end.
+        """
+        digest = sha256()
+        for line in self._iter_content():
+            digest.update(line.encode('utf8') + b'\n')
+        return digest.hexdigest()
+
+    def _iter_content(self) -> Iterator[str]:
+        """
+        Yield the lines of the diagram from the file start up to the footer.
+        """
+        yield self._puml_file_start()
+        self.visited = set()
+        self._build_indexes()
+        nodes = self._nodes
 
         # Start DFS from top-level nodes (e.g., packages or modules)
-        for node_fqn, node_data in self.graph.nodes(data=True):
-            if len(node_data) > 0:
-                node = node_data['data']
-                if node.node_type in {NodeType.MODULE} and node_fqn not in self.visited:
-                    self._dfs_stack(node_fqn)
+        for node_fqn in sorted(nodes) if self.deterministic else nodes:
+            if nodes[node_fqn].node_type is NodeType.MODULE and node_fqn not in self.visited and \
+                    (self.package is None or node_fqn.rpartition('.')[0] == self.package):
+                yield from self._dfs_stack(node_fqn)
 
-        existing_connections = {}
         # Generate relationships
-        for source, target, edge_data in self.graph.edges(data=True):
+        for source, relation, target, extra in self._iter_relationships():
+            yield f"{source} {relation} {target}{extra}"
+
+        yield self._puml_file_footer()
+
+    def _iter_relationships(self) -> Iterator[Tuple[str, str, str, str]]:
+        """
+        Yield the source, PlantUML arrow, target and label suffix of every relationship of the diagram.
+        Methods are drawn as their class, and free functions as the Methods of their module.
+        """
+        nodes = self._nodes
+        existing_connections = set()
+        diagram_types = {NodeType.CLASS, NodeType.METHOD}
+        successors = self._successors
+        for source in sorted(successors) if self.deterministic else successors:
+            edges = sorted(successors[source]) if self.deterministic else successors[source]
+            source_type = nodes[source].node_type
+            if source_type not in diagram_types:
+                continue
+            sourceisMethod = source_type is NodeType.METHOD
+            sourceParent, _, source_name = source.rpartition(".")
+            # classes and functions are visited by the DFS, methods are found through their class
+            if self.package is not None and source not in self.visited and sourceParent not in self.visited:
+                continue
+            source_root_package_prefix = source.partition('.')[0]
 
-            if (self.graph.nodes[source]['data'].node_type in {NodeType.CLASS, NodeType.METHOD}) and \
-                    target in self.graph.nodes and 'data' in self.graph.nodes[target] and \
-                    (self.graph.nodes[target]['data'].node_type in {NodeType.CLASS, NodeType.METHOD}):
-                targetisMethod = self.graph.nodes[target]['data'].node_type in {NodeType.METHOD}
-                sourceisMethod = self.graph.nodes[source]['data'].node_type in {NodeType.METHOD}
+            for target, relations in edges:
+                target_node = nodes.get(target)
+                if target_node is None or target_node.node_type not in diagram_types:
+                    continue
+                targetisMethod = target_node.node_type is NodeType.METHOD
                 outputSource = source
                 outputTarget = target
                 extra = ''
@@ -63,64 +160,83 @@ class PumlGenerator:
                 # this issue steams from the fact that i use methods and functions both with NodeTYpe.METHOD
                 # alternatively introduce Function for free functions
 
-                targetParent = ".".join(target.split(".")[:-1])
-                sourceParent = ".".join(source.split(".")[:-1])
+                targetParent, _, target_name = target.rpartition(".")
 
                 if sourceisMethod:
-                    outputSource = ".".join(source.split(".")[:-1])
-                    if self.graph.nodes[sourceParent]['data'].node_type is NodeType.MODULE:
+                    outputSource = sourceParent
+                    if nodes[sourceParent].node_type is NodeType.MODULE:
                         outputSource += ".Methods"
-                    extra = ": " + "".join(["used by ", source.split(".")[-1]])
+                    extra = ": used by " + source_name
 
                 if targetisMethod:
-                    outputTarget = ".".join(target.split(".")[:-1])
-                    if self.graph.nodes[targetParent]['data'].node_type is NodeType.MODULE:
+                    outputTarget = targetParent
+                    if nodes[targetParent].node_type is NodeType.MODULE:
                         outputTarget += ".Methods"
                     if extra == "":
                         extra = ":"
-                    extra += "".join([" use of ", target.split(".")[-1]])
+                    extra += " use of " + target_name
                 if outputTarget == outputSource:
                     continue
-                target_root_package_prefix = target.split('.')[0]
-                source_root_package_prefix = source.split('.')[0]
-                if target_root_package_prefix != source_root_package_prefix:
+                if target.partition('.')[0] != source_root_package_prefix:
                     continue
 
-                # ugly fix to prevent multiple connections in diagram
-                sourceParentisClass = self.graph.nodes[sourceParent]['data'].node_type in {NodeType.CLASS}
-                parentRelations = []
-                if sourceisMethod and sourceParentisClass:
-
-                    attribute_edges = ['composition', 'aggregation', 'has_attribute_with_type']
-                    if self.graph.has_edge(sourceParent, target):
-                        parentRelations = self.graph[sourceParent][target].values()
-                        parentRelations = parentRelations
-                        parentRelations = [word for word in parentRelations if word not in attribute_edges]
-                if len(parentRelations) > 0:
+                # ugly fix to prevent multiple connections in diagram: a method is not linked to a target
+                # its class is already linked to
+                if sourceisMethod and nodes[sourceParent].node_type is NodeType.CLASS and \
+                        self.graph.has_edge(sourceParent, target):
                     continue
 
-                for relation in edge_data['relation']:
-                    # skip if we already identified a relation between the two for the parent, often the class
-
+                for relation in sorted(relations) if self.deterministic else relations:
                     relation_output = _map_relation_type(relation)
 
                     if relation_output is not None:
                         # Check for duplicate connections with the same relation_output
-                        connection_key = (outputSource, outputTarget)
+                        connection_key = (outputSource, outputTarget, relation_output)
                         if connection_key not in existing_connections:
-                            existing_connections[connection_key] = set()
+                            existing_connections.add(connection_key)
+                            yield outputSource, relation_output, outputTarget, extra
 
-                        if relation_output not in existing_connections[connection_key]:
-                            existing_connections[connection_key].add(relation_output)
-                            self.puml_lines.append(f"{outputSource} {relation_output} {outputTarget}{extra}")
+    def _build_indexes(self):
+        """
+        Index the nodes and edges of the graph for a render.
+        """
+        self._nodes = {node_fqn: node_data['data'] for node_fqn, node_data in self.graph.nodes(data=True)
+                       if len(node_data) > 0}
+        self._successors = successors = {}
+        self._contained = contained = {}
+        self._abstract_classes = abstract_classes = set()
+        self._arguments = arguments = {}
+        self._returns = returns = {}
+        self._types = types = {}
 
-        self.puml_lines.append(self._puml_file_footer())
-        self.puml_lines.append(self._puml_file_end())
-        return '\n'.join(self.puml_lines)
+        for source, target, edge_data in self.graph.edges(data=True):
+            relations = edge_data['relation']
+            edges = successors.get(source)
+            if edges is None:
+                edges = successors[source] = []
+            edges.append((target, relations))
+            if relations is None:
+                continue
+            if relations == ['contains']:
+                contained.setdefault(source, []).append(target)
+            elif relations == ['inherits'] and target == 'abc.ABC':
+                abstract_classes.add(source)
+            target_name = target.rpartition('.')[2]
+            if 'returns' in relations:
+                returns.setdefault(source, []).append(target_name)
+            if 'has_argument' in relations:
+                arguments.setdefault(source, []).append(target_name)
+            if 'has_type' in relations:
+                types.setdefault(source, []).append(target_name)
+
+        if self.deterministic:
+            # the DFS pops the contained nodes from the end of a stack
+            for source, targets in contained.items():
+                targets.sort(reverse=True)
 
     def _dfs_stack(self, start_node_fqn):
         """
-        Perform DFS using a stack to process nodes and relationships.
+        Perform DFS using a stack to process nodes and relationships, yielding their lines.
         """
         stack = [start_node_fqn]
 
@@ -130,132 +246,95 @@ class PumlGenerator:
                 continue
 
             self.visited.add(current_fqn)
-            current_node = self.graph.nodes[current_fqn]['data']
+            current_node = self._nodes[current_fqn]
 
             if current_node.node_type == NodeType.CLASS:
-                self._process_class(current_fqn)
+                yield from self._process_class(current_fqn)
             elif current_node.node_type == NodeType.MODULE:
-                pass
-                self._process_module(current_fqn)
+                yield from self._process_module(current_fqn)
 
             # Push successors to the stack
-            for successor in self.graph.successors(current_fqn):
-                for key, edge_data in self.graph[current_fqn][successor].items():
-                    if edge_data == ["contains"] and successor not in self.visited:
-                        stack.append(successor)
+            for successor in self._contained.get(current_fqn, ()):
+                if successor not in self.visited:
+                    stack.append(successor)
 
     def _process_class(self, class_fqn):
         """
-        Process a class node, gathering its methods, attributes, and relationships.
+        Process a class node, yielding the lines of its methods and attributes.
+        """
+        attributes, methods = self._class_members(class_fqn)
+
+        # Generate PUML for the class
+        item_type = 'abstract class' if self._is_abstract(class_fqn) else 'class'
+
+        yield f"{item_type} {class_fqn} {{"
+        for attr_name, attr_type in attributes:
+            yield f"  {attr_name}: {attr_type}"
+        for method_signature in methods:
+            yield f"  {method_signature}"
+        yield "}"
+
+    def _class_members(self, class_fqn) -> Tuple[List[Tuple[str, str]], List[str]]:
         """
-        class_node = self.graph.nodes[class_fqn]['data']
-        class_data = {
-            'attributes': [],
-            'methods': [],
-            'is_abstract': self._is_abstract(class_fqn),
-            'relationships': []
-        }
+        The name and type of every attribute and the signature of every method of a class.
+        """
+        attributes = []
+        methods = []
 
         # Collect attributes and methods
-        for source, target, edge_data in self.graph.out_edges(class_fqn, data=True):
-            if 'inherits' in edge_data['relation']:
+        for target, relations in self._successors.get(class_fqn, ()):
+            if 'inherits' in relations:
                 continue
-            successor_node = self.graph.nodes[target]['data']
-
-            if successor_node.node_type == NodeType.ATTRIBUTE and 'defines' in edge_data['relation']:
+            successor_node = self._nodes[target]
 
-                attr_type = self._get_node_type(successor_node.fqn)
-                class_data['attributes'].append((successor_node.name, attr_type))
-            elif successor_node.node_type == NodeType.METHOD and 'defines' in edge_data['relation']:
+            if successor_node.node_type == NodeType.ATTRIBUTE and 'defines' in relations:
+                attributes.append((successor_node.name, self._get_node_type(successor_node.fqn)))
+            elif successor_node.node_type == NodeType.METHOD and 'defines' in relations:
                 method_signature = self._build_method_signature(successor_node.fqn)
-                # look for body and constructor in the successors
                 if "__init__" in successor_node.name:
                     classname = successor_node.fqn.split(".")[-2]
                     method_signature = method_signature.replace("__init__", classname)
-                class_data['methods'].append(method_signature)
-
-        # Generate PUML for the class
-        item_type = 'abstract class' if class_data['is_abstract'] else 'class'
-
-        self.puml_lines.append(f"{item_type} {class_fqn} {{")
-        for attr_name, attr_type in class_data['attributes']:
-            self.puml_lines.append(f"  {attr_name}: {attr_type}")
-        for method_signature in class_data['methods']:
-            self.puml_lines.append(f"  {method_signature}")
-        self.puml_lines.append("}")
+                methods.append(method_signature)
+        return attributes, methods
 
     def _process_module(self, module_fqn):
         """
-        Process a package or module node.
+        Process a package or module node, yielding the lines of its free functions.
         """
-        module_node = self.graph.nodes[module_fqn]['data']
-
-        module_data = {
-            'methods': [],
-            'relationships': []
-        }
-
-        # Collect attributes and methods
-        for source, target, edge_data in self.graph.out_edges(module_fqn, data=True):
-            successor_node = self.graph.nodes[target]['data']
-            if successor_node.node_type == NodeType.METHOD and edge_data['relation'] == ['contains']:
-                method_signature = self._build_method_signature(successor_node.fqn)
-                # look for body and constructor in the successors
-
-                # extract relationships
-
-                module_data['methods'].append(method_signature)
-        if len(module_data['methods']) > 0:
+        methods = self._module_functions(module_fqn)
+        if len(methods) > 0:
             item_type = 'annotation'
-            self.puml_lines.append(f"{item_type} {module_fqn}.Methods {{")
-            for method_signature in module_data['methods']:
-                self.puml_lines.append(f"  {method_signature}")
-            self.puml_lines.append("}")
+            yield f"{item_type} {module_fqn}.Methods {{"
+            for method_signature in methods:
+                yield f"  {method_signature}"
+            yield "}"
+
+    def _module_functions(self, module_fqn) -> List[str]:
+        """
+        The signatures of the free functions of a module.
+        """
+        return [self._build_method_signature(target) for target, relations in self._successors.get(module_fqn, ())
+                if self._nodes[target].node_type == NodeType.METHOD and relations == ['contains']]
 
     def _is_abstract(self, class_fqn):
         """
         Determine if a class is abstract by checking inheritance from `abc.ABC`.
         """
-        for source, target, edge_data in self.graph.out_edges(data=True):
-            if edge_data['relation'] == ['inherits'] and source == class_fqn and target == 'abc.ABC':
-                return True
-        return False
+        return class_fqn in self._abstract_classes
 
     def _build_method_signature(self, method_fqn):
         """
         Build a method signature string for PlantUML.
         """
-        arguments = []
-        return_type = []
-
-        # Collect return type
-        for edge_target, edge_data in self.graph.succ[method_fqn].items():
-            if edge_data['relation'] is not None:
-                if 'returns' in edge_data['relation']:
-                    return_type.append(edge_target.split('.')[-1])
-                if 'has_argument' in edge_data['relation']:
-                    arguments.append(edge_target.split('.')[-1])
-
-        # Collect arguments
-        # for edge_target, edge_data in self.graph.pred[method_fqn].items():
-        #     if edge_data['relation'] == 'has_argument':
-        #         arguments.append(edge_target.split('.')[-1])
-
-        method_node = self.graph.nodes[method_fqn]['data']
-        if not return_type:
-            return_type.append('None')
-        return f"{method_node.name}({', '.join(arguments)}) -> {' | '.join(return_type)}"
+        arguments = self._arguments.get(method_fqn, ())
+        return_type = self._returns.get(method_fqn) or ['None']
+        return f"{self._nodes[method_fqn].name}({', '.join(arguments)}) -> {' | '.join(return_type)}"
 
     def _get_node_type(self, node_fqn):
         """
         Retrieve the type of a node based on its relationships in the graph.
         """
-        types = []
-        for edge_target, edge_data in self.graph.succ[node_fqn].items():
-            if 'has_type' in edge_data['relation']:
-                types.append(edge_target.split(".")[-1])
-
-        return "|".join(types)
+        return "|".join(self._types.get(node_fqn, ()))
 
     def _puml_file_start(self):
         return PUML_FILE_START.format(diagram_name=self.diagram_name)
@@ -266,6 +345,9 @@ class PumlGenerator:
     def _puml_file_end(self):
         return PUML_FILE_END
 
+    def _content_hash_comment(self, content_hash: str):
+        return PUML_CONTENT_HASH_TPL.format(content_hash=content_hash)
+
 
 def _map_relation_type(relation_type: str) -> str:
     """
@@ -0,0 +1,197 @@
+import ast
+from typing import Dict, Iterator, List, Tuple
+
+from py2graph.parser.attribute import AttributeParser
+from py2graph.parser.helper import infer_type_from_annotation, parse_import, resolve_fqn, resolve_nested_attribute, \
+    split_and_resolve_type_name
+from py2graph.parser.parser_interface import ModuleLevels, NodeType, ParsedEntity
+
+# nodes and fields holding names, constants, expression contexts and operators, none of them contains
+# a call or an assignment
+LEAF_NODES = (ast.Name, ast.Constant)
+LEAF_FIELDS = {'ctx', 'op', 'ops'}
+
+# the nodes of a function body the extractor looks at
+RECORDED_NODES = (ast.Call, ast.Assign, ast.AnnAssign)
+
+_child_fields: Dict[type, Tuple[str, ...]] = {}
+
+
+class ModuleExtractor(ast.NodeVisitor):
+    """
+    Extracts the entities of a module in a single traversal of its AST.
+
+    The result is the same as running the module through ModuleParser, ClassParser, MethodParser,
+    MethodBodyParser, ConstructorParser and AttributeParser: the same entities and relationships, grouped
+    by their depth in the deferred chain, in the same order. The classes and functions are visited depth
+    first, which appends the entities of every depth in the order the deferred queue visits them. Function
+    bodies are scanned breadth first, since that is the order of ast.walk the body parsers record calls in.
+    """
+
+    def __init__(self, module_fqn: str):
+        self.module_fqn = module_fqn
+        self.imports: Dict[str, str] = {}
+        self.levels: ModuleLevels = []
+        self._fqn = module_fqn
+        self._depth = 0
+
+    def extract(self, module: ast.Module) -> ModuleLevels:
+        self.visit(module)
+        return self.levels
+
+    def visit_Module(self, node: ast.Module):
+        fqn = self.module_fqn
+        for child in node.body:
+            if isinstance(child, (ast.Import, ast.ImportFrom)):
+                self.imports.update(parse_import(child))
+        relationships = [(fqn, imported_fqn, "imports") for imported_fqn in self.imports.values()]
+
+        members = [child for child in node.body if isinstance(child, (ast.ClassDef, ast.FunctionDef))]
+        relationships.extend((fqn, f"{fqn}.{child.name}", "contains") for child in members)
+        self._add(0, ParsedEntity(fqn=fqn, name=fqn.split('.')[-1], entity_type=NodeType.MODULE,
+                                  relationships=relationships))
+        for child in members:
+            self._visit_member(child, f"{fqn}.{child.name}", 1)
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        fqn, depth = self._fqn, self._depth
+        base_classes = [resolve_fqn(base, fqn.split('.')[-1], self.imports) for base in node.bases]
+        root_package_prefix = fqn.split('.')[0]
+        inherited = [base_class for base_class in base_classes if base_class.startswith(root_package_prefix)]
+        if 'abc.ABC' in base_classes:
+            inherited.append('abc.ABC')
+        relationships = [(fqn, base_class, "inherits") for base_class in inherited]
+
+        members = []
+        for child in node.body:
+            if isinstance(child, ast.FunctionDef):
+                name = child.name
+            elif isinstance(child, ast.AnnAssign):
+                name = child.target.id
+            elif isinstance(child, ast.Assign):
+                name = child.targets[0].id
+            else:
+                continue
+            relationships.append((fqn, f"{fqn}.{name}", "defines"))
+            members.append((child, f"{fqn}.{name}"))
+
+        self._add(depth, ParsedEntity(fqn=fqn, name=fqn.split('.')[-1], entity_type=NodeType.CLASS,
+                                      relationships=relationships))
+        for child, member_fqn in members:
+            if isinstance(child, ast.FunctionDef):
+                self._visit_member(child, member_fqn, depth + 1)
+            else:
+                self._add(depth + 1, self._attribute(child, member_fqn))
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        fqn, depth = self._fqn, self._depth
+        relationships = []
+        for arg in node.args.args:
+            if arg.annotation:
+                relationships.extend((fqn, argument, "has_argument") for argument in
+                                     split_and_resolve_type_name(infer_type_from_annotation(arg.annotation),
+                                                                 self.imports))
+        if node.returns:
+            relationships.extend((fqn, return_type, "returns") for return_type in
+                                 split_and_resolve_type_name(infer_type_from_annotation(node.returns), self.imports))
+        self._add(depth, ParsedEntity(fqn=fqn, name=fqn.split('.')[-1], entity_type=NodeType.METHOD,
+                                      relationships=relationships))
+
+        if node.name == "__init__":
+            self._constructor(node, fqn, depth + 1)
+        else:
+            self._body(node, fqn, depth + 1)
+
+    def _visit_member(self, node: ast.AST, fqn: str, depth: int):
+        self._fqn, self._depth = fqn, depth
+        self.visit(node)
+
+    def _add(self, depth: int, entity: ParsedEntity):
+        if depth == len(self.levels):
+            self.levels.append([])
+        self.levels[depth].append(entity)
+
+    def _attribute(self, node: ast.AST, fqn: str) -> ParsedEntity:
+        entity, _ = AttributeParser(self.imports).parse(node, fqn)
+        return entity
+
+    def _body(self, node: ast.FunctionDef, fqn: str, depth: int):
+        imports = self.imports
+        relationships = []
+        for child in walk_function(node):
+            if not isinstance(child, ast.Call):
+                continue
+            func = child.func
+            if isinstance(func, ast.Name):
+                relationships.append((fqn, imports.get(func.id, func.id), "uses"))
+            elif isinstance(func, ast.Attribute):
+                target_fqn = resolve_nested_attribute(func)
+                # ignore calls on objects that are not imported
+                if target_fqn.split('.')[0] in imports:
+                    relationships.append((fqn, target_fqn, "uses"))
+
+        self._add(depth, ParsedEntity(fqn=fqn, name=fqn.split('.')[-1], entity_type=NodeType.BODY,
+                                      relationships=relationships))
+
+    def _constructor(self, node: ast.FunctionDef, fqn: str, depth: int):
+        imports = self.imports
+        class_fqn = ".".join(fqn.split(".")[:-1])
+        root_package_prefix = fqn.split('.')[0]
+        relationships = []
+        attributes: List[Tuple[ast.AST, str]] = []
+        for child in walk_function(node):
+            if isinstance(child, ast.Call):
+                func = child.func
+                if isinstance(func, ast.Name) and func.id != "super":
+                    relationships.append((fqn, imports.get(func.id, f"{root_package_prefix}.{func.id}"), "uses"))
+                elif isinstance(func, ast.Attribute) and not (
+                        isinstance(func.value, ast.Call) and isinstance(func.value.func, ast.Name)
+                        and func.value.func.id == "super"):
+                    target_fqn = f"{func.value.id}.{func.attr}" if isinstance(func.value, ast.Name) else func.attr
+                    relationships.append((fqn, target_fqn, "uses"))
+                continue
+
+            target = child.target if isinstance(child, ast.AnnAssign) else child.targets[0]
+            if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) and target.value.id == "self":
+                attr_fqn = f"{fqn}.{target.attr}"
+                attributes.append((child, attr_fqn))
+                relationships.append((fqn, attr_fqn, "defines"))
+                relationships.append((class_fqn, attr_fqn, "defines"))
+
+        self._add(depth, ParsedEntity(fqn=fqn, name="__init__", entity_type=NodeType.CONSTRUCTOR,
+                                      relationships=relationships))
+        for child, attr_fqn in attributes:
+            self._add(depth + 1, self._attribute(child, attr_fqn))
+
+
+def walk_function(node: ast.AST) -> Iterator[ast.AST]:
+    """
+    Yield the calls and assignments below a node, in the breadth-first order of ast.walk.
+
+    Unlike ast.walk it does not create a generator per node, and it does not descend into names,
+    constants, contexts and operators.
+    """
+    queue = [node]
+    # the loop also visits the nodes appended while it runs
+    for current in queue:
+        node_type = type(current)
+        fields = _child_fields.get(node_type)
+        if fields is None:
+            fields = _child_fields[node_type] = _fields_to_walk(node_type)
+        if not fields:
+            continue
+        if node_type in RECORDED_NODES:
+            yield current
+        for field in fields:
+            value = getattr(current, field, None)
+            if type(value) is list:
+                queue.extend(value)
+            else:
+                # None and plain values are skipped when they are reached
+                queue.append(value)
+
+
+def _fields_to_walk(node_type: type) -> Tuple[str, ...]:
+    if not issubclass(node_type, ast.AST) or node_type in LEAF_NODES:
+        return ()
+    return tuple(field for field in node_type._fields if field not in LEAF_FIELDS)
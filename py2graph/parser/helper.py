@@ -58,6 +58,17 @@ def infer_type_from_value(value_node: ast.AST):
     return None
 
 
+def parse_import(node):
+    """
+    Map the names bound by an import statement to the fully qualified names they refer to.
+    """
+    base_fqn = getattr(node, 'module', "") if isinstance(node, ast.ImportFrom) else ""
+    return {
+        (alias.asname or alias.name): (f"{base_fqn}.{alias.name}" if base_fqn else alias.name)
+        for alias in node.names
+    }
+
+
 def resolve_type(type_name, imports):
     # Check if the type is in imports to resolve to FQN
     return imports.get(type_name, type_name)
@@ -1,5 +1,6 @@
 import ast
 
+from py2graph.parser.helper import parse_import
 from py2graph.parser.parser_interface import IParser, DeferredParsingExpression, ParsedEntity, NodeType
 
 
@@ -31,8 +32,4 @@ class ModuleParser(IParser):
                             relationships=relationships), deferred_parsing
 
     def _parse_import(self, node):
-        base_fqn = getattr(node, 'module', "") if isinstance(node, ast.ImportFrom) else ""
-        return {
-            (alias.asname or alias.name): (f"{base_fqn}.{alias.name}" if base_fqn else alias.name)
-            for alias in node.names
-        }
+        return parse_import(node)
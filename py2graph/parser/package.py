@@ -1,8 +1,9 @@
 import ast
 import os
 from pathlib import Path
+from typing import Iterator, Optional, Union
 
-from py2graph.parser.parser_interface import IParser, DeferredParsingExpression, ParsedEntity, NodeType
+from py2graph.parser.parser_interface import IParser, DeferredParsingExpression, ParsedEntity, NodeType, ModuleSource
 
 
 class PackageParser(IParser):
@@ -16,8 +17,38 @@ class PackageParser(IParser):
         Creates deferred parsing expressions for modules and subpackages.
         Adds "contains" relationships for discovered subpackages and modules.
         """
+        parsed_entities, module_sources = self.discover(package_fqn)
+        deferred_parsing = [
+            DeferredParsingExpression(
+                fqn=module_source.fqn,
+                node=read_module_ast(module_source),
+                context="module",
+                imported_fqn={}
+            )
+            for module_source in module_sources
+        ]
+        return parsed_entities, deferred_parsing
+
+    def discover(self, package_fqn: str):
+        """
+        Walk the package structure without reading any module.
+        Returns the package entities and one ModuleSource per module file, in os.walk order.
+        """
         parsed_entities = []
-        deferred_parsing = []
+        module_sources = []
+        for item in self.iter_package(package_fqn):
+            if isinstance(item, ModuleSource):
+                module_sources.append(item)
+            else:
+                parsed_entities.append(item)
+        return parsed_entities, module_sources
+
+    def iter_package(self, package_fqn: str) -> Iterator[Union[ParsedEntity, ModuleSource]]:
+        """
+        Lazily walk the package structure.
+        Yields a ModuleSource for each module file as it is found and the package entity of a directory
+        once its files and subdirectories have been listed.
+        """
         for root, dirs, files in os.walk(self.package_path):
             # Determine the FQN of the current directory
             current_fqn = (
@@ -28,23 +59,14 @@ class PackageParser(IParser):
             relationships = []
             if current_fqn.endswith('__pycache__'):
                 continue
-            # Add deferred parsing expressions for each module in the directory
+            # Yield a module source for each module in the directory
             for file in files:
                 if file.endswith('.py') and file != '__init__.py':
                     module_fqn = f"{current_fqn}.{file[:-3]}"
                     relationships.append((current_fqn, module_fqn, "contains"))
-                    with open(Path(root) / file, 'r') as f:
-                        module_ast = ast.parse(f.read(), filename=file)
-                    deferred_parsing.append(
-                        DeferredParsingExpression(
-                            fqn=module_fqn,
-                            node=module_ast,
-                            context="module",
-                            imported_fqn={}
-                        )
-                    )
-
-            # Add deferred parsing expressions for subdirectories
+                    yield ModuleSource(fqn=module_fqn, path=str(Path(root) / file))
+
+            # Add contains relationships for subdirectories
             for subdir in dirs:
                 if subdir.endswith('__pycache__'):
                     continue
@@ -52,12 +74,19 @@ class PackageParser(IParser):
 
             # Add a package node for directories with __init__.py
             if '__init__.py' in files:
-                package_entity = ParsedEntity(
+                yield ParsedEntity(
                     fqn=current_fqn,
                     name=Path(root).name,
                     entity_type=NodeType.PACKAGE,
                     relationships=relationships
                 )
-                parsed_entities.append(package_entity)
 
-        return parsed_entities, deferred_parsing
+
+def read_module_ast(module_source: ModuleSource, source_code: Optional[bytes] = None) -> ast.Module:
+    """
+    Parse a module file, or its already read source code.
+    """
+    if source_code is None:
+        with open(module_source.path, 'rb') as f:
+            source_code = f.read()
+    return ast.parse(source_code, filename=Path(module_source.path).name)
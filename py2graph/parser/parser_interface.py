@@ -1,8 +1,9 @@
 import ast
 from abc import ABC, abstractmethod
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from enum import Enum
-from typing import List, Dict
+from sys import intern
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from py2graph.parser.helper import infer_type_from_value, infer_type_from_annotation, infer_fqn_from_base
 
@@ -37,20 +38,63 @@ class NodeType(Enum):
     TYPE = "type"
 
 
-@dataclass
+# (source, target, relation), the target is None when it could not be inferred
+Relationship = Tuple[str, Optional[str], str]
+
+
 class ParsedEntity:
-    fqn: str
-    name: str
-    entity_type: NodeType
-    attributes: List[str] = field(default_factory=list)
-    methods: List[str] = field(default_factory=list)
-    base_classes: List[str] = field(default_factory=list)
-    relationships: List[tuple] = field(default_factory=list)  # e.g., (source, target, relation)
+    """
+    An entity found by a parser and its relationships.
+
+    There is one per package, module, class, method and attribute, so the record has slots instead of a
+    __dict__. The strings of the relationships are interned: every reference to the same target shares
+    one string, which is also the key of the node in the graph.
+    """
+    __slots__ = ('fqn', 'name', 'entity_type', 'attributes', 'methods', 'base_classes', 'relationships')
+
+    def __init__(self, fqn: str, name: str, entity_type: NodeType, attributes: Sequence[str] = (),
+                 methods: Sequence[str] = (), base_classes: Sequence[str] = (),
+                 relationships: Iterable[Relationship] = ()):
+        self.fqn = intern(fqn)
+        self.name = name
+        self.entity_type = entity_type
+        self.attributes = attributes
+        self.methods = methods
+        self.base_classes = base_classes
+        self.relationships: List[Relationship] = [
+            (intern(source), intern(target) if type(target) is str else target, intern(relation))
+            for source, target, relation in relationships]
+
+    def __reduce__(self):
+        # unpickle through __init__, so entities from worker processes and the parse cache are interned too
+        return ParsedEntity, (self.fqn, self.name, self.entity_type, self.attributes, self.methods,
+                              self.base_classes, self.relationships)
+
+    def __eq__(self, other):
+        if not isinstance(other, ParsedEntity):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self):
+        fields = ', '.join(f"{slot}={getattr(self, slot)!r}" for slot in self.__slots__)
+        return f"ParsedEntity({fields})"
 
 
 @dataclass
 class DeferredParsingExpression:
+    __slots__ = ('fqn', 'node', 'context', 'imported_fqn')
     fqn: str
     node: ast.AST
     context: str  # e.g., 'module', 'class'
     imported_fqn: Dict[str, str]
+
+
+@dataclass
+class ModuleSource:
+    __slots__ = ('fqn', 'path')
+    fqn: str
+    path: str
+
+
+# parsed entities of one module, grouped by their depth in the deferred chain
+ModuleLevels = List[List[ParsedEntity]]
@@ -1,22 +1,34 @@
-import time
-from typing import Iterable
+from typing import Optional
 
 import networkx as nx
 
+from py2graph.graphcreator.compactgraph import CompactGraph
 from py2graph.graphcreator.graphcreator import GraphCreator
+from py2graph.graphcreator.parsecache import ParseCache
+from py2graph.graphcreator.stats import PipelineStats
 from py2graph.graphviewer.puml import PumlGenerator
 from py2graph.parser.attribute import AttributeParser
 from py2graph.parser.classparser import ClassParser
 from py2graph.parser.constructor import ConstructorParser
+from py2graph.parser.extractor import ModuleExtractor
 from py2graph.parser.method import MethodParser
 from py2graph.parser.methodbody import MethodBodyParser
 from py2graph.parser.moduleparser import ModuleParser
 from py2graph.parser.package import PackageParser
 
 
-def py2graph(domain_path: str, domain_module: str) -> Iterable[str]:
-    start_time = time.time()
-    graph = nx.DiGraph()  # Directed graph for all entities
+# graph classes GraphCreator can build, the compact one trades some speed for a much smaller footprint
+GRAPH_BACKENDS = {"networkx": nx.DiGraph,
+                  "compact": CompactGraph}
+
+
+def create_graph(domain_path: str, domain_module: str, workers: int = 1, cache_dir: Optional[str] = None,
+                 backend: str = "networkx", stats: Optional[PipelineStats] = None):
+    """
+    Build the graph of a package. The time of every stage and the counters of the run are added to stats,
+    whose hooks are called as the stages end.
+    """
+    graph = GRAPH_BACKENDS[backend]()  # Directed graph for all entities
 
     parser = {"package": PackageParser,
               "module": ModuleParser,
@@ -24,15 +36,18 @@ def py2graph(domain_path: str, domain_module: str) -> Iterable[str]:
               "method": MethodParser,
               "attribute": AttributeParser,
               "body": MethodBodyParser,
-              "constructor": ConstructorParser}
-    orchestrator = GraphCreator(graph, parser)
-
-    orchestrator.parse_package(domain_path, domain_module)
+              "constructor": ConstructorParser,
+              "extractor": ModuleExtractor}
+    cache = ParseCache(cache_dir, parser) if cache_dir is not None else None
+    orchestrator = GraphCreator(graph, parser, cache, stats)
 
-    generator = PumlGenerator(graph, "")
-    result = generator.generate()
-    end_time = time.time()
+    orchestrator.parse_package(domain_path, domain_module, workers)
+    return graph
 
-    print(f"Execution time: {end_time - start_time} seconds")
 
-    return result
+def py2graph(domain_path: str, domain_module: str, workers: int = 1, cache_dir: Optional[str] = None,
+             backend: str = "networkx", deterministic: bool = False, stats: Optional[PipelineStats] = None) -> str:
+    stats = stats if stats is not None else PipelineStats()
+    graph = create_graph(domain_path, domain_module, workers, cache_dir, backend, stats)
+    with stats.stage("puml_generate"):
+        return PumlGenerator(graph, "", deterministic).generate()
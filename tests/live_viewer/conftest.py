@@ -0,0 +1,90 @@
+import base64
+import string
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+# the live viewer is a script directory, its modules import each other by their plain names
+LIVE_VIEWER_PATH = str(Path(__file__).resolve().parents[2] / "live-viewer")
+if LIVE_VIEWER_PATH not in sys.path:
+    sys.path.insert(0, LIVE_VIEWER_PATH)
+
+PLANTUML_ALPHABET = string.digits + string.ascii_uppercase + string.ascii_lowercase + '-_'
+BASE64_ALPHABET = string.ascii_uppercase + string.ascii_lowercase + string.digits + '+/'
+PLANTUML_TO_B64 = bytes.maketrans(PLANTUML_ALPHABET.encode(), BASE64_ALPHABET.encode())
+
+
+def decode_plantuml_url(encoded: str) -> str:
+    compressed = base64.b64decode(encoded.encode().translate(PLANTUML_TO_B64) + b'==')
+    return zlib.decompress(compressed, -zlib.MAX_WBITS).decode('utf-8')
+
+
+class FakePlantUMLServer(ThreadingHTTPServer):
+    """
+    A local stand-in for the PlantUML server, it answers every diagram with an SVG that holds its source.
+
+    fail_next answers that many requests with 503, delay holds every answer back. The server records
+    the requests it got, the client ports it saw them from and the highest number of concurrent renders.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakePlantUMLHandler)
+        self.fail_next = 0
+        self.delay = 0.0
+        self.received = []
+        self.client_ports = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/svg"
+
+
+class FakePlantUMLHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._render("GET", decode_plantuml_url(self.path.rsplit('/', 1)[1]))
+
+    def do_POST(self):
+        self._render("POST", self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+
+    def _render(self, method: str, source: str):
+        server = self.server
+        with server.lock:
+            server.received.append((method, source))
+            server.client_ports.add(self.client_address[1])
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            failing = server.fail_next > 0
+            server.fail_next -= failing
+        time.sleep(server.delay)
+        with server.lock:
+            server.in_flight -= 1
+        status, body = (503, b"busy") if failing else (200, f"<svg>{source}</svg>".encode('utf-8'))
+        self.send_response(status)
+        self.send_header('Content-Type', 'image/svg+xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def plantuml_server():
+    server = FakePlantUMLServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,34 @@
+"""
+A stand-in for PlantUML in pipe mode, so the pipe renderer can be tested without Java.
+
+It answers every diagram it reads from stdin with an SVG that holds its process id and its source, followed by
+the delimiter given with -pipedelimitor. Diagrams that contain "syntax error" are answered with an error,
+"crash" ends the process and "hang" makes it stop answering.
+"""
+import os
+import sys
+import time
+
+
+def main():
+    delimiter = sys.argv[sys.argv.index('-pipedelimitor') + 1]
+    lines = []
+    for line in sys.stdin:
+        lines.append(line)
+        if not line.startswith('@enduml'):
+            continue
+        source = ''.join(lines).rstrip('\n')
+        lines = []
+        if 'crash' in source:
+            sys.exit(1)
+        if 'hang' in source:
+            time.sleep(60)
+        if 'syntax error' in source:
+            sys.stdout.write(f"ERROR\n2\nSyntax Error?\n{delimiter}\n")
+        else:
+            sys.stdout.write(f"<svg data-pid=\"{os.getpid()}\">{source}</svg>{delimiter}\n")
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+from debounce import bursts, is_relevant
+
+
+def test_is_relevant_ignores_tool_directories():
+    """
+    Test that only Python files and directories outside version control, virtualenvs and caches are relevant.
+    """
+    assert is_relevant(os.path.join("pkg", "module.py"))
+    assert is_relevant(os.path.join("pkg", "sub"), is_directory=True)
+    assert not is_relevant(os.path.join("pkg", "notes.txt"))
+    assert not is_relevant(os.path.join("pkg", "__pycache__", "module.py"))
+    assert not is_relevant(os.path.join(".git", "objects", "ab"), is_directory=True)
+    assert not is_relevant(os.path.join("pkg", ".venv", "lib", "site.py"))
+    # only the part below the watched root is checked
+    assert is_relevant(os.path.join("venv", "project", "module.py"), root="venv")
+
+
+def test_bursts_coalesce_events():
+    """
+    Test that a burst of events is yielded once the debounce window passed, and that events arriving
+    while the consumer handles a burst make up exactly one more burst.
+    """
+    async def run():
+        events = asyncio.Queue()
+        counts = []
+        for index in range(50):
+            events.put_nowait(f"pkg/module{index}.py")
+
+        async for count in bursts(events, debounce_seconds=0.05):
+            counts.append(count)
+            if len(counts) == 1:
+                # events during the first rebuild
+                for _ in range(10):
+                    events.put_nowait("pkg/module.py")
+                await asyncio.sleep(0.05)
+            else:
+                break
+        return counts, events.qsize()
+
+    assert asyncio.run(run()) == ([50, 10], 0)
+
+
+def test_bursts_wait_for_a_quiet_window():
+    """
+    Test that events spread over time are one burst as long as every gap is shorter than the window.
+    """
+    async def run():
+        events = asyncio.Queue()
+        burst = asyncio.ensure_future(bursts(events, debounce_seconds=0.2).__anext__())
+        for _ in range(5):
+            events.put_nowait("pkg/module.py")
+            await asyncio.sleep(0.05)
+        assert not burst.done()
+        return await asyncio.wait_for(burst, 2)
+
+    assert asyncio.run(run()) == 5
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import shutil
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from main import LiveViewer
+from plantumlclient import PlantUMLClient
+from protocol import decode_diagram
+from rendercache import RenderCache
+from webserver import websocket_accept
+
+EXAMPLE_PACKAGE = Path(__file__).resolve().parents[2] / "example" / "productworld" / "productworld"
+
+
+class Client:
+    """
+    A minimal websocket client, just enough to talk to the live viewer.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, port: int):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n")
+        head = await reader.readuntil(b"\r\n\r\n")
+        assert head.startswith(b"HTTP/1.1 101")
+        assert f"Sec-WebSocket-Accept: {websocket_accept('dGhlIHNhbXBsZSBub25jZQ==')}".encode() in head
+        return cls(reader, writer)
+
+    def send(self, message: dict):
+        payload = json.dumps(message).encode()
+        mask = b"\x01\x02\x03\x04"
+        masked = bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+        length = struct.pack(">BH", 0x80 | 126, len(payload)) if len(payload) > 125 else bytes([0x80 | len(payload)])
+        self.writer.write(bytes([0x81]) + length + mask + masked)
+
+    async def receive(self, timeout: float = 5):
+        first, second = await asyncio.wait_for(self.reader.readexactly(2), timeout)
+        length = second & 0x7F
+        if length == 126:
+            length, = struct.unpack(">H", await self.reader.readexactly(2))
+        elif length == 127:
+            length, = struct.unpack(">Q", await self.reader.readexactly(8))
+        payload = await self.reader.readexactly(length)
+        return payload.decode() if first & 0x0F == 1 else decode_diagram(payload)
+
+    async def receive_until(self, done, timeout: float = 5):
+        messages = []
+        while not done(messages):
+            messages.append(await self.receive(timeout))
+        return messages
+
+
+def diagrams_in(messages):
+    return {header['fragment']: svg for header, svg in (message for message in messages if isinstance(message, tuple))}
+
+
+@pytest.fixture
+def package(tmp_path):
+    return shutil.copytree(EXAMPLE_PACKAGE, tmp_path / "productworld")
+
+
+def run_viewer(plantuml_server, scenario, **kwargs):
+    async def run():
+        viewer = LiveViewer(PlantUMLClient(plantuml_server.url), RenderCache(),
+                            ThreadPoolExecutor(max_workers=1), **kwargs)
+        server = await viewer.start('127.0.0.1', 0)
+        try:
+            return await scenario(viewer, server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            viewer.close()
+
+    return asyncio.run(run())
+
+
+def test_viewer_serves_the_page(plantuml_server):
+    """
+    Test that the viewer serves index.html on the same port as the websocket.
+    """
+    async def scenario(viewer, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        return response
+
+    response = run_viewer(plantuml_server, scenario)
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert b"<title>Live Diagram Viewer</title>" in response
+
+
+def test_viewer_pushes_changed_package_diagrams(plantuml_server, package):
+    """
+    Test that a client gets every diagram once, a returning client only the ones it does not hold, and that a
+    changed module only sends the diagram of its package.
+    """
+    async def scenario(viewer, port):
+        client = await Client.connect(port)
+        client.send({"action": "sync", "versions": {}})
+        assert json.loads(await client.receive()) == {"type": "manifest", "fragments": {}}
+
+        client.send({"action": "updatePath", "path": str(package)})
+        messages = await client.receive_until(lambda messages: len(diagrams_in(messages)) == 3)
+        manifest = json.loads(messages[0])["fragments"]
+        assert sorted(manifest) == ["productworld", "productworld.base", "productworld.products"]
+        assert "Path updated successfully" in messages
+
+        # a returning client holds all but one diagram
+        returning = await Client.connect(port)
+        returning.send({"action": "sync", "versions": dict(manifest, **{"productworld.base": "old"})})
+        messages = await returning.receive_until(lambda messages: diagrams_in(messages))
+        assert list(diagrams_in(messages)) == ["productworld.base"]
+
+        with open(package / "products" / "product.py", "a") as f:
+            f.write("\n\nclass Added:\n    pass\n")
+        messages = await client.receive_until(lambda messages: diagrams_in(messages), timeout=10)
+        assert list(diagrams_in(messages)) == ["productworld.products"]
+        assert b"class productworld.products.product.Added" in diagrams_in(messages)["productworld.products"]
+        return len(plantuml_server.received)
+
+    assert run_viewer(plantuml_server, scenario, debounce_seconds=0.1, split_packages=True) == 4
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from plantumlclient import PlantUMLClient, RenderError
+
+DIAGRAM = "@startuml\nclass A\n@enduml"
+
+
+def test_render_reuses_one_connection(plantuml_server):
+    """
+    Test that diagrams are sent in the URL and that consecutive renders share a connection.
+    """
+    with PlantUMLClient(plantuml_server.url) as client:
+        assert client.render(DIAGRAM) == f"<svg>{DIAGRAM}</svg>".encode()
+        assert client.render(DIAGRAM + "\n") == f"<svg>{DIAGRAM}\n</svg>".encode()
+
+    assert plantuml_server.received == [("GET", DIAGRAM), ("GET", DIAGRAM + "\n")]
+    assert len(plantuml_server.client_ports) == 1
+
+
+def test_render_posts_large_diagrams(plantuml_server):
+    """
+    Test that diagrams whose encoded URL is too long are posted.
+    """
+    diagram = "@startuml\n" + "\n".join(f"class C{index}" for index in range(2000)) + "\n@enduml"
+    with PlantUMLClient(plantuml_server.url, max_url_length=2000) as client:
+        assert client.render(diagram) == f"<svg>{diagram}</svg>".encode()
+        assert client.posts == 1
+
+    assert plantuml_server.received == [("POST", diagram)]
+
+
+def test_render_retries_overload_responses(plantuml_server):
+    """
+    Test that overload responses are retried until the retries are used up.
+    """
+    plantuml_server.fail_next = 2
+    with PlantUMLClient(plantuml_server.url, retries=2, backoff_factor=0) as client:
+        assert client.render(DIAGRAM) == f"<svg>{DIAGRAM}</svg>".encode()
+    assert len(plantuml_server.received) == 3
+
+    plantuml_server.fail_next = 2
+    with PlantUMLClient(plantuml_server.url, retries=1, backoff_factor=0) as client:
+        with pytest.raises(RenderError, match="503"):
+            client.render(DIAGRAM)
+
+
+def test_render_times_out_on_a_hung_server(plantuml_server):
+    """
+    Test that a server that does not answer in time raises a RenderError instead of blocking.
+    """
+    plantuml_server.delay = 1.0
+    with PlantUMLClient(plantuml_server.url, timeout=0.2, retries=0) as client:
+        start = time.monotonic()
+        with pytest.raises(RenderError, match="not reachable"):
+            client.render(DIAGRAM)
+        assert time.monotonic() - start < 0.9
+
+
+def test_submit_caps_renders_in_flight(plantuml_server):
+    """
+    Test that submitted renders run in the background and never more than max_in_flight at once.
+    """
+    plantuml_server.delay = 0.05
+    with PlantUMLClient(plantuml_server.url, max_in_flight=2) as client:
+        futures = [client.submit(f"@startuml\nclass C{index}\n@enduml") for index in range(6)]
+        results = [future.result(timeout=5) for future in futures]
+
+    assert results == [f"<svg>@startuml\nclass C{index}\n@enduml</svg>".encode() for index in range(6)]
+    assert plantuml_server.max_in_flight == 2
@@ -0,0 +1,53 @@
+import struct
+
+from protocol import DiagramStore, decode_diagram, encode_diagram, websocket_frame
+from rendercache import puml_key
+
+
+def test_diagram_frames_round_trip():
+    """
+    Test that a diagram frame carries its header and the raw SVG bytes.
+    """
+    svg = b"<svg>\x00\xff</svg>"
+    header, payload = decode_diagram(encode_diagram("pkg", "1234", svg))
+    assert header == {"type": "diagram", "fragment": "pkg", "version": "1234", "contentType": "image/svg+xml"}
+    assert payload == svg
+
+
+def test_websocket_frame_lengths():
+    """
+    Test that binary frames use the short, 16 bit and 64 bit length encodings.
+    """
+    assert websocket_frame(b"abc") == b"\x82\x03abc"
+    assert websocket_frame(b"x" * 300)[:4] == b"\x82\x7e" + struct.pack(">H", 300)
+    assert websocket_frame(b"x" * 70000)[:10] == b"\x82\x7f" + struct.pack(">Q", 70000)
+
+
+def test_store_sends_only_changed_fragments():
+    """
+    Test that clients only get the fragments whose version differs from the one they hold.
+    """
+    store = DiagramStore()
+    changed = store.update({"pkg.a": "@startuml a", "pkg.b": "@startuml b"})
+    assert [diagram.fragment for diagram in changed] == ["pkg.a", "pkg.b"]
+    for diagram in changed:
+        assert store.set_svg(diagram.fragment, diagram.version, diagram.puml.encode())
+
+    # a returning client holds an up to date pkg.a
+    store.connect("returning", {"pkg.a": puml_key("@startuml a"), "pkg.gone": "0"})
+    store.connect("new", {})
+    assert [diagram.fragment for diagram in store.take_pending("returning")] == ["pkg.b"]
+    assert [diagram.fragment for diagram in store.take_pending("new")] == ["pkg.a", "pkg.b"]
+    assert store.take_pending("new") == []
+    assert store.clients["returning"] == store.manifest()
+
+    # a rebuild that only changes pkg.b renders and sends pkg.b alone
+    changed = store.update({"pkg.a": "@startuml a", "pkg.b": "@startuml b2"})
+    assert [diagram.fragment for diagram in changed] == ["pkg.b"]
+    assert store.take_pending("new") == []
+    assert not store.set_svg("pkg.b", puml_key("@startuml b"), b"stale")
+    assert store.set_svg("pkg.b", changed[0].version, b"b2")
+    assert [diagram.svg for diagram in store.take_pending("new")] == [b"b2"]
+
+    store.disconnect("new")
+    assert store.take_pending("new") == []
@@ -0,0 +1,100 @@
+import os
+
+from rendercache import RenderCache, puml_key
+
+
+def test_memory_tier_evicts_least_recently_used():
+    """
+    Test that the memory tier evicts the least recently used diagrams once it exceeds its size.
+    """
+    cache = RenderCache(max_bytes=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.size == 8
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    cache.put("large", b"x" * 11)
+    assert "large" not in cache
+    assert len(cache) == 2
+
+
+def test_get_or_render_renders_every_diagram_once(capsys):
+    """
+    Test that a diagram is only rendered for the first request of its PUML text.
+    """
+    rendered = []
+
+    def render(puml_text):
+        rendered.append(puml_text)
+        return puml_text.upper().encode()
+
+    cache = RenderCache()
+    assert cache.get_or_render("@startuml\n@enduml", render) == b"@STARTUML\n@ENDUML"
+    assert cache.get_or_render("@startuml\n@enduml", render) == b"@STARTUML\n@ENDUML"
+    assert cache.get_or_render("@startuml a\n@enduml", render) == b"@STARTUML A\n@ENDUML"
+
+    assert rendered == ["@startuml\n@enduml", "@startuml a\n@enduml"]
+    assert "Render cache: 1 hits (0 from disk), 2 misses" in capsys.readouterr().out
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    """
+    Test that diagrams written to the disk tier are found by a new cache and evicted by size.
+    """
+    cache = RenderCache(cache_dir=str(tmp_path), max_disk_bytes=10)
+    cache.put(puml_key("first"), b"first")
+    cache.put(puml_key("second"), b"second")
+
+    restarted = RenderCache(cache_dir=str(tmp_path), max_disk_bytes=10)
+    assert restarted.get(puml_key("second")) == b"second"
+    assert restarted.get(puml_key("first")) is None
+    assert (restarted.hits, restarted.disk_hits, restarted.misses) == (1, 1, 1)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"{puml_key('second')}.svg"]
+
+
+def test_disk_tier_is_best_effort(tmp_path, monkeypatch):
+    """
+    Test that a failed write keeps the diagram in memory and leaves no temporary file behind.
+    """
+    cache = RenderCache(cache_dir=str(tmp_path))
+
+    def replace(source, target):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "replace", replace)
+    cache.put(puml_key("full"), b"full")
+
+    assert cache.get(puml_key("full")) == b"full"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_disk_tier_lists_the_directory_only_when_over_budget(tmp_path, monkeypatch):
+    cache = RenderCache(cache_dir=str(tmp_path), max_disk_bytes=10)
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or scandir(path))
+
+    cache.put(puml_key("first"), b"first")
+    cache.put(puml_key("first"), b"first")
+    assert scans == []
+    cache.put(puml_key("second"), b"second")
+    assert len(scans) == 1
+    assert sorted(path.name for path in tmp_path.iterdir()) == [f"{puml_key('second')}.svg"]
+
+
+def test_unusable_cache_dir_falls_back_to_memory(tmp_path):
+    not_a_directory = tmp_path / "file"
+    not_a_directory.write_text("")
+
+    cache = RenderCache(cache_dir=str(not_a_directory / "cache"))
+    cache.put(puml_key("diagram"), b"diagram")
+
+    assert cache.cache_dir is None
+    assert cache.get(puml_key("diagram")) == b"diagram"
+
@@ -0,0 +1,74 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from renderer import PipeRenderer, RenderError, Renderer
+
+STUB_PLANTUML = [sys.executable, str(Path(__file__).resolve().parent / "stub_plantuml.py")]
+
+DIAGRAM = "@startuml\nclass A\n@enduml"
+
+
+def svg_of(renderer: PipeRenderer, puml_text: str) -> str:
+    return renderer.render(puml_text).decode('utf-8')
+
+
+def test_pipe_renderer_keeps_its_process():
+    """
+    Test that consecutive diagrams are rendered by the same process.
+    """
+    with PipeRenderer(STUB_PLANTUML) as renderer:
+        first = svg_of(renderer, DIAGRAM)
+        second = renderer.submit("@startuml\nclass B\n@enduml\n").result()
+        assert first.endswith(f">{DIAGRAM}</svg>")
+        assert second.decode('utf-8').endswith(">@startuml\nclass B\n@enduml</svg>")
+        assert first.split(">")[0] == second.decode('utf-8').split(">")[0]
+        assert renderer.started == 1
+
+
+def test_pipe_renderer_reports_diagram_errors():
+    """
+    Test that a diagram PlantUML rejects raises a RenderError and leaves the process running.
+    """
+    with PipeRenderer(STUB_PLANTUML) as renderer:
+        with pytest.raises(RenderError, match="Syntax Error"):
+            renderer.render("@startuml\nsyntax error\n@enduml")
+        assert svg_of(renderer, DIAGRAM).endswith(f">{DIAGRAM}</svg>")
+        assert renderer.started == 1
+
+
+def test_pipe_renderer_restarts_broken_processes():
+    """
+    Test that a process that ended or hung is replaced for the next diagram.
+    """
+    with PipeRenderer(STUB_PLANTUML, timeout=0.5) as renderer:
+        with pytest.raises(RenderError, match="ended"):
+            renderer.render("@startuml\ncrash\n@enduml")
+        assert svg_of(renderer, DIAGRAM).endswith(f">{DIAGRAM}</svg>")
+
+        start = time.monotonic()
+        with pytest.raises(RenderError, match="did not answer"):
+            renderer.render("@startuml\nhang\n@enduml")
+        assert time.monotonic() - start < 5
+        assert svg_of(renderer, DIAGRAM).endswith(f">{DIAGRAM}</svg>")
+        assert renderer.started == 3
+
+
+def test_pipe_renderer_without_plantuml():
+    """
+    Test that a missing PlantUML command raises a RenderError.
+    """
+    with PipeRenderer(["/nonexistent/plantuml"]) as renderer:
+        with pytest.raises(RenderError, match="could not be started"):
+            renderer.render(DIAGRAM)
+
+
+def test_renderer_without_render_fails_on_construction():
+    class Incomplete(Renderer):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
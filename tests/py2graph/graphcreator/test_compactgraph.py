@@ -0,0 +1,87 @@
+import networkx as nx
+import pytest
+
+from py2graph.graphcreator.compactgraph import CompactGraph
+from py2graph.graphcreator.simplenode import SimpleNode
+from py2graph.parser.parser_interface import NodeType
+
+
+@pytest.fixture
+def graph():
+    graph = CompactGraph()
+    graph.add_nodes_from([
+        ("pkg.module", {"data": SimpleNode("pkg.module", "module", NodeType.MODULE)}),
+        ("pkg.module.Class", {"data": SimpleNode("pkg.module.Class", "Class", NodeType.CLASS)}),
+    ])
+    graph.add_edges_from([
+        ("pkg.module", "pkg.module.Class", {"relation": ["contains"]}),
+        ("pkg.module.Class", "typing.List", {"relation": ["uses", "has_type"]}),
+    ])
+    return graph
+
+
+def test_compact_graph_read_api(graph):
+    assert list(graph) == ["pkg.module", "pkg.module.Class", "typing.List"]
+    assert graph.nodes["pkg.module.Class"]["data"] == SimpleNode("pkg.module.Class", "Class", NodeType.CLASS)
+    assert graph.nodes["typing.List"]["data"].node_type == NodeType.PLACEHOLDER
+    assert "pkg.module" in graph and "pkg.other" not in graph.nodes
+    assert graph.has_edge("pkg.module.Class", "typing.List")
+    assert not graph.has_edge("typing.List", "pkg.module.Class")
+    assert graph["pkg.module.Class"]["typing.List"]["relation"] == ["uses", "has_type"]
+    assert list(graph.successors("pkg.module")) == ["pkg.module.Class"]
+    assert [(target, edge_data["relation"]) for target, edge_data in graph.succ["pkg.module"].items()] == \
+           [("pkg.module.Class", ["contains"])]
+    assert list(graph.out_edges("pkg.module.Class")) == [("pkg.module.Class", "typing.List")]
+    assert (graph.number_of_nodes(), graph.number_of_edges()) == (3, 2)
+    assert graph.in_degree("typing.List") == 1
+
+
+def test_compact_graph_writes_through_views(graph):
+    graph.nodes["typing.List"]["data"] = SimpleNode("typing.List", "List", NodeType.CLASS)
+    graph["pkg.module.Class"]["typing.List"]["relation"] = ["uses"]
+    for _, edge_data in graph.succ["pkg.module"].items():
+        edge_data["relation"] = ["contains", "defines"]
+
+    assert graph.nodes["typing.List"]["data"].node_type == NodeType.CLASS
+    assert graph.get_edge_data("pkg.module.Class", "typing.List")["relation"] == ["uses"]
+    assert graph.get_edge_data("pkg.module", "pkg.module.Class")["relation"] == ["contains", "defines"]
+
+
+def test_compact_graph_overlay_and_compact(graph):
+    graph.add_edge("pkg.module", "pkg.module.function", relation=["contains"])
+    graph.add_edge("pkg.module", "pkg.module.Class", relation=["contains", "imports"])
+    graph.remove_edge("pkg.module.Class", "typing.List")
+    before = list(graph.edges(data=True))
+
+    graph.compact()
+
+    assert [(source, target, dict(edge_data)) for source, target, edge_data in before] == \
+           [(source, target, dict(edge_data)) for source, target, edge_data in graph.edges(data=True)] == [
+               ("pkg.module", "pkg.module.Class", {"relation": ["contains", "imports"]}),
+               ("pkg.module", "pkg.module.function", {"relation": ["contains"]}),
+           ]
+    assert graph.in_degree("typing.List") == 0
+
+
+def test_compact_graph_remove_node(graph):
+    graph.remove_node("pkg.module.Class")
+
+    assert list(graph) == ["pkg.module", "typing.List"]
+    assert graph.number_of_edges() == 0
+    assert graph.in_degree("typing.List") == 0
+    with pytest.raises(nx.NetworkXError):
+        graph.remove_edge("pkg.module", "pkg.module.Class")
+
+    graph.add_edge("pkg.module", "pkg.module.Class", relation=["contains"])
+    assert list(graph) == ["pkg.module", "typing.List", "pkg.module.Class"]
+
+
+def test_compact_graph_to_networkx(graph):
+    exported = graph.to_networkx()
+
+    assert isinstance(exported, nx.DiGraph)
+    assert list(exported.nodes(data=True)) == list(graph.nodes(data=True))
+    assert list(exported.edges(data=True)) == [
+        ("pkg.module", "pkg.module.Class", {"relation": ["contains"]}),
+        ("pkg.module.Class", "typing.List", {"relation": ["uses", "has_type"]}),
+    ]
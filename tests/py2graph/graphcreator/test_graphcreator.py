@@ -1,9 +1,16 @@
 import networkx as nx
 import pytest
 
-from py2graph.graphcreator.graphcreator import GraphCreator, link_upwards
+from py2graph.graphcreator.graphcreator import GraphCreator, link_upwards, parse_module_source
 from py2graph.graphcreator.simplenode import SimpleNode
-from py2graph.parser.parser_interface import DeferredParsingExpression, ParsedEntity, NodeType
+from py2graph.graphcreator.symbolindex import ResolutionTier
+from py2graph.parser.attribute import AttributeParser
+from py2graph.parser.classparser import ClassParser
+from py2graph.parser.constructor import ConstructorParser
+from py2graph.parser.method import MethodParser
+from py2graph.parser.methodbody import MethodBodyParser
+from py2graph.parser.moduleparser import ModuleParser
+from py2graph.parser.parser_interface import ParsedEntity, NodeType, ModuleSource
 
 
 @pytest.fixture
@@ -112,26 +119,107 @@ def test_add_to_graph(orchestrator):
     assert ("example.package.Class", "example.package.OtherClass") in orchestrator.graph.edges
 
 
-def test_parse_deferred(orchestrator):
+def test_add_to_graph_does_not_depend_on_order(orchestrator):
     """
-    Test the `_parse_deferred` function.
+    Test that a target declared by a later entity resolves the same as one declared earlier.
     """
-    orchestrator.deferred = [
-        DeferredParsingExpression(
-            fqn="example.package.Class",
-            node=None,
-            context="class",
-            imported_fqn={}
-        )
+    user = ParsedEntity(
+        fqn="example.module.user",
+        name="user",
+        entity_type=NodeType.METHOD,
+        relationships=[("example.module.user", "helper", "uses")]
+    )
+    module = ParsedEntity(
+        fqn="example.module",
+        name="module",
+        entity_type=NodeType.MODULE,
+        relationships=[("example.module", "example.module.helper", "contains"),
+                       ("example.module", "example.module.user", "contains")]
+    )
+    orchestrator.symbols.declare(module)
+
+    orchestrator._add_to_graph(user)
+    orchestrator._add_to_graph(module)
+
+    assert orchestrator.graph.has_edge("example.module.user", "example.module.helper")
+    assert "helper" not in orchestrator.graph
+    assert orchestrator.resolution_tiers[ResolutionTier.LOCAL] == 1
+
+
+def test_add_entities_matches_add_to_graph(example_graph, mock_parsers):
+    """
+    Test that the bulk insertion builds the same graph as adding the entities one by one.
+    """
+    entities = [
+        ParsedEntity(fqn="example.package.module", name="module", entity_type=NodeType.MODULE,
+                     relationships=[("example.package.module", "example.package.module.Class", "contains"),
+                                    ("example.package.module", "typing.List", "imports")]),
+        ParsedEntity(fqn="example.package.module.Class.method", name="method", entity_type=NodeType.METHOD,
+                     relationships=[("example.package.module.Class.method", "int", "returns"),
+                                    ("example.package.module.Class.method", "int", "uses"),
+                                    ("example.package.module.Class.method", "example.package", "uses")]),
+        ParsedEntity(fqn="example.package.module.Class", name="Class", entity_type=NodeType.CLASS,
+                     relationships=[("example.package.module.Class", "example.package.module.Class.method",
+                                     "defines")]),
     ]
+    graphs = []
+    for bulk in (False, True):
+        graph = example_graph.copy()
+        graph.add_node("example.package.module.Class.method", data=SimpleNode(
+            "example.package.module.Class.method", "method", NodeType.PLACEHOLDER))
+        graph.add_edge("example.package.module.Class.method", "example.package", relation=["calls"])
+        orchestrator = GraphCreator(graph=graph, parser_to_use=dict(mock_parsers))
+        for entity in entities:
+            orchestrator.symbols.declare(entity)
+        if bulk:
+            orchestrator._add_entities(entities)
+        else:
+            for entity in entities:
+                orchestrator._add_to_graph(entity)
+        graphs.append(orchestrator)
 
-    orchestrator._parse_deferred()
+    one_by_one, bulk = graphs
+    assert [(fqn, data['data']) for fqn, data in bulk.graph.nodes(data=True)] == \
+           [(fqn, data['data']) for fqn, data in one_by_one.graph.nodes(data=True)]
+    assert list(bulk.graph.edges(data=True)) == list(one_by_one.graph.edges(data=True))
+    assert bulk.graph["example.package.module.Class.method"]["example.package"]["relation"] == ["calls", "uses"]
+    assert bulk.graph.nodes["example.package.module.Class.method"]["data"].node_type == NodeType.METHOD
+    assert bulk.dotless_references == one_by_one.dotless_references
+    assert bulk.resolution_tiers == one_by_one.resolution_tiers
 
-    # Check that deferred parsing is processed and the graph is updated
-    assert "example.package.Class" in orchestrator.graph
-    node = orchestrator.graph.nodes["example.package.Class"]["data"]
-    assert node.name == "Class"
-    assert node.node_type == NodeType.CLASS
+
+def test_parse_module_source(tmp_path):
+    """
+    Test that `parse_module_source` runs the whole parser chain and groups the entities by depth.
+    """
+    module_path = tmp_path / "module.py"
+    module_path.write_text("""
+class Class:
+    def __init__(self):
+        self.value = 1
+
+def function():
+    pass
+""")
+    parsers = {"module": ModuleParser, "class": ClassParser, "method": MethodParser,
+               "attribute": AttributeParser, "body": MethodBodyParser, "constructor": ConstructorParser}
+
+    levels = parse_module_source(ModuleSource(fqn="pkg.module", path=str(module_path)), parsers)
+
+    assert [[entity.fqn for entity in level] for level in levels] == [
+        ["pkg.module"],
+        ["pkg.module.Class", "pkg.module.function"],
+        ["pkg.module.Class.__init__", "pkg.module.function"],
+        ["pkg.module.Class.__init__"],
+        ["pkg.module.Class.__init__.value"],
+    ]
+    assert levels[2][1].entity_type == NodeType.BODY
+    assert levels[3][0].entity_type == NodeType.CONSTRUCTOR
+
+
+def test_parse_package_rejects_invalid_workers(orchestrator, tmp_path):
+    with pytest.raises(ValueError):
+        orchestrator.parse_package(tmp_path, "example", workers=0)
 
 
 def test_check_graph_consistency(orchestrator):
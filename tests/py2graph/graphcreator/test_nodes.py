@@ -1,6 +1,9 @@
+import pickle
+
 import pytest
 
 from py2graph.graphcreator.simplenode import NodeType, SimpleNode  # Replace `your_module` with the actual module name.
+from py2graph.parser.parser_interface import ParsedEntity
 
 
 ### Tests for NodeType Enum ###
@@ -78,3 +81,27 @@ def test_simple_node_type_safety():
     """
     with pytest.raises(ValueError):
         SimpleNode(fqn="module.Class", name="Class", node_type="invalid_type")
+
+
+def test_simple_node_has_no_dict():
+    node = SimpleNode(fqn="module.Class", name="Class", node_type=NodeType.CLASS)
+    assert not hasattr(node, "__dict__")
+
+
+### Tests for ParsedEntity ###
+
+def test_parsed_entity_interns_relationships():
+    """
+    Test that equal targets share one string, also after a round trip through pickle.
+    """
+    first = ParsedEntity(fqn="module.first", name="first", entity_type=NodeType.METHOD,
+                         relationships=[("module.first", "".join(["module.", "Class"]), "uses"),
+                                        ("module.first", None, "returns")])
+    second = pickle.loads(pickle.dumps(ParsedEntity(fqn="module.second", name="second", entity_type=NodeType.METHOD,
+                                                    relationships=[("module.second", "module.Class", "uses")])))
+
+    assert first.relationships[0][1] is second.relationships[0][1]
+    assert first.relationships[1] == ("module.first", None, "returns")
+    assert pickle.loads(pickle.dumps(first)) == first
+    assert first.base_classes == first.attributes == first.methods == ()
+    assert not hasattr(first, "__dict__")
@@ -0,0 +1,140 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pytest
+
+from py2graph.graphcreator.graphcreator import parse_module_source
+from py2graph.graphcreator.parsecache import CacheEntry, ParseCache
+from py2graph.parser.attribute import AttributeParser
+from py2graph.parser.classparser import ClassParser
+from py2graph.parser.constructor import ConstructorParser
+from py2graph.parser.method import MethodParser
+from py2graph.parser.methodbody import MethodBodyParser
+from py2graph.parser.moduleparser import ModuleParser
+from py2graph.parser.parser_interface import ModuleSource
+
+
+@pytest.fixture
+def parsers():
+    return {"module": ModuleParser, "class": ClassParser, "method": MethodParser,
+            "attribute": AttributeParser, "body": MethodBodyParser, "constructor": ConstructorParser}
+
+
+@pytest.fixture
+def module_source(tmp_path):
+    module_path = tmp_path / "module.py"
+    module_path.write_text("""
+class Class:
+    def method(self) -> int:
+        return 42
+""")
+    return ModuleSource(fqn="pkg.module", path=str(module_path))
+
+
+def parse_twice(cache, module_source, parsers):
+    parse = partial(parse_module_source, parser_to_use=parsers)
+    return cache.parse(module_source, parse), cache.parse(module_source, parse)
+
+
+def entity_fqns(levels):
+    return [[entity.fqn for entity in level] for level in levels]
+
+
+def test_parse_cache_hit_for_unchanged_module(tmp_path, module_source, parsers):
+    cache = ParseCache(tmp_path / "cache", parsers)
+    (parsed, first_hit), (cached, second_hit) = parse_twice(cache, module_source, parsers)
+
+    assert not first_hit
+    assert second_hit
+    assert entity_fqns(cached) == entity_fqns(parsed)
+    assert cached[2][0].relationships == parsed[2][0].relationships
+
+
+def test_parse_cache_miss_for_changed_module(tmp_path, module_source, parsers):
+    cache = ParseCache(tmp_path / "cache", parsers)
+    parse = partial(parse_module_source, parser_to_use=parsers)
+    cache.parse(module_source, parse)
+
+    with open(module_source.path, "a") as f:
+        f.write("\ndef function():\n    pass\n")
+    levels, hit = cache.parse(module_source, parse)
+
+    assert not hit
+    assert "pkg.module.function" in entity_fqns(levels)[1]
+
+
+def test_parse_cache_hit_for_touched_module(tmp_path, module_source, parsers):
+    cache = ParseCache(tmp_path / "cache", parsers)
+    parse = partial(parse_module_source, parser_to_use=parsers)
+    cache.parse(module_source, parse)
+
+    stat = os.stat(module_source.path)
+    os.utime(module_source.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("unchanged content must not be parsed again")
+
+    _, hit = cache.parse(module_source, fail)
+    assert hit
+
+
+def test_parse_cache_keyed_by_parsers(tmp_path, module_source, parsers):
+    cache_dir = tmp_path / "cache"
+    parse = partial(parse_module_source, parser_to_use=parsers)
+    ParseCache(cache_dir, parsers).parse(module_source, parse)
+
+    other_parsers = dict(parsers, body=ConstructorParser)
+    _, hit = ParseCache(cache_dir, other_parsers).parse(module_source, parse)
+    assert not hit
+
+
+def test_parse_cache_ignores_corrupt_entries(tmp_path, module_source, parsers):
+    cache_dir = tmp_path / "cache"
+    cache = ParseCache(cache_dir, parsers)
+    parse = partial(parse_module_source, parser_to_use=parsers)
+    cache.parse(module_source, parse)
+
+    for entry in cache_dir.rglob("*.pickle"):
+        entry.write_bytes(b"not a pickle")
+    levels, hit = cache.parse(module_source, parse)
+
+    assert not hit
+    assert entity_fqns(levels)[0] == ["pkg.module"]
+
+
+def test_parse_cache_shared_by_concurrent_runs(tmp_path, module_source, parsers):
+    cache_dir = tmp_path / "cache"
+    parse = partial(parse_module_source, parser_to_use=parsers)
+
+    def run(_):
+        return ParseCache(cache_dir, parsers).parse(module_source, parse)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(run, range(32)))
+
+    assert all(entity_fqns(levels) == entity_fqns(results[0][0]) for levels, _ in results)
+    assert [path.name for path in cache_dir.rglob("*") if path.is_file()] == [
+        path.name for path in cache_dir.rglob("*.pickle")]
+    _, hit = run(None)
+    assert hit
+
+
+def test_parse_cache_counters(tmp_path):
+    cache = ParseCache(tmp_path / "cache")
+    cache.record(True)
+    cache.record(False)
+    cache.record(True)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_parse_cache_store_failure_leaves_no_temp_file(tmp_path):
+    cache = ParseCache(tmp_path / "cache")
+    entry_path = tmp_path / "cache" / "ab" / "entry.pickle"
+    unpicklable = CacheEntry(mtime_ns=0, size=0, content_hash="", levels=[[lambda: None]])
+
+    cache._store(entry_path, unpicklable)
+
+    assert not entry_path.exists()
+    assert list(entry_path.parent.iterdir()) == []
+
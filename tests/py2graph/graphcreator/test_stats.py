@@ -0,0 +1,23 @@
+from py2graph.graphcreator.stats import PipelineStats
+
+
+def test_stage_run_again_adds_to_its_times():
+    stats = PipelineStats()
+    with stats.stage("parse"):
+        sum(range(100000))
+    first = stats.stages["parse"].cpu_seconds
+    with stats.stage("parse"):
+        sum(range(100000))
+
+    assert list(stats.stages) == ["parse"]
+    assert stats.stages["parse"].cpu_seconds > first
+    assert stats.wall_seconds == stats.stages["parse"].wall_seconds
+
+
+def test_to_dict_has_cache_counters_only_with_a_cache():
+    stats = PipelineStats()
+    assert "cache" not in stats.to_dict()
+
+    stats.cache_hits, stats.cache_misses = 2, 1
+    assert stats.to_dict()["cache"] == {"hits": 2, "misses": 1}
+    assert "Parse cache: 2 hits, 1 misses" in stats.to_text()
@@ -0,0 +1,45 @@
+from py2graph.graphcreator.symbolindex import SymbolIndex, ResolutionTier
+from py2graph.parser.parser_interface import ParsedEntity, NodeType
+
+
+def test_symbol_index_declare():
+    index = SymbolIndex()
+    index.declare(ParsedEntity(
+        fqn="pkg.module",
+        name="module",
+        entity_type=NodeType.MODULE,
+        relationships=[("pkg.module", "pkg.module.Class", "contains"),
+                       ("pkg.module", "typing.List", "imports")]
+    ))
+
+    assert "pkg.module" in index
+    assert "pkg.module.Class" in index
+    assert "typing.List" not in index
+
+
+def test_symbol_index_resolves_innermost_scope_first():
+    index = SymbolIndex()
+    for fqn in ["pkg.helper", "pkg.module.helper", "pkg.module.Class.helper", "pkg.module.Class.method"]:
+        index.add(fqn)
+
+    assert index.resolve("pkg.module.Class.method", "helper") == ("pkg.module.Class.helper", ResolutionTier.LOCAL)
+    index.discard("pkg.module.Class.helper")
+    assert index.resolve("pkg.module.Class.method", "helper") == ("pkg.module.helper", ResolutionTier.LOCAL)
+    index.discard("pkg.module.helper")
+    assert index.resolve("pkg.module.Class.method", "helper") == ("pkg.helper", ResolutionTier.LOCAL)
+
+
+def test_symbol_index_searches_three_scopes():
+    index = SymbolIndex()
+    index.add("pkg.helper")
+
+    assert index.resolve("pkg.module.Class.method.inner", "helper") == ("helper", ResolutionTier.UNRESOLVED)
+
+
+def test_symbol_index_tiers():
+    index = SymbolIndex()
+    index.add("pkg.module.Class")
+
+    assert index.resolve("pkg.other.function", "pkg.module.Class") == ("pkg.module.Class", ResolutionTier.QUALIFIED)
+    assert index.resolve("pkg.other.function", "typing.List") == ("typing.List", ResolutionTier.EXTERNAL)
+    assert index.resolve("pkg.other.function", "len") == ("len", ResolutionTier.UNRESOLVED)
@@ -0,0 +1,92 @@
+import shutil
+import subprocess
+
+import networkx as nx
+import pytest
+
+from py2graph.graphcreator.simplenode import SimpleNode
+from py2graph.graphviewer.dot import DotGenerator
+from py2graph.parser.parser_interface import NodeType
+
+
+def add_node(graph, fqn, node_type):
+    graph.add_node(fqn, data=SimpleNode(fqn, fqn.rpartition('.')[2], node_type))
+
+
+@pytest.fixture
+def package_graph():
+    """
+    Creates a graph of a package with a subpackage, an abstract class, its subclass and a free function.
+    """
+    graph = nx.DiGraph()
+    add_node(graph, "pkg.base", NodeType.MODULE)
+    add_node(graph, "pkg.base.Shape", NodeType.CLASS)
+    add_node(graph, "pkg.base.Shape.area", NodeType.METHOD)
+    add_node(graph, "pkg.sub.square", NodeType.MODULE)
+    add_node(graph, "pkg.sub.square.Square", NodeType.CLASS)
+    add_node(graph, "pkg.sub.square.Square.side", NodeType.ATTRIBUTE)
+    add_node(graph, "pkg.sub.square.make", NodeType.METHOD)
+    add_node(graph, "abc.ABC", NodeType.PLACEHOLDER)
+
+    graph.add_edge("pkg.base", "pkg.base.Shape", relation=["contains"])
+    graph.add_edge("pkg.base.Shape", "abc.ABC", relation=["inherits"])
+    graph.add_edge("pkg.base.Shape", "pkg.base.Shape.area", relation=["defines"])
+    graph.add_edge("pkg.base.Shape.area", "float", relation=["returns"])
+    graph.add_edge("pkg.sub.square", "pkg.sub.square.Square", relation=["contains"])
+    graph.add_edge("pkg.sub.square", "pkg.sub.square.make", relation=["contains"])
+    graph.add_edge("pkg.sub.square.Square", "pkg.base.Shape", relation=["inherits"])
+    graph.add_edge("pkg.sub.square.Square", "pkg.sub.square.Square.side", relation=["defines"])
+    graph.add_edge("pkg.sub.square.Square.side", "Dict", relation=["has_type"])
+    graph.add_edge("pkg.sub.square.make", "pkg.sub.square.Square", relation=["returns"])
+    return graph
+
+
+def test_generate_dot(package_graph):
+    """
+    Test that packages and modules are nested clusters, classes records and relationships styled edges.
+    """
+    lines = DotGenerator(package_graph, "shapes").generate().splitlines()
+
+    assert lines[:3] == ['digraph "shapes" {', '  layout=dot;', '  rankdir=BT;']
+    assert lines[-1] == "}"
+    cluster_lines = [line.strip() for line in lines if "subgraph" in line]
+    assert cluster_lines == ['subgraph "cluster_pkg" {', 'subgraph "cluster_pkg.sub" {',
+                             'subgraph "cluster_pkg.sub.square" {', 'subgraph "cluster_pkg.base" {']
+    assert '      "pkg.base.Shape" [label="{«abstract» Shape\\l||area() -\\> float\\l}"];' in lines
+    assert '        "pkg.sub.square.Square" [label="{Square\\l|side: Dict\\l|}"];' in lines
+    assert '        "pkg.sub.square.Methods" [label="{Methods\\l|make() -\\> Square\\l}", style=rounded];' in lines
+    assert '  "pkg.sub.square.Square" -> "pkg.base.Shape" [arrowhead=empty];' in lines
+    assert '  "pkg.sub.square.Methods" -> "pkg.sub.square.Square" [arrowhead=vee, label="used by make"];' in lines
+
+
+def test_generate_dot_for_large_layouts(package_graph):
+    """
+    Test that sfdp gets its layout attributes, and that classes are plain boxes without details.
+    """
+    dot = DotGenerator(package_graph, engine="sfdp", details=False).generate()
+
+    assert "  layout=sfdp;\n  overlap=prism;" in dot
+    assert '"pkg.sub.square.Square" [label="Square"];' in dot
+    assert "label=\"used by make\"" not in dot
+
+    with pytest.raises(ValueError, match="Unknown Graphviz engine"):
+        DotGenerator(package_graph, engine="circo")
+
+
+def test_generate_dot_deterministic(package_graph):
+    reversed_graph = nx.DiGraph()
+    reversed_graph.add_nodes_from(reversed(list(package_graph.nodes(data=True))))
+    reversed_graph.add_edges_from(reversed(list(package_graph.edges(data=True))))
+
+    dot = DotGenerator(package_graph, deterministic=True).generate()
+
+    assert dot == DotGenerator(reversed_graph, deterministic=True).generate()
+    assert dot.splitlines()[-2].startswith("  // content-hash: sha256:")
+
+
+@pytest.mark.skipif(shutil.which("dot") is None, reason="Graphviz is not installed")
+def test_dot_renders_with_graphviz(package_graph):
+    result = subprocess.run(["dot", "-Tsvg"], input=DotGenerator(package_graph).generate(), capture_output=True,
+                            text=True, check=True)
+
+    assert "<svg" in result.stdout
@@ -0,0 +1,79 @@
+import io
+import json
+
+import networkx as nx
+import pytest
+
+from py2graph.graphcreator.compactgraph import CompactGraph
+from py2graph.graphcreator.simplenode import SimpleNode
+from py2graph.graphviewer.exporters import write_dot, write_graphml, write_json
+from py2graph.parser.parser_interface import NodeType
+
+
+@pytest.fixture
+def graph():
+    """
+    Creates a graph with a class, a method, a placeholder and a node without data.
+    """
+    graph = nx.DiGraph()
+    graph.add_node("my_module.MyClass", data=SimpleNode("my_module.MyClass", "MyClass", NodeType.CLASS))
+    graph.add_node("my_module.MyClass.run", data=SimpleNode("my_module.MyClass.run", "run", NodeType.METHOD))
+    graph.add_node("abc.ABC", data=SimpleNode("abc.ABC", "ABC", NodeType.PLACEHOLDER))
+    graph.add_edge("my_module.MyClass", "my_module.MyClass.run", relation=["defines"])
+    graph.add_edge("my_module.MyClass.run", 'Dict["str", int]', relation=["returns", "has_argument"])
+    graph.add_edge("my_module.MyClass", "abc.ABC", relation=["inherits"])
+    return graph
+
+
+def export(writer, graph, deterministic=False) -> str:
+    output = io.StringIO()
+    writer(graph, output, deterministic=deterministic)
+    return output.getvalue()
+
+
+def test_write_json(graph):
+    exported = json.loads(export(write_json, graph))
+
+    assert {"id": "my_module.MyClass.run", "name": "run", "type": "method"} in exported["nodes"]
+    assert {"id": 'Dict["str", int]', "name": 'Dict["str", int]', "type": None} in exported["nodes"]
+    assert {"source": "my_module.MyClass.run", "target": 'Dict["str", int]',
+            "relation": ["returns", "has_argument"]} in exported["edges"]
+    assert len(exported["nodes"]) == 4 and len(exported["edges"]) == 3
+
+
+def test_write_graphml(graph):
+    exported = nx.read_graphml(io.StringIO(export(write_graphml, graph)))
+
+    assert set(exported.nodes) == set(graph.nodes)
+    assert exported.nodes["my_module.MyClass"] == {"name": "MyClass", "type": "class"}
+    assert exported["my_module.MyClass.run"]['Dict["str", int]'] == {"relation": "returns,has_argument"}
+
+
+def test_write_dot(graph):
+    exported = export(write_dot, graph, deterministic=True)
+
+    assert exported.splitlines() == [
+        'digraph py2graph {',
+        '  "Dict[\\"str\\", int]" [label="Dict[\\"str\\", int]"];',
+        '  "abc.ABC" [label="ABC", type="placeholder"];',
+        '  "my_module.MyClass" [label="MyClass", type="class"];',
+        '  "my_module.MyClass.run" [label="run", type="method"];',
+        '  "my_module.MyClass" -> "abc.ABC" [label="inherits"];',
+        '  "my_module.MyClass" -> "my_module.MyClass.run" [label="defines"];',
+        '  "my_module.MyClass.run" -> "Dict[\\"str\\", int]" [label="returns,has_argument"];',
+        '}',
+    ]
+
+
+@pytest.mark.parametrize("writer", [write_json, write_graphml, write_dot])
+def test_exports_of_compact_graph(graph, writer):
+    """
+    Test that a CompactGraph exports the same as the networkx graph it was built from.
+    """
+    # every node of a CompactGraph has data, nodes added without are placeholders
+    graph.nodes['Dict["str", int]']['data'] = SimpleNode('Dict["str", int]', 'Dict', NodeType.PLACEHOLDER)
+    compact = CompactGraph()
+    compact.add_nodes_from(graph.nodes(data=True))
+    compact.add_edges_from(graph.edges(data=True))
+
+    assert export(writer, compact, deterministic=True) == export(writer, graph, deterministic=True)
@@ -0,0 +1,108 @@
+import networkx as nx
+import pytest
+
+from py2graph.graphcreator.simplenode import SimpleNode
+from py2graph.graphviewer.layout import EXTERNAL_CLUSTER, MAX_SPRING_NODES, NODE_SPACING, PositionCache, \
+    cluster_layout, node_clusters
+from py2graph.parser.parser_interface import NodeType
+
+
+def add_module(graph, module_fqn, classes):
+    graph.add_node(module_fqn, data=SimpleNode(module_fqn, module_fqn.rpartition('.')[2], NodeType.MODULE))
+    for class_name in classes:
+        class_fqn = f"{module_fqn}.{class_name}"
+        graph.add_node(class_fqn, data=SimpleNode(class_fqn, class_name, NodeType.CLASS))
+        graph.add_node(f"{class_fqn}.run", data=SimpleNode(f"{class_fqn}.run", "run", NodeType.METHOD))
+        graph.add_edge(module_fqn, class_fqn, relation=["contains"])
+        graph.add_edge(class_fqn, f"{class_fqn}.run", relation=["defines"])
+        graph.add_edge(f"{class_fqn}.run", "str", relation=["returns"])
+
+
+@pytest.fixture
+def package_graph():
+    """
+    Creates a graph of two modules with a few classes each.
+    """
+    graph = nx.DiGraph()
+    add_module(graph, "my_package.first", ["A", "B", "C"])
+    add_module(graph, "my_package.second", ["D", "E"])
+    graph.add_node("my_package", data=SimpleNode("my_package", "my_package", NodeType.PACKAGE))
+    graph.add_edge("my_package", "my_package.first", relation=["contains"])
+    return graph
+
+
+def test_node_clusters(package_graph):
+    clusters = node_clusters(package_graph)
+
+    assert clusters["my_package.first.A.run"] == "my_package.first"
+    assert clusters["my_package.second"] == "my_package.second"
+    assert clusters["my_package"] == "my_package"
+    assert clusters["str"] == EXTERNAL_CLUSTER
+
+
+def test_cluster_layout_separates_modules(package_graph):
+    """
+    Test that every node gets a position, that the layout is reproducible and that modules do not overlap.
+    """
+    positions = cluster_layout(package_graph)
+
+    assert set(positions) == set(package_graph.nodes)
+    assert positions == cluster_layout(package_graph)
+    first = [positions[fqn] for fqn in package_graph.nodes if fqn.startswith("my_package.first")]
+    second = [positions[fqn] for fqn in package_graph.nodes if fqn.startswith("my_package.second")]
+    assert max(x for x, _ in first) < min(x for x, _ in second) or \
+        min(y for _, y in first) > max(y for _, y in second)
+
+
+def test_cluster_layout_keeps_cached_positions(package_graph, tmp_path):
+    """
+    Test that nodes laid out before keep their place in their module when a node is added.
+    """
+    cache = PositionCache(str(tmp_path / "layout.json"))
+    before = cluster_layout(package_graph, cache)
+
+    package_graph.add_node("my_package.first.F", data=SimpleNode("my_package.first.F", "F", NodeType.CLASS))
+    package_graph.add_edge("my_package.first", "my_package.first.F", relation=["contains"])
+    after = cluster_layout(package_graph, cache)
+
+    origin_before = before["my_package.first"]
+    origin_after = after["my_package.first"]
+    for fqn in before:
+        if fqn.startswith("my_package.first"):
+            assert after[fqn][0] - origin_after[0] == pytest.approx(before[fqn][0] - origin_before[0])
+            assert after[fqn][1] - origin_after[1] == pytest.approx(before[fqn][1] - origin_before[1])
+    assert "my_package.first.F" in cache.load()
+
+
+def test_cluster_layout_places_new_nodes_on_free_spiral_slots(tmp_path):
+    """
+    Test that a node added to a large cluster after another was removed does not land on a cached node.
+    """
+    graph = nx.DiGraph()
+    add_module(graph, "big.module", [f"C{index}" for index in range(MAX_SPRING_NODES // 2 + 1)])
+    cache = PositionCache(str(tmp_path / "layout.json"))
+    cluster_layout(graph, cache)
+
+    graph.remove_nodes_from(["big.module.C0", "big.module.C0.run"])
+    graph.add_node("big.module.New", data=SimpleNode("big.module.New", "New", NodeType.CLASS))
+    positions = cluster_layout(graph, cache)
+
+    x, y = positions["big.module.New"]
+    assert min(((x - other_x) ** 2 + (y - other_y) ** 2) ** 0.5
+               for fqn, (other_x, other_y) in positions.items()
+               if fqn.startswith("big.module") and fqn != "big.module.New") > NODE_SPACING / 2
+
+
+def test_position_cache_ignores_unreadable_files(tmp_path):
+    path = tmp_path / "layout.json"
+    path.write_text("not json")
+
+    assert PositionCache(str(path)).load() == {}
+
+
+def test_position_cache_store_failure_leaves_no_temp_file(tmp_path):
+    cache = PositionCache(str(tmp_path / "layout.json"))
+
+    cache.store({"a": ("cluster", ({"not", "a", "number"}, 0.0))})
+
+    assert list(tmp_path.iterdir()) == []
@@ -1,7 +1,7 @@
 import networkx as nx
 
 from py2graph.graphcreator.simplenode import SimpleNode
-from py2graph.graphviewer.matplotlib import visualize_graph
+from py2graph.graphviewer.matplotlib import collapse_graph, level_of_detail, visualize_graph
 from py2graph.parser.parser_interface import NodeType
 
 # Example: Create a graph with dummy nodes and edges
@@ -18,3 +18,63 @@ graph.add_edge("class1", "method1", relation="defines")
 
 # Visualize the graph
 visualize_graph(graph, output_file="graph_visualization.png")
+
+
+def package_graph():
+    """
+    Creates a graph of a package with a module, a class with members and a builtin placeholder.
+    """
+    package = nx.DiGraph()
+    for fqn, node_type in [("pkg", NodeType.PACKAGE), ("pkg.mod", NodeType.MODULE), ("pkg.mod.A", NodeType.CLASS),
+                           ("pkg.mod.A.run", NodeType.METHOD), ("pkg.mod.A.size", NodeType.ATTRIBUTE),
+                           ("pkg.mod.helper", NodeType.METHOD), ("str", NodeType.PLACEHOLDER)]:
+        package.add_node(fqn, data=SimpleNode(fqn, fqn.rpartition('.')[2], node_type))
+    package.add_edge("pkg", "pkg.mod", relation=["contains"])
+    package.add_edge("pkg.mod", "pkg.mod.A", relation=["contains"])
+    package.add_edge("pkg.mod", "pkg.mod.helper", relation=["contains"])
+    package.add_edge("pkg.mod.A", "pkg.mod.A.run", relation=["defines"])
+    package.add_edge("pkg.mod.A", "pkg.mod.A.size", relation=["defines"])
+    package.add_edge("pkg.mod.A.run", "str", relation=["returns"])
+    package.add_edge("pkg.mod.helper", "pkg.mod.A", relation=["uses"])
+    package.add_edge("pkg.mod.helper", "pkg.mod.A.run", relation=["uses", "has_argument"])
+    return package
+
+
+def test_collapse_graph():
+    """
+    Test that members collapse into their class or module, and everything into the package.
+    """
+    package = package_graph()
+
+    assert set(collapse_graph(package, 1)) == set(package) - {"str"}
+
+    classes = collapse_graph(package, 2)
+    assert set(classes) == {"pkg", "pkg.mod", "pkg.mod.A"}
+    assert classes.nodes["pkg.mod.A"]["weight"] == 3
+    assert classes.nodes["pkg.mod"]["weight"] == 2
+    assert classes["pkg.mod"]["pkg.mod.A"]["relation"] == ["contains", "uses", "has_argument"]
+
+    packages = collapse_graph(package, 3)
+    assert set(packages) == {"pkg"}
+    assert packages.nodes["pkg"]["weight"] == 6
+    assert packages.number_of_edges() == 0
+
+
+def test_level_of_detail():
+    package = package_graph()
+
+    assert level_of_detail(package, None) == 0
+    assert level_of_detail(package, 7) == 0
+    assert level_of_detail(package, 6) == 1
+    assert level_of_detail(package, 3) == 2
+    assert level_of_detail(package, 2) == 3
+
+
+def test_visualize_collapsed_graph(tmp_path, capsys):
+    output_file = tmp_path / "collapsed.png"
+
+    level = visualize_graph(package_graph(), output_file=str(output_file), max_nodes=3, max_labels=1)
+
+    assert level == 2
+    assert output_file.stat().st_size > 0
+    assert capsys.readouterr().out == ""
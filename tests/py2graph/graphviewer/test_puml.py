@@ -1,3 +1,6 @@
+import hashlib
+import io
+
 import networkx as nx
 import pytest
 
@@ -145,3 +148,68 @@ def test_generate_puml_empty_graph():
     generator = PumlGenerator(empty_graph, "EmptyDiagram")
     puml_content = generator.generate()
     assert puml_content == "@startuml EmptyDiagram\n!pragma useIntermediatePackages false\nskinparam linetype ortho\n\nfooter Generated by //CodebaseGraph//\n@enduml"
+
+
+def test_generate_puml_repeated(mock_full_graph):
+    """
+    Test that rendering the same graph again produces the same PUML output.
+    """
+    generator = PumlGenerator(mock_full_graph, "TestDiagram")
+    assert generator.generate() == generator.generate()
+    assert generator.generate() == PumlGenerator(mock_full_graph, "TestDiagram").generate()
+
+
+def test_write_puml_streams_lines(mock_full_graph):
+    """
+    Test that the PUML output can be streamed line by line and written to a file object.
+    """
+    generator = PumlGenerator(mock_full_graph, "TestDiagram")
+    lines = generator.iter_lines()
+    assert next(lines) == generator._puml_file_start()
+
+    output = io.StringIO()
+    generator.write(output)
+    assert output.getvalue() == generator.generate() + "\n"
+    assert "\n".join(generator.iter_lines()) == generator.generate()
+
+
+def test_generate_puml_deterministic(mock_full_graph):
+    """
+    Test that the deterministic PUML output does not depend on the insertion order of the graph.
+    """
+    mock_full_graph.add_node("my_package.my_module.Other",
+                             data=SimpleNode("my_package.my_module.Other", "Other", NodeType.CLASS))
+    mock_full_graph.add_edge("my_package.my_module", "my_package.my_module.Other", relation=["contains"])
+    mock_full_graph.add_edge("my_package.my_module.free_func", "my_package.my_module.Other", relation=["uses"])
+    reversed_graph = nx.DiGraph()
+    reversed_graph.add_nodes_from(reversed(list(mock_full_graph.nodes(data=True))))
+    reversed_graph.add_edges_from(reversed(list(mock_full_graph.edges(data=True))))
+
+    assert PumlGenerator(reversed_graph).generate() != PumlGenerator(mock_full_graph).generate()
+    generator = PumlGenerator(mock_full_graph, "TestDiagram", deterministic=True)
+    puml_content = generator.generate()
+    assert PumlGenerator(reversed_graph, "TestDiagram", deterministic=True).generate() == puml_content
+    assert puml_content.endswith(f"' content-hash: sha256:{generator.content_hash()}\n@enduml")
+    assert generator.content_hash() == hashlib.sha256(puml_content.rsplit("\n", 2)[0].encode() + b"\n").hexdigest()
+
+
+def test_generate_puml_package(mock_full_graph):
+    """
+    Test that a diagram restricted to a package only shows the modules directly in that package.
+    """
+    mock_full_graph.add_node("my_package.sub.other",
+                             data=SimpleNode("my_package.sub.other", "other", NodeType.MODULE))
+    mock_full_graph.add_node("my_package.sub.other.Other",
+                             data=SimpleNode("my_package.sub.other.Other", "Other", NodeType.CLASS))
+    mock_full_graph.add_edge("my_package.sub.other", "my_package.sub.other.Other", relation=["contains"])
+    mock_full_graph.add_edge("my_package.sub.other.Other", "my_package.my_module.MyClass", relation=["uses"])
+
+    sub_puml = PumlGenerator(mock_full_graph, package="my_package.sub").generate()
+    assert "class my_package.sub.other.Other {" in sub_puml
+    assert "my_package.sub.other.Other --> my_package.my_module.MyClass" in sub_puml
+    assert "annotation my_package.my_module.Methods {" not in sub_puml
+    assert "used by free_func" not in sub_puml
+
+    package_puml = PumlGenerator(mock_full_graph, package="my_package").generate()
+    assert "my_package.sub" not in package_puml
+    assert "used by free_func" in package_puml
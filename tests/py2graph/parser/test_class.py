@@ -112,7 +112,7 @@ class EmptyClass:
     # Check parsed entity
     assert parsed_entity.fqn == "my_package.module.EmptyClass"
     assert parsed_entity.entity_type == NodeType.CLASS
-    assert parsed_entity.base_classes == []
+    assert parsed_entity.base_classes == ()
     assert parsed_entity.relationships == []
 
     # Check no deferred parsing
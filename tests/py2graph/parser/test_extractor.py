@@ -0,0 +1,97 @@
+import ast
+
+import pytest
+
+from py2graph.graphcreator.graphcreator import parse_module_source
+from py2graph.parser.attribute import AttributeParser
+from py2graph.parser.classparser import ClassParser
+from py2graph.parser.constructor import ConstructorParser
+from py2graph.parser.extractor import ModuleExtractor, walk_function
+from py2graph.parser.method import MethodParser
+from py2graph.parser.methodbody import MethodBodyParser
+from py2graph.parser.moduleparser import ModuleParser
+from py2graph.parser.parser_interface import ModuleSource
+
+MODULE_SOURCE = """
+from abc import ABC
+from typing import List, Optional
+
+
+class Base(ABC):
+    kind: str = "base"
+    count = 0
+
+    def __init__(self, name: str, parts: List["Part"] = list()):
+        super().__init__()
+        self.name: str = name
+        self.parts = [make_part(part) for part in parts]
+        self.helper = Helper(os.path.join(name))
+        local = 1
+
+    @decorate(config())
+    def describe(self, prefix: Optional[str]) -> str | None:
+        def nested():
+            return inner(outer())
+        first = format_name(self.name)
+        return os.path.join(prefix, first, helper.run())
+
+
+class Derived(pkg.other.Base, Base):
+    def method(self) -> "Derived":
+        return Derived()
+
+
+def make_part(value: int) -> "Part":
+    return Part(value)
+
+
+def __init__():
+    self.value = compute()
+
+import os
+from pkg import helper
+"""
+
+
+@pytest.fixture
+def parsers():
+    return {"module": ModuleParser, "class": ClassParser, "method": MethodParser,
+            "attribute": AttributeParser, "body": MethodBodyParser, "constructor": ConstructorParser}
+
+
+@pytest.fixture
+def module_source(tmp_path):
+    module_path = tmp_path / "module.py"
+    module_path.write_text(MODULE_SOURCE)
+    return ModuleSource(fqn="pkg.module", path=str(module_path))
+
+
+def test_extractor_matches_parser_chain(module_source, parsers):
+    """
+    Test that the single-pass extractor finds the same entities, relationships and order as the parser chain.
+    """
+    expected = parse_module_source(module_source, parsers)
+    extracted = parse_module_source(module_source, dict(parsers, extractor=ModuleExtractor))
+
+    assert [[entity.fqn for entity in level] for level in extracted] == \
+           [[entity.fqn for entity in level] for level in expected]
+    assert extracted == expected
+    assert ("pkg.module.Base.describe", "os.path.join", "uses") in extracted[3][1].relationships
+
+
+def test_extractor_raises_like_parser_chain(tmp_path, parsers):
+    module_path = tmp_path / "module.py"
+    module_path.write_text("class Pair:\n    first, second = 1, 2\n")
+    module_source = ModuleSource(fqn="pkg.module", path=str(module_path))
+
+    with pytest.raises(AttributeError):
+        parse_module_source(module_source, parsers)
+    with pytest.raises(AttributeError):
+        parse_module_source(module_source, dict(parsers, extractor=ModuleExtractor))
+
+
+def test_walk_function_keeps_order_of_ast_walk():
+    function = ast.parse(MODULE_SOURCE).body[2].body[3]
+    recorded = (ast.Call, ast.Assign, ast.AnnAssign)
+
+    assert list(walk_function(function)) == [node for node in ast.walk(function) if isinstance(node, recorded)]
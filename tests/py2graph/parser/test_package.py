@@ -1,7 +1,7 @@
 import pytest
 
 from py2graph.parser.package import PackageParser
-from py2graph.parser.parser_interface import NodeType
+from py2graph.parser.parser_interface import NodeType, ModuleSource, ParsedEntity
 
 
 @pytest.fixture
@@ -50,3 +50,30 @@ def test_package_parser_with_relationships(mock_package_structure):
         expr.fqn == "mock.package.module2" and expr.context == "module"
         for expr in deferred_parsing
     )
+
+
+def test_package_parser_discover_does_not_read_modules(mock_package_structure):
+    package_path = mock_package_structure / "package"
+    (package_path / "broken.py").write_text("def broken(:\n")
+    parser = PackageParser(package_path)
+    parsed_entities, module_sources = parser.discover("mock.package")
+
+    assert {entity.fqn for entity in parsed_entities} == {"mock.package", "mock.package.subpackage"}
+    sources = {source.fqn: source.path for source in module_sources}
+    assert sources["mock.package.module1"] == str(package_path / "module1.py")
+    assert sources["mock.package.broken"] == str(package_path / "broken.py")
+    assert sources["mock.package.subpackage.submodule"] == str(package_path / "subpackage" / "submodule.py")
+
+
+def test_package_parser_iter_package_is_lazy(mock_package_structure):
+    package_path = mock_package_structure / "package"
+    parser = PackageParser(package_path)
+    items = parser.iter_package("mock.package")
+
+    first = next(items)
+    assert isinstance(first, ModuleSource)
+    assert first.fqn.startswith("mock.package.module")
+
+    remaining = list(items)
+    assert [item.fqn for item in remaining if isinstance(item, ParsedEntity)] == [
+        "mock.package", "mock.package.subpackage"]
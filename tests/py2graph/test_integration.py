@@ -1,7 +1,11 @@
 import networkx as nx
 import pytest
 
-from py2graph.graphcreator.graphcreator import GraphCreator
+from py2graph.graphcreator.compactgraph import CompactGraph
+from py2graph.graphcreator.graphcreator import GraphCreator, link_upwards
+from py2graph.graphcreator.parsecache import ParseCache
+from py2graph.graphcreator.stats import PipelineStats
+from py2graph.graphcreator.symbolindex import ResolutionTier
 from py2graph.graphviewer.puml import PumlGenerator
 from py2graph.parser.attribute import AttributeParser
 from py2graph.parser.classparser import ClassParser
@@ -11,6 +15,7 @@ from py2graph.parser.methodbody import MethodBodyParser
 from py2graph.parser.moduleparser import ModuleParser
 from py2graph.parser.package import PackageParser
 from py2graph.parser.parser_interface import NodeType
+from py2graph.py2graph import create_graph
 
 
 
@@ -128,12 +133,9 @@ def create_product2(self,pid:str)->PhysicalProduct|DigitalProduct:
     return base_dir
 
 
-@pytest.fixture
-def orchestrator():
-    """
-    Provides an Orchestrator instance with initialized parsers.
-    """
-    graph = nx.DiGraph()  # Directed graph for all entities
+def create_orchestrator(cache=None, graph=None):
+    if graph is None:
+        graph = nx.DiGraph()  # Directed graph for all entities
     parser = {
         "package": PackageParser,
         "module": ModuleParser,
@@ -143,7 +145,15 @@ def orchestrator():
         "body": MethodBodyParser,
         "constructor": ConstructorParser
     }
-    return GraphCreator(graph, parser)
+    return GraphCreator(graph, parser, cache)
+
+
+@pytest.fixture
+def orchestrator():
+    """
+    Provides an Orchestrator instance with initialized parsers.
+    """
+    return create_orchestrator()
 
 
 def test_orchestrator_parse_package(orchestrator, mock_package_structure):
@@ -342,3 +352,223 @@ def test_orchestrator_parse_enum(orchestrator, mock_package_enum):
     assert "COMPOSITION: str" in puml_content
     assert "INHERITANCE: str" in puml_content
     assert "DEPENDENCY: str" in puml_content
+
+
+def parse_package_eagerly(orchestrator, package_path, package_name):
+    """
+    Parse all module ASTs up front and run them through the deferred queue in one go.
+    """
+    entities, deferred = PackageParser(package_path).parse("", package_name)
+    for entity in entities:
+        orchestrator._add_to_graph(entity)
+    while deferred:
+        deferred_expression = deferred.pop(0)
+        next_parser = orchestrator.parser[deferred_expression.context](deferred_expression.imported_fqn)
+        entity, more_deferred = next_parser.parse(deferred_expression.node, deferred_expression.fqn)
+        orchestrator._add_to_graph(entity)
+        deferred.extend(more_deferred)
+    orchestrator.graph = link_upwards(orchestrator.graph, package_name)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_orchestrator_parse_package_with_workers(mock_package_structure, workers):
+    """
+    Test that streaming the modules, in this process or in workers, builds the same graph as the deferred queue.
+    """
+    package_fqn = "productworld"
+    expected = create_orchestrator()
+    parse_package_eagerly(expected, mock_package_structure, package_fqn)
+    parallel = create_orchestrator()
+    parallel.parse_package(mock_package_structure, package_fqn, workers=workers)
+
+    assert list(parallel.graph.nodes(data=True)) == list(expected.graph.nodes(data=True))
+    assert list(parallel.graph.edges(data=True)) == list(expected.graph.edges(data=True))
+    assert PumlGenerator(parallel.graph).generate() == PumlGenerator(expected.graph).generate()
+
+
+def test_orchestrator_parse_package_from_cache(mock_package_structure, tmp_path):
+    """
+    Test that a second run loads every module from the parse cache and builds the same graph.
+    """
+    package_fqn = "productworld"
+    first = create_orchestrator(ParseCache(tmp_path / "cache"))
+    first.parse_package(mock_package_structure, package_fqn)
+    second = create_orchestrator(ParseCache(tmp_path / "cache"))
+    second.parse_package(mock_package_structure, package_fqn, workers=2)
+
+    assert (first.cache.hits, first.cache.misses) == (0, 3)
+    assert (second.cache.hits, second.cache.misses) == (3, 0)
+    assert list(second.graph.edges(data=True)) == list(first.graph.edges(data=True))
+
+
+def graph_content(graph):
+    nodes = {node_fqn: node_data['data'].node_type for node_fqn, node_data in graph.nodes(data=True)}
+    edges = {(source, target): sorted(edge_data['relation']) for source, target, edge_data in graph.edges(data=True)}
+    return nodes, edges
+
+
+def parse_fresh(package_path, package_name):
+    fresh = create_orchestrator()
+    fresh.parse_package(package_path, package_name)
+    return graph_content(fresh.graph)
+
+
+def test_orchestrator_update_unchanged_module(orchestrator, mock_package_structure):
+    orchestrator.parse_package(mock_package_structure, "productworld")
+    expected = graph_content(orchestrator.graph)
+
+    orchestrator.update_module(mock_package_structure / "base" / "base.py")
+
+    assert graph_content(orchestrator.graph) == expected
+
+
+def test_orchestrator_update_changed_module(orchestrator, mock_package_structure):
+    orchestrator.parse_package(mock_package_structure, "productworld")
+    base_module = mock_package_structure / "base" / "base.py"
+    base_module.write_text(base_module.read_text()
+                           .replace("def funkyFunc()->int:", "def funkierFunc()->int:")
+                           .replace("class Order:", "class Order(Product):\n    status: str = 'new'\n"))
+
+    orchestrator.update_module(base_module)
+
+    assert graph_content(orchestrator.graph) == parse_fresh(mock_package_structure, "productworld")
+    assert orchestrator.graph.nodes["productworld.base.base.funkyFunc"]["data"].node_type == NodeType.PLACEHOLDER
+    assert orchestrator.graph.nodes["productworld.base.base.Order.status"]["data"].node_type == NodeType.ATTRIBUTE
+
+
+def test_orchestrator_update_module_with_attributes_of_one_type(orchestrator, tmp_path):
+    """
+    Test that the attributes of a class are linked upwards in their order, the last one decides the relation.
+    """
+    package_path = tmp_path / "inventory"
+    package_path.mkdir()
+    (package_path / "__init__.py").write_text("")
+    attributes = "".join(f"        self.shared{index}: Item = item\n" for index in range(15))
+    (package_path / "store.py").write_text(f"""
+class Item:
+    pass
+
+class Store:
+    def __init__(self, item: Item):
+{attributes}        self.owned: Item = Item()
+""")
+    orchestrator.parse_package(package_path, "inventory")
+    orchestrator.update_module(package_path / "store.py")
+
+    assert graph_content(orchestrator.graph) == parse_fresh(package_path, "inventory")
+
+
+def test_orchestrator_update_new_module(orchestrator, mock_package_structure):
+    product_module = mock_package_structure / "product" / "product.py"
+    product_module.write_text(product_module.read_text() + """
+def issue_voucher():
+    return voucher()
+""")
+    orchestrator.parse_package(mock_package_structure, "productworld")
+    assert orchestrator.graph.has_edge("productworld.product.product.issue_voucher", "voucher")
+    new_module = mock_package_structure / "product" / "voucher.py"
+    new_module.write_text("""
+from productworld.product.product import DigitalProduct
+
+class Voucher(DigitalProduct):
+    def redeem(self, code: str) -> DigitalProduct:
+        return DigitalProduct()
+""")
+
+    orchestrator.update_module(new_module)
+
+    assert graph_content(orchestrator.graph) == parse_fresh(mock_package_structure, "productworld")
+    assert orchestrator.graph.has_edge("productworld.product", "productworld.product.voucher")
+    assert orchestrator.graph.has_edge("productworld.product.product.issue_voucher", "productworld.product.voucher")
+    assert "voucher" not in orchestrator.graph
+
+
+def test_orchestrator_remove_module(orchestrator, mock_package_structure):
+    orchestrator.parse_package(mock_package_structure, "productworld")
+    customer_module = mock_package_structure / "base" / "customer.py"
+
+    orchestrator.remove_module(customer_module)
+    customer_module.unlink()
+
+    assert graph_content(orchestrator.graph) == parse_fresh(mock_package_structure, "productworld")
+    with pytest.raises(ValueError):
+        orchestrator.remove_module(customer_module)
+
+
+def test_orchestrator_parse_package_in_any_order(orchestrator, mock_package_structure, monkeypatch):
+    """
+    Test that the graph does not depend on the order the modules are discovered in.
+    """
+    orchestrator.parse_package(mock_package_structure, "productworld")
+    iter_package = PackageParser.iter_package
+    monkeypatch.setattr(PackageParser, "iter_package",
+                        lambda self, package_fqn: reversed(list(iter_package(self, package_fqn))))
+
+    assert graph_content(orchestrator.graph) == parse_fresh(mock_package_structure, "productworld")
+
+
+def test_orchestrator_parse_package_with_compact_graph(mock_package_structure):
+    """
+    Test that the compact graph store builds the same graph and diagram as a networkx.DiGraph.
+    """
+    expected = create_orchestrator()
+    expected.parse_package(mock_package_structure, "productworld")
+    compact = create_orchestrator(graph=CompactGraph())
+    compact.parse_package(mock_package_structure, "productworld")
+
+    assert list(compact.graph.nodes(data=True)) == list(expected.graph.nodes(data=True))
+    assert [(source, target, dict(edge_data)) for source, target, edge_data in compact.graph.edges(data=True)] == \
+           list(expected.graph.edges(data=True))
+    assert PumlGenerator(compact.graph).generate() == PumlGenerator(expected.graph).generate()
+
+
+def test_orchestrator_update_module_with_compact_graph(mock_package_structure):
+    compact = create_orchestrator(graph=CompactGraph())
+    compact.parse_package(mock_package_structure, "productworld")
+    base_module = mock_package_structure / "base" / "base.py"
+    base_module.write_text(base_module.read_text().replace("def funkyFunc()->int:", "def funkierFunc()->int:"))
+    customer_module = mock_package_structure / "base" / "customer.py"
+
+    compact.update_module(base_module)
+    compact.remove_module(customer_module)
+    customer_module.unlink()
+
+    assert graph_content(compact.graph) == parse_fresh(mock_package_structure, "productworld")
+
+
+def test_orchestrator_parse_package_stats(mock_package_structure):
+    """
+    Test that parsing a package returns the time of every stage and the counters of the graph.
+    """
+    ended = []
+    orchestrator = create_orchestrator()
+    orchestrator.stats.hooks.append(lambda stage, stats: ended.append((stage, stage in stats.stages)))
+    stats = orchestrator.parse_package(mock_package_structure, "productworld")
+
+    assert stats is orchestrator.stats
+    assert ended == [(stage, True) for stage in ("parse", "declare", "add_to_graph", "link_upwards",
+                                                 "consistency_check")]
+    assert all(stage.wall_seconds >= 0 and stage.cpu_seconds >= 0 for stage in stats.stages.values())
+    # __init__.py files make packages, not modules
+    modules = [path for path in mock_package_structure.rglob("*.py") if path.name != "__init__.py"]
+    assert stats.files == len(modules)
+    assert stats.bytes == sum(path.stat().st_size for path in modules)
+    assert stats.deferred["module"] == len(modules)
+    assert stats.deferred["class"] == stats.nodes["class"]
+    assert sum(stats.nodes.values()) == orchestrator.graph.number_of_nodes()
+    assert stats.placeholders == len(orchestrator._check_graph_consistency("productworld"))
+    assert sum(stats.resolution_tiers.values()) > 0
+    assert stats.to_dict()["resolution_tiers"]["local"] == stats.resolution_tiers[ResolutionTier.LOCAL]
+
+
+def test_create_graph_keeps_stdout_clean(mock_package_structure, capsys):
+    """
+    Test that create_graph reports on stderr and in the stats, the diagram may be written to stdout.
+    """
+    stats = PipelineStats()
+    create_graph(str(mock_package_structure), "productworld", cache_dir=None, stats=stats)
+
+    assert capsys.readouterr().out == ""
+    assert "parse" in stats.stages
+    assert stats.files > 0
+